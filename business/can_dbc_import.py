@@ -0,0 +1,169 @@
+# business/can_dbc_import.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the converted model layout changes, so stale cache files are ignored
+IMPORTER_VERSION = 2
+
+# BO_ 273 Body_Control_Status: 8 BCM
+_BO_RE = re.compile(r"^BO_\s+(\d+)\s+(\w+)\s*:\s*(\d+)\s+(\w+)")
+
+# SG_ Vehicle_Power_Mode m2 : 48|2@1+ (1,0) [0|3] "" ECU1,ECU2
+_SG_RE = re.compile(
+    r"^SG_\s+(\w+)\s*(M|m\d+M?)?\s*:\s*(\d+)\|(\d+)@([01])([+-])\s*"
+    r"\(\s*([-+\d.eE]+)\s*,\s*([-+\d.eE]+)\s*\)\s*\[\s*([-+\d.eE]+)\s*\|\s*([-+\d.eE]+)\s*\]\s*\"([^\"]*)\""
+)
+
+# VAL_ 273 Vehicle_Power_Mode 0 "OFF" 1 "ACC" 2 "RUN" 3 "CRANK" ;
+_VAL_RE = re.compile(r"^VAL_\s+(\d+)\s+(\w+)\s+(.*?)\s*;", re.DOTALL)
+_VAL_PAIR_RE = re.compile(r"(-?\d+)\s+\"([^\"]*)\"")
+
+# SIG_VALTYPE_ 273 Some_Float : 1;   (1 = IEEE float, 2 = IEEE double)
+_VALTYPE_RE = re.compile(r"^SIG_VALTYPE_\s+(\d+)\s+(\w+)\s*:\s*([12])\s*;")
+
+# Bit 31 of a DBC message ID flags a 29-bit (extended) identifier
+DBC_EXTENDED_FLAG = 0x80000000
+
+
+def parse_dbc(text: str) -> Dict[str, Any]:
+    """
+    Converts DBC text into the same structure as the hand-written decode YAML:
+    {"can_signals": [{"can_id", "description", "parameters": [...]}, ...]}
+    """
+    messages: Dict[int, Dict[str, Any]] = {}
+    signals_by_key: Dict[tuple, Dict[str, Any]] = {}
+    current: Optional[Dict[str, Any]] = None
+
+    # VAL_ statements may wrap over several lines; join them before matching
+    statements: List[str] = []
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if statements and statements[-1].startswith("VAL_ ") and not statements[-1].endswith(";"):
+            statements[-1] += " " + line
+        else:
+            statements.append(line)
+
+    for line in statements:
+        m = _BO_RE.match(line)
+        if m:
+            dbc_id = int(m.group(1))
+            can_id = dbc_id & ~DBC_EXTENDED_FLAG
+            current = {
+                "can_id": can_id,
+                "description": m.group(2),
+                "dlc": int(m.group(3)),
+                "is_extended": bool(dbc_id & DBC_EXTENDED_FLAG),
+                "parameters": [],
+            }
+            messages[dbc_id] = current
+            continue
+
+        m = _SG_RE.match(line)
+        if m and current is not None:
+            name, mux, start, length, order, sign, factor, offset, vmin, vmax, unit = m.groups()
+            start, factor, offset = int(start), float(factor), float(offset)
+            signal = {
+                "name": name,
+                # DBC start bit is LSB (Intel) or MSB (Motorola) in byte*8+bit numbering,
+                # which is exactly what the decoder's start_byte/start_bit expect for each order
+                "start_byte": start // 8,
+                "start_bit": start % 8,
+                "bit_length": int(length),
+                "byte_order": "little_endian" if order == "1" else "big_endian",
+                "value_type": "signed" if sign == "-" else "unsigned",
+                "decode_type": "raw" if (factor, offset) == (1.0, 0.0) else "linear",
+                "calculation": {"a": factor, "b": offset},
+                "range": {"min": float(vmin), "max": float(vmax)},
+                "unit": unit,
+            }
+            if mux == "M":
+                signal["multiplexer"] = True
+            elif mux:
+                signal["mux_value"] = int(mux[1:].rstrip("M"))
+            current["parameters"].append(signal)
+            signals_by_key[(dbc_id, name)] = signal
+            continue
+
+        m = _VAL_RE.match(line)
+        if m:
+            signal = signals_by_key.get((int(m.group(1)), m.group(2)))
+            if signal is not None:
+                signal["values"] = {int(raw): text for raw, text in _VAL_PAIR_RE.findall(m.group(3))}
+                signal["decode_type"] = "stateEncoded"
+            continue
+
+        m = _VALTYPE_RE.match(line)
+        if m:
+            signal = signals_by_key.get((int(m.group(1)), m.group(2)))
+            if signal is not None:
+                signal["value_type"] = "float"
+            continue
+
+    return {"can_signals": [msg for msg in messages.values() if msg["parameters"]]}
+
+
+def _cache_path(dbc_path: str, digest: str, cache_dir: Optional[str]) -> str:
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(dbc_path)), ".dbc_cache")
+    stem = os.path.splitext(os.path.basename(dbc_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{digest[:16]}.json")
+
+
+def _read_cache(cache_file: str, digest: str) -> Dict[str, Any]:
+    """
+    Converted model from a cache file written by load_dbc. Plain JSON, never code: the cache sits
+    next to user-editable config. Raises if the file does not belong to this DBC content.
+    """
+    with open(cache_file, "r", encoding="utf-8") as f:
+        cached = json.load(f)
+    if cached.get("sha256") != digest:
+        raise ValueError("content hash mismatch")
+    model = cached["model"]
+    for message in model["can_signals"]:
+        for signal in message["parameters"]:
+            if "values" in signal:
+                # JSON object keys are strings; the decoder looks raw values up as ints
+                signal["values"] = {int(raw): text for raw, text in signal["values"].items()}
+    return model
+
+
+def load_dbc(dbc_path: str, cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Returns the decode model for a DBC file, reusing the converted model cached on disk
+    when the file content (SHA-256) and importer version are unchanged.
+    """
+    with open(dbc_path, "rb") as f:
+        raw = f.read()
+
+    digest = hashlib.sha256(raw + f"v{IMPORTER_VERSION}".encode()).hexdigest()
+    cache_file = _cache_path(dbc_path, digest, cache_dir)
+
+    try:
+        return _read_cache(cache_file, digest)
+    except FileNotFoundError:
+        pass  # no cache yet: parse and write one below
+    except Exception as e:
+        # Unreadable / truncated / hand-edited file: a broken cache must never break startup,
+        # it only costs a reparse
+        logger.warning(f"DBC import: ignoring unusable cache file {cache_file}: {e!r}")
+
+    # DBC files are commonly cp1252 encoded; undecodable bytes only affect comments/units
+    model = parse_dbc(raw.decode("cp1252", errors="replace"))
+
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"sha256": digest, "model": model}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        # A read-only config folder must not break decoding, it only costs the reparse next time
+        logger.warning(f"DBC import: could not write cache file {cache_file}: {e}")
+
+    return model
@@ -1,25 +1,123 @@
 # business/can_decoder.py (Completed Configuration Loading)
 
+import os
+import sys
+import struct
 import yaml
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, List, Callable, Tuple, Iterable, Optional
+
+from business.can_dbc_import import load_dbc
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the offline decode_batch() path
+    np = None
+
+# A compiled message decoder takes the raw payload and returns {signal_name: value}
+MessageDecoder = Callable[[bytes], Dict[str, Any]]
+
+# Accepted spellings for the optional 'byte_order' key -> int.from_bytes byte order
+BYTE_ORDER_ALIASES = {
+    "little_endian": "little", "intel": "little", "little": "little",
+    "big_endian": "big", "motorola": "big", "big": "big",
+}
+
+# Structured dtype for recorded frames: payload column is always the full 64 bytes (zero padded)
+CAN_FRAME_DTYPE = [("id", "<u4"), ("timestamp", "<f8"), ("data", "u1", (64,))]
+
+# Byte-aligned field widths that map directly onto a struct format code (unsigned form)
+STRUCT_CODES = {8: "B", 16: "H", 32: "I", 64: "Q"}
+
+
+@dataclass
+class MuxDefinition:
+    """Multiplexed CAN ID: the multiplexor signal, always-present signals and groups per mux value."""
+    multiplexer: Dict[str, Any]
+    base: List[Dict[str, Any]]
+    groups: Dict[int, List[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class SignalLayout:
+    """Resolved position of one signal: payload bytes [start_byte, end_byte), shifted/masked."""
+    start_byte: int
+    end_byte: int
+    shift: int
+    length: int
+    byte_order: str  # 'little' or 'big'
+    value_type: str  # 'unsigned', 'signed' or 'float'
+
+    @property
+    def mask(self) -> int:
+        return (1 << self.length) - 1
+
 
 class CANDecoder:
+    # stateEncoded signals up to this raw range get a dense tuple table instead of a dict
+    STATE_TABLE_MAX = 0xFFF
+
     def __init__(self, decode_config_path: str):
         """
         Initializes the decoder by loading and parsing the CAN decode YAML file.
-        The resulting structure is stored in self.signal_map.
+        The resulting structure is stored in self.signal_map, and compiled once into
+        self.decoders (one precomputed decode function per CAN ID).
         """
         try:
-            with open(decode_config_path, "r") as f:
-                cfg = yaml.safe_load(f)
+            cfg = self._load_config(decode_config_path)
         except Exception as e:
-            # Handle File Not Found or YAML parsing errors gracefully
+            # Handle File Not Found or YAML/DBC parsing errors gracefully
             raise Exception(f"Failed to load CAN decode config file {decode_config_path}: {e}")
 
         # The core data structure is created and stored here
+        # (self.mux_map is filled alongside it for multiplexed CAN IDs)
+        self.mux_map: Dict[int, MuxDefinition] = {}
         self.signal_map: Dict[int, List[Dict[str, Any]]] = self._parse_config(cfg)
+
+        # Compile step: all per-signal lookups (.get() defaults, decode_type branches)
+        # are resolved here once, so decode() only does a dict lookup and a call.
+        # Multiplexed groups are compiled separately and dispatched via (can_id, mux_value).
+        self.mux_decoders: Dict[Tuple[int, int], MessageDecoder] = {}
+        self.decoders: Dict[int, MessageDecoder] = {}
+        for can_id, signals in self.signal_map.items():
+            mux = self.mux_map.get(can_id)
+            if mux is None:
+                self.decoders[can_id] = self._compile_message(signals)
+            else:
+                self.decoders[can_id] = self._compile_mux_message(can_id, mux)
+
+        # Bits actually read by the configured signals, per CAN ID (see PayloadChangeFilter)
+        self.payload_masks: Dict[int, Tuple[int, int]] = {
+            can_id: self._compile_payload_mask(signals) for can_id, signals in self.signal_map.items()
+        }
         print(f"CANDecoder loaded {len(self.signal_map)} unique CAN IDs from config.")
 
+    @staticmethod
+    def _load_config(decode_config_path: str) -> Dict[str, Any]:
+        """
+        Loads either a decode YAML or a DBC file (converted and disk-cached by can_dbc_import).
+        A YAML may also pull in DBC files via 'dbc_files' (paths relative to the YAML);
+        its own 'can_signals' entries override DBC messages with the same CAN ID.
+        """
+        if decode_config_path.lower().endswith(".dbc"):
+            return load_dbc(decode_config_path)
+
+        with open(decode_config_path, "r") as f:
+            cfg = yaml.safe_load(f) or {}
+
+        dbc_files = cfg.get("dbc_files", [])
+        if dbc_files:
+            base_dir = os.path.dirname(decode_config_path)
+            merged: Dict[int, Dict[str, Any]] = {}
+            for dbc_file in dbc_files:
+                for message in load_dbc(os.path.join(base_dir, dbc_file))["can_signals"]:
+                    merged[message["can_id"]] = message
+            for message in cfg.get("can_signals", []):
+                merged[message["can_id"]] = message
+            cfg["can_signals"] = list(merged.values())
+
+        return cfg
+
     def _parse_config(self, cfg: Dict[str, Any]) -> Dict[int, List[Dict[str, Any]]]:
         """
         Parses the loaded configuration dictionary into a map keyed by CAN ID.
@@ -30,67 +128,396 @@ class CANDecoder:
         # Iterate over the top-level 'can_signals' list in the YAML
         for message in cfg.get("can_signals", []):
             can_id = message["can_id"]
-            # Store the list of all parameters/signals defined for this CAN ID
-            signal_map[can_id] = message.get("parameters", [])
+            parameters = message.get("parameters", [])
+
+            # Multiplexed message: either the grouped YAML form ('multiplexer' + 'mux_groups')
+            # or the flat DBC form (one parameter flagged 'multiplexer', others tagged 'mux_value')
+            multiplexer = message.get("multiplexer")
+            base = []
+            groups: Dict[int, List[Dict[str, Any]]] = {}
+            for signal_def in parameters:
+                if signal_def.get("multiplexer") is True:
+                    multiplexer = signal_def
+                elif "mux_value" in signal_def:
+                    groups.setdefault(signal_def["mux_value"], []).append(signal_def)
+                else:
+                    base.append(signal_def)
+            for group in message.get("mux_groups", []):
+                groups.setdefault(group["mux_value"], []).extend(group.get("parameters", []))
+
+            if multiplexer is None:
+                # Store the list of all parameters/signals defined for this CAN ID
+                signal_map[can_id] = parameters
+                continue
+
+            self.mux_map[can_id] = MuxDefinition(multiplexer, base, groups)
+            # signal_map keeps the flat view of every signal this ID can carry
+            signal_map[can_id] = [multiplexer] + base + [sd for group in groups.values() for sd in group]
 
         return signal_map
 
+    # ------------------------------------------------------------------
+    # Compile step (runs once at config load)
+    # ------------------------------------------------------------------
+
+    def _compile_layout(self, signal_def: Dict[str, Any]) -> SignalLayout:
+        """
+        Resolves where a signal lives in the payload.
+        little_endian (Intel): start_byte/start_bit address the signal's LSB.
+        big_endian (Motorola): start_byte/start_bit address the signal's MSB (DBC convention).
+        """
+        name = signal_def['name']
+        start_byte = signal_def['start_byte']
+        start_bit = signal_def.get('start_bit', 0)  # Use 0 as default if not specified
+        length = signal_def['bit_length']
+        byte_order = BYTE_ORDER_ALIASES.get(signal_def.get('byte_order', 'little_endian'))
+        value_type = signal_def.get('value_type', 'unsigned')
+
+        if byte_order is None:
+            raise ValueError(f"Signal {name}: unknown byte_order '{signal_def.get('byte_order')}'")
+        if value_type not in ('unsigned', 'signed', 'float'):
+            raise ValueError(f"Signal {name}: unknown value_type '{value_type}'")
+        if not 0 < length <= 64 or not 0 <= start_bit <= 7:
+            raise ValueError(f"Signal {name}: bit_length must be 1..64 and start_bit 0..7")
+
+        if byte_order == 'little':
+            end_byte = start_byte + (start_bit + length + 7) // 8
+            shift = start_bit
+        else:
+            # Bits below the MSB in the first byte, then whole bytes towards higher indices
+            remaining = length - (start_bit + 1)
+            extra_bytes = (remaining + 7) // 8 if remaining > 0 else 0
+            end_byte = start_byte + extra_bytes + 1
+            shift = extra_bytes * 8 + start_bit - length + 1
+
+        if value_type == 'float' and (length not in (32, 64) or shift != 0 or (end_byte - start_byte) * 8 != length):
+            raise ValueError(f"Signal {name}: float signals must be byte aligned with bit_length 32 or 64")
+
+        return SignalLayout(start_byte, end_byte, shift, length, byte_order, value_type)
+
+    @staticmethod
+    def _compile_raw(layout: SignalLayout) -> Callable[[bytes], Any]:
+        """
+        Builds the raw-value extractor for a layout. Byte-aligned 8/16/32/64-bit fields use a
+        precompiled struct; everything else is one int.from_bytes over the covering bytes.
+        """
+        start, end, shift, mask = layout.start_byte, layout.end_byte, layout.shift, layout.mask
+        prefix = '<' if layout.byte_order == 'little' else '>'
+
+        if layout.value_type == 'float':
+            unpack_from = struct.Struct(prefix + ('f' if layout.length == 32 else 'd')).unpack_from
+            return lambda data: unpack_from(data, start)[0]
+
+        signed = layout.value_type == 'signed'
+        if shift == 0 and (end - start) * 8 == layout.length and layout.length in STRUCT_CODES:
+            code = STRUCT_CODES[layout.length]
+            unpack_from = struct.Struct(prefix + (code.lower() if signed else code)).unpack_from
+            return lambda data: unpack_from(data, start)[0]
+
+        if end - start == 1:
+            raw_fn = lambda data: (data[start] >> shift) & mask
+        else:
+            order = layout.byte_order
+            from_bytes = int.from_bytes
+            raw_fn = lambda data: (from_bytes(data[start:end], order) >> shift) & mask
+
+        if not signed:
+            return raw_fn
+        sign_bit = 1 << (layout.length - 1)
+        full = 1 << layout.length
+
+        def signed_fn(data):
+            raw = raw_fn(data)
+            return raw - full if raw & sign_bit else raw
 
+        return signed_fn
 
-    def _extract_bits(self, data: bytes, start_byte: int, start_bit: int, length: int) -> int:
+    def _compile_signal(self, signal_def: Dict[str, Any]) -> Tuple[str, Callable[[bytes], Any], int]:
         """
-        Extracts the raw integer value of a bit field from the message data.
-        Assumes Little-Endian or Big-Endian byte order based on system/library default,
-        but bit field extraction is done per byte.
+        Turns one signal definition into (interned name, value function, bytes needed).
+        The value function only does fixed shift/mask work plus a table lookup or scale/offset.
         """
-        if start_byte >= len(data):
-            return 0
+        name = sys.intern(signal_def['name'])
+        layout = self._compile_layout(signal_def)
+        decode_type = signal_def['decode_type']
+
+        # Single-byte unsigned fields (the common case) get fully inlined closures
+        simple = layout.end_byte - layout.start_byte == 1 and layout.value_type == 'unsigned'
+        start_byte, shift, mask = layout.start_byte, layout.shift, layout.mask
+        raw_fn = self._compile_raw(layout)
+
+        if decode_type == "stateEncoded":
+            states = signal_def.get('values', {})
+            if layout.value_type == 'unsigned' and mask <= self.STATE_TABLE_MAX:
+                # Dense state table indexed by the raw value (unknown values pre-formatted)
+                table = tuple(states.get(raw, f"UNKNOWN({raw})") for raw in range(mask + 1))
+
+                if simple:
+                    def value_fn(data, _sb=start_byte, _sh=shift, _m=mask, _t=table):
+                        return _t[(data[_sb] >> _sh) & _m]
+                else:
+                    def value_fn(data, _raw=raw_fn, _t=table):
+                        return _t[_raw(data)]
+            else:
+                table_get = dict(states).get
+
+                def value_fn(data, _raw=raw_fn, _get=table_get):
+                    raw = _raw(data)
+                    value = _get(raw)
+                    return value if value is not None else f"UNKNOWN({raw})"
+
+        elif decode_type == "linear":
+            calc = signal_def.get('calculation', {})
+            a = calc.get('a', 1.0)
+            b = calc.get('b', 0.0)
 
-        # Get the target byte
-        byte_val = data[start_byte]
+            if simple:
+                def value_fn(data, _sb=start_byte, _sh=shift, _m=mask, _a=a, _b=b):
+                    return ((data[_sb] >> _sh) & _m) * _a + _b
+            else:
+                def value_fn(data, _raw=raw_fn, _a=a, _b=b):
+                    return _raw(data) * _a + _b
 
-        # Create a mask for the bit length
-        mask = (1 << length) - 1
+        else:
+            value_fn = raw_fn
 
-        # Shift the byte value right by the start bit position, then apply the mask
-        return (byte_val >> start_bit) & mask
+        return name, value_fn, layout.end_byte
+
+    def _compile_message(self, signals: List[Dict[str, Any]]) -> MessageDecoder:
+        """Builds the single decode function used for every frame of one CAN ID."""
+        compiled = tuple(self._compile_signal(signal_def) for signal_def in signals)
+        fields = tuple((name, value_fn) for name, value_fn, _ in compiled)
+        min_len = max((needed for _, _, needed in compiled), default=0)
+        padding = bytes(min_len)
+
+        def decode_message(data: bytes) -> Dict[str, Any]:
+            # Short frames: missing bytes read as 0 (same result as the old per-byte bounds check)
+            if len(data) < min_len:
+                data = bytes(data) + padding[len(data):]
+            return {name: value_fn(data) for name, value_fn in fields}
+
+        return decode_message
+
+    def _compile_payload_mask(self, signals: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        Returns (byte count, bit mask) covering every payload bit any signal of this ID reads
+        (multiplexor and all mux groups included). Bit n of the mask is bit n%8 of byte n//8.
+        """
+        mask = 0
+        byte_count = 0
+        for signal_def in signals:
+            layout = self._compile_layout(signal_def)
+            window = layout.end_byte - layout.start_byte
+            for pos in range(layout.shift, layout.shift + layout.length):
+                if layout.byte_order == 'little':
+                    byte_index = layout.start_byte + pos // 8
+                else:
+                    byte_index = layout.start_byte + window - 1 - pos // 8
+                mask |= 1 << (byte_index * 8 + pos % 8)
+            byte_count = max(byte_count, layout.end_byte)
+        return byte_count, mask
+
+    def _compile_mux_message(self, can_id: int, mux: MuxDefinition) -> MessageDecoder:
+        """
+        Builds the decode function for a multiplexed CAN ID: the multiplexor and the
+        always-present signals are decoded first, then only the group selected by the
+        mux value is decoded through the precomputed (can_id, mux_value) table.
+        """
+        common = self._compile_message([mux.multiplexer] + mux.base)
+        mux_raw = self._compile_raw(self._compile_layout(mux.multiplexer))
+        for mux_value, group in mux.groups.items():
+            self.mux_decoders[(can_id, mux_value)] = self._compile_message(group)
+        mux_get = self.mux_decoders.get
+
+        min_len = self._compile_layout(mux.multiplexer).end_byte
+        padding = bytes(min_len)
+
+        def decode_mux_message(data: bytes) -> Dict[str, Any]:
+            decoded = common(data)
+            if len(data) < min_len:
+                data = bytes(data) + padding[len(data):]
+            group_decoder = mux_get((can_id, mux_raw(data)))
+            if group_decoder is not None:
+                decoded.update(group_decoder(data))
+            return decoded
+
+        return decode_mux_message
+
+    # ------------------------------------------------------------------
+    # Runtime decoding (per-frame hot path)
+    # ------------------------------------------------------------------
 
     def decode(self, can_id: int, data: bytes) -> Dict[str, Any]:
         """Decodes all signals within a single raw CAN message."""
-        decoded_signals = {}
-
-        # Fast lookup of signals defined for this CAN ID
-        signals_to_decode = self.signal_map.get(can_id)
-        if not signals_to_decode:
-            return decoded_signals
-
-        for signal_def in signals_to_decode:
-            name = signal_def['name']
-
-            # 1. Extract the raw integer value
-            raw_value = self._extract_bits(
-                data,
-                signal_def['start_byte'],
-                signal_def.get('start_bit', 0),  # Use 0 as default if not specified
-                signal_def['bit_length']
-            )
-
-            # 2. Apply decoding based on type
-            decoded_value = raw_value
-            decode_type = signal_def['decode_type']
-
-            if decode_type == "stateEncoded":
-                # Apply state mapping (e.g., 2 -> "RUN")
-                decoded_value = signal_def.get('values', {}).get(raw_value, f"UNKNOWN({raw_value})")
-
-            elif decode_type == "linear":
-                # Apply scaling and offset
-                calc = signal_def.get('calculation', {})
-                a = calc.get('a', 1.0)
-                b = calc.get('b', 0.0)
-                decoded_value = raw_value * a + b
-
-            # Store the result
-            decoded_signals[name] = decoded_value
-
-        return decoded_signals
\ No newline at end of file
+        # Fast lookup of the compiled decoder for this CAN ID
+        decoder = self.decoders.get(can_id)
+        if decoder is None:
+            return {}
+        return decoder(data)
+
+    # ------------------------------------------------------------------
+    # Batch decoding (offline traces, columnar)
+    # ------------------------------------------------------------------
+
+    def decode_batch(self, ids, payloads, timestamps) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Decodes a whole recorded trace at once with vectorized shift/mask/scale.
+
+        Args:
+            ids: (N,) array of CAN IDs.
+            payloads: (N, 64) uint8 array, or a CAN_FRAME_DTYPE structured array ('data' column is used).
+            timestamps: (N,) array of frame timestamps.
+        Returns:
+            {signal_name: (timestamps, values)} for every configured signal present in the batch.
+        """
+        if np is None:
+            raise ImportError("CANDecoder.decode_batch requires numpy (pip install numpy).")
+
+        ids = np.asarray(ids)
+        payloads = np.asarray(payloads)
+        if payloads.dtype.names and "data" in payloads.dtype.names:
+            payloads = payloads["data"]
+        timestamps = np.asarray(timestamps)
+
+        # name -> [(trace row indices, values)]; a name decoded from several mux groups (or IDs)
+        # gets one column merged back into trace order
+        parts: Dict[str, List[Tuple[Any, Any]]] = {}
+
+        def add(signal_def, rows, frame_data):
+            parts.setdefault(signal_def['name'], []).append((rows, self._decode_column(signal_def, frame_data)))
+
+        for can_id, signals in self.signal_map.items():
+            rows = np.flatnonzero(ids == can_id)
+            if rows.size == 0:
+                continue
+            frame_data = payloads[rows]
+
+            mux = self.mux_map.get(can_id)
+            if mux is None:
+                for signal_def in signals:
+                    add(signal_def, rows, frame_data)
+                continue
+
+            # Multiplexed ID: split rows by raw mux value, decode each group only where present
+            for signal_def in [mux.multiplexer] + mux.base:
+                add(signal_def, rows, frame_data)
+            mux_raw = self._decode_column(dict(mux.multiplexer, decode_type="raw"), frame_data)
+            for mux_value, group in mux.groups.items():
+                group_rows = np.flatnonzero(mux_raw == mux_value)
+                if group_rows.size == 0:
+                    continue
+                for signal_def in group:
+                    add(signal_def, rows[group_rows], frame_data[group_rows])
+
+        columns: Dict[str, Tuple[Any, Any]] = {}
+        for name, name_parts in parts.items():
+            if len(name_parts) == 1:
+                rows, values = name_parts[0]
+            else:
+                rows = np.concatenate([part_rows for part_rows, _ in name_parts])
+                values = np.concatenate([part_values for _, part_values in name_parts])
+                order = np.argsort(rows, kind="stable")
+                rows, values = rows[order], values[order]
+            columns[name] = (timestamps[rows], values)
+        return columns
+
+    def _decode_column(self, signal_def: Dict[str, Any], frame_data) -> Any:
+        """Vectorized equivalent of one compiled value function over (M, 64) payload rows."""
+        layout = self._compile_layout(signal_def)
+        start, end = layout.start_byte, layout.end_byte
+        window = frame_data[:, start:end]
+
+        if layout.value_type == 'float':
+            dtype = ('<' if layout.byte_order == 'little' else '>') + ('f4' if layout.length == 32 else 'f8')
+            raw = np.ascontiguousarray(window).view(dtype).ravel().astype(np.float64)
+        elif end - start > 8:
+            # 64-bit field straddling 9 bytes does not fit a uint64 accumulator: per-row fallback
+            _, value_fn, _ = self._compile_signal(signal_def)
+            return np.array([value_fn(bytes(row)) for row in frame_data], dtype=object)
+        else:
+            weights = range(end - start) if layout.byte_order == 'little' else range(end - start - 1, -1, -1)
+            raw = np.zeros(len(frame_data), dtype=np.uint64)
+            for col, weight in enumerate(weights):
+                raw |= window[:, col].astype(np.uint64) << np.uint64(8 * weight)
+            raw = (raw >> np.uint64(layout.shift)) & np.uint64(layout.mask)
+
+            if layout.value_type == 'signed':
+                # Sign-extend: move the sign bit to bit 63, then arithmetic shift back
+                spare = np.uint64(64 - layout.length)
+                raw = (raw << spare).view(np.int64) >> np.int64(spare)
+
+        decode_type = signal_def['decode_type']
+        if decode_type == "stateEncoded":
+            states = signal_def.get('values', {})
+            if layout.value_type == 'unsigned' and layout.mask <= self.STATE_TABLE_MAX:
+                table = np.array([states.get(r, f"UNKNOWN({r})") for r in range(layout.mask + 1)], dtype=object)
+                return table[raw.astype(np.intp)]
+            return np.array([states.get(int(r), f"UNKNOWN({int(r)})") for r in raw], dtype=object)
+
+        if decode_type == "linear":
+            calc = signal_def.get('calculation', {})
+            return raw.astype(np.float64) * calc.get('a', 1.0) + calc.get('b', 0.0)
+
+        return raw
+
+
+class PayloadChangeFilter:
+    """
+    Per-CAN-ID cache of the last payload, masked to the bits the configured signals read.
+    Cyclic frames that repeat the same values can then skip decode/feed/store entirely.
+    """
+
+    def __init__(self, decoder: CANDecoder):
+        self._masks = decoder.payload_masks
+        self._last: Dict[int, int] = {}
+
+        # Counters (read by the owning thread for diagnostics)
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+        self.frames_unconfigured = 0
+
+    def changed(self, can_id: int, data: bytes) -> bool:
+        """True when the frame must be decoded: first frame of the ID, or any used bit changed."""
+        entry = self._masks.get(can_id)
+        if entry is None:
+            self.frames_unconfigured += 1
+            return False
+
+        byte_count, mask = entry
+        key = int.from_bytes(data[:byte_count], 'little') & mask
+        if self._last.get(can_id) == key:
+            self.frames_skipped += 1
+            return False
+
+        self._last[can_id] = key
+        self.frames_decoded += 1
+        return True
+
+    def reset(self):
+        """Forget cached payloads, e.g. when a new test run starts on the same decoder."""
+        self._last.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames_decoded": self.frames_decoded,
+            "frames_skipped": self.frames_skipped,
+            "frames_unconfigured": self.frames_unconfigured,
+        }
+
+
+def records_to_arrays(records: Iterable[Any], id_filter: Optional[set] = None):
+    """
+    Packs (timestamp, ..., can_id, dlc, data) records - e.g. hardware.can.can_logger.iter_text_trace() -
+    into a CAN_FRAME_DTYPE structured array ready for CANDecoder.decode_batch().
+    """
+    if np is None:
+        raise ImportError("records_to_arrays requires numpy (pip install numpy).")
+
+    selected = [r for r in records if id_filter is None or r.can_id in id_filter]
+    frames = np.zeros(len(selected), dtype=CAN_FRAME_DTYPE)
+    flat = frames["data"]
+    for i, rec in enumerate(selected):
+        frames["id"][i] = rec.can_id
+        frames["timestamp"][i] = rec.timestamp
+        flat[i, :len(rec.data)] = np.frombuffer(rec.data, dtype=np.uint8)
+    return frames
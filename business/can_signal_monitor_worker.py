@@ -4,8 +4,10 @@ import queue
 import threading  # Use threading.Event to keep signature clean
 import logging
 from PySide6.QtCore import QThread, Signal
-from business.can_decoder import CANDecoder
+from business.can_decoder import CANDecoder, PayloadChangeFilter
 from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.can_frame_ring import unpack_frame
+from hardware.can.can_frame_bus import CanFrameBus
 from can_fd.canfd.canfd_enum import DLC_2_LEN
 from hardware.can.pcan_constants import *
 
@@ -23,13 +25,27 @@ class CanSignalMonitorWorker(QThread):
     TARGET_WIPER_SIGNAL_NAME = "Windshield_Wiper_Switch_Status"
     TARGET_PM_SIGNAL_NAME = "Power_Model_Status"  # Assuming this is your Power Model Signal
 
-    def __init__(self, frame_queue: queue.Queue, decoder_cfg: str, stop_event: threading.Event, parent=None):
+    SUBSCRIBER_NAME = "signal_monitor"
+
+    def __init__(self, frame_queue, decoder_cfg: str, stop_event: threading.Event, parent=None):
+        """
+        frame_queue: a queue.Queue of its own, or a CanFrameBus shared with the validator (the worker
+        subscribes for the CAN IDs carrying its target signals).
+        """
         super().__init__(parent)
-        self.frame_queue = frame_queue
         self.stop_event = stop_event
 
         # Initialize decoder and state trackers
         self.decoder = CANDecoder(decoder_cfg)
+        self.frame_bus = None
+        if isinstance(frame_queue, CanFrameBus):
+            self.frame_bus = frame_queue
+            targets = {self.TARGET_WIPER_SIGNAL_NAME, self.TARGET_PM_SIGNAL_NAME}
+            target_ids = [can_id for can_id, signals in self.decoder.signal_map.items()
+                          if any(sig["name"] in targets for sig in signals)]
+            frame_queue = self.frame_bus.subscribe(self.SUBSCRIBER_NAME, id_filter=target_ids)
+        self.frame_queue = frame_queue
+        self.change_filter = PayloadChangeFilter(self.decoder)
         self._last_wiper_state = None
         self._last_pm_state = None
 
@@ -38,7 +54,7 @@ class CanSignalMonitorWorker(QThread):
 
         while not self.stop_event.is_set():
             try:
-                msg = self.frame_queue.get(timeout=0.05)
+                msg, _ = unpack_frame(self.frame_queue.get(timeout=0.05))
             except queue.Empty:
                 continue
 
@@ -54,6 +70,10 @@ class CanSignalMonitorWorker(QThread):
 
             data = bytes(msg.DATA[:payload_length])
 
+            # Unchanged signal bits cannot produce a state change: skip the decode
+            if not self.change_filter.changed(can_id, data):
+                continue
+
             decoded = self.decoder.decode(can_id, data)
 
             # --- Wiper Status Tracking ---
@@ -74,4 +94,6 @@ class CanSignalMonitorWorker(QThread):
                     self.sig_power_model_state_changed.emit(current_state)
                     logger.debug(f"[CAN MONITOR] PM state changed to: {current_state}")
 
-        logger.info("[CAN MONITOR] Worker terminated.")
\ No newline at end of file
+        if self.frame_bus is not None:
+            self.frame_bus.unsubscribe(self.SUBSCRIBER_NAME)
+        logger.info(f"[CAN MONITOR] Worker terminated. Decode stats: {self.change_filter.stats()}")
\ No newline at end of file
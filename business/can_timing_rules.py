@@ -0,0 +1,418 @@
+# business/can_timing_rules.py
+
+"""
+Time-aware validation rules, evaluated incrementally by Validator as frames and decoded signal
+values arrive (timestamps are the hardware receive times in us carried by CanFrame).
+
+A test in the validation YAML may carry any of these keys next to 'signal':
+
+  deadline:            # "RUN within 800 ms of the 0x2F IO-control request"
+    trigger: {can_id: 0x14DA40F1, service: 0x2F}     # or {signal: "Ignition_Switch", value: "ON"}
+    value: "RUN"
+    within_ms: 800
+  dwell:               # "RUN held >= 200 ms" (every time it is entered)
+    value: "RUN"
+    min_ms: 200
+  period:              # "0x111 every 10 ms +/- 10 %" (no 'signal' needed)
+    can_id: 0x111
+    period_ms: 10
+    tolerance_pct: 10
+    max_violations: 0
+    min_intervals: 100 # intervals observed before the rule settles (early pass)
+  transition_latency:  # "OFF -> RUN latency p95 <= 500 ms"
+    from: "OFF"
+    to: "RUN"
+    percentile: 95
+    max_ms: 500
+    trigger: {...}     # optional: measure from the trigger instead of from leaving 'from'
+
+Each rule settles once its observation window has run out (deadline: the window after a trigger
+closed in time; dwell: a stay lasted min_ms; period: min_intervals intervals; latency: min_samples
+transitions within the limit). That early verdict is provisional: Validator.validate_all() decides
+on everything seen until the end of the test and overwrites it.
+
+Frame triggers on requests the station sends itself are only seen with PCAN_ALLOW_ECHO_FRAMES on.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def uds_service_id(data: bytes) -> Optional[int]:
+    """Service ID of an ISO-TP single or first frame (classic or CAN FD length escape), else None."""
+    if len(data) < 2:
+        return None
+    frame_type = data[0] >> 4
+    if frame_type == 0:
+        # Single frame: length in the low nibble, or 0 followed by a length byte (CAN FD)
+        if data[0] & 0x0F:
+            return data[1]
+        return data[2] if len(data) > 2 else None
+    if frame_type == 1:
+        # First frame: 12-bit length, or 0 followed by a 32-bit length
+        if (data[0] & 0x0F) or data[1]:
+            return data[2] if len(data) > 2 else None
+        return data[6] if len(data) > 6 else None
+    return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100.0))]
+
+
+class Trigger:
+    """A frame (CAN ID, optionally a UDS service) or a signal value that starts a timing window."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.can_id = spec.get("can_id")
+        self.service = spec.get("service")
+        self.signal = spec.get("signal")
+        self.value = spec.get("value")
+        if self.can_id is None and self.signal is None:
+            raise ValueError(f"Timing rule trigger needs 'can_id' or 'signal': {spec}")
+
+    def matches_frame(self, can_id: int, data: bytes) -> bool:
+        if can_id != self.can_id:
+            return False
+        return self.service is None or uds_service_id(data) == self.service
+
+    def matches_signal(self, signal_name: str, value: Any) -> bool:
+        return signal_name == self.signal and (self.value is None or value == self.value)
+
+    def __str__(self):
+        if self.can_id is not None:
+            service = f" service 0x{self.service:02X}" if self.service is not None else ""
+            return f"frame 0x{self.can_id:X}{service}"
+        return f"{self.signal}={self.value}" if self.value is not None else self.signal
+
+
+class TimingRule:
+    """
+    Base class. Subclasses declare the signals / CAN IDs they watch, collect violations as events
+    arrive and report a failure reason (None = pass) from result(now) at the end of the test.
+    verdict(now) is the early answer while the test runs: False once a violation is final, True
+    once the rule's observation window has run out without one, else None. An early True is
+    provisional (a later event may still violate the rule); result(now) is the final answer.
+    """
+
+    label = "Timing"
+
+    def __init__(self, signal: Optional[str]):
+        self.signal = signal
+        self.violations: List[str] = []
+
+    @property
+    def signals(self) -> Tuple[str, ...]:
+        return (self.signal,) if self.signal else ()
+
+    @property
+    def can_ids(self) -> Tuple[int, ...]:
+        return ()
+
+    @property
+    def pending(self) -> bool:
+        """True while the rule needs check(now) on every frame (an open deadline window)."""
+        return False
+
+    def on_signal(self, signal_name: str, value: Any, timestamp: int):
+        pass
+
+    def on_frame(self, can_id: int, data: bytes, timestamp: int):
+        pass
+
+    def check(self, now: int):
+        pass
+
+    def verdict(self, now: Optional[int]) -> Optional[bool]:
+        return False if self.violations else None
+
+    def result(self, now: Optional[int]) -> Optional[str]:
+        if now is not None:
+            self.check(now)
+        if self.violations:
+            return f"{self.label} Failure: " + ", ".join(self.violations[:5]) + \
+                   (f" (+{len(self.violations) - 5} more)" if len(self.violations) > 5 else "")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class _TriggeredRule(TimingRule):
+    """Shared trigger plumbing: the trigger may be a frame or another signal."""
+
+    def __init__(self, signal: Optional[str], trigger: Optional[Dict[str, Any]]):
+        super().__init__(signal)
+        self.trigger = Trigger(trigger) if trigger else None
+        self.triggers_seen = 0
+
+    @property
+    def signals(self) -> Tuple[str, ...]:
+        if self.trigger is not None and self.trigger.signal and self.trigger.signal != self.signal:
+            return super().signals + (self.trigger.signal,)
+        return super().signals
+
+    @property
+    def can_ids(self) -> Tuple[int, ...]:
+        if self.trigger is not None and self.trigger.can_id is not None:
+            return (self.trigger.can_id,)
+        return ()
+
+    def on_frame(self, can_id: int, data: bytes, timestamp: int):
+        if self.trigger.matches_frame(can_id, data):
+            self.triggers_seen += 1
+            self.triggered(timestamp)
+
+    def triggered(self, timestamp: int):
+        raise NotImplementedError
+
+
+class DeadlineRule(_TriggeredRule):
+    """signal must reach 'value' within 'within_ms' of every trigger."""
+
+    label = "Deadline"
+
+    def __init__(self, signal: str, spec: Dict[str, Any]):
+        super().__init__(signal, spec["trigger"])
+        self.value = spec["value"]
+        self.within_us = int(spec["within_ms"] * 1000)
+        self.current = None
+        self.open_since: Optional[int] = None
+        self.last_trigger: Optional[int] = None
+        self.reactions_us: List[int] = []
+
+    @property
+    def pending(self) -> bool:
+        return self.open_since is not None
+
+    def triggered(self, timestamp: int):
+        if self.open_since is not None:
+            return  # repeated request while a window is open: the first one sets the deadline
+        self.last_trigger = timestamp
+        if self.current == self.value:
+            self.reactions_us.append(0)
+        else:
+            self.open_since = timestamp
+
+    def on_signal(self, signal_name: str, value: Any, timestamp: int):
+        if self.trigger.matches_signal(signal_name, value):
+            self.triggers_seen += 1
+            self.triggered(timestamp)
+        if signal_name != self.signal:
+            return
+        self.current = value
+        if value == self.value and self.open_since is not None:
+            reaction = timestamp - self.open_since
+            self.open_since = None
+            if reaction > self.within_us:
+                self.violations.append(f"{self.value} after {reaction / 1000:.1f} ms (> {self.within_us / 1000:g} ms)")
+            else:
+                self.reactions_us.append(reaction)
+
+    def check(self, now: int):
+        if self.open_since is not None and now - self.open_since > self.within_us:
+            self.violations.append(f"no {self.value} within {self.within_us / 1000:g} ms of {self.trigger}")
+            self.open_since = None
+
+    def verdict(self, now: Optional[int]) -> Optional[bool]:
+        if self.violations:
+            return False
+        # Settled once the window of the last trigger has run out with the reaction seen
+        if self.last_trigger is not None and self.open_since is None and now is not None \
+                and now - self.last_trigger >= self.within_us:
+            return True
+        return None
+
+    def result(self, now: Optional[int]) -> Optional[str]:
+        if not self.triggers_seen:
+            return f"{self.label} Failure: trigger {self.trigger} never seen"
+        if now is not None and self.open_since is not None:
+            # Trace ended inside the window: the reaction was not observed
+            self.violations.append(f"no {self.value} within {self.within_us / 1000:g} ms of {self.trigger} "
+                                   f"(ended after {(now - self.open_since) / 1000:.1f} ms)")
+            self.open_since = None
+        return super().result(now)
+
+    def stats(self) -> Dict[str, Any]:
+        worst = max(self.reactions_us, default=None)
+        return {"triggers": self.triggers_seen, "reactions": len(self.reactions_us),
+                "max_reaction_ms": worst / 1000 if worst is not None else None}
+
+
+class DwellRule(TimingRule):
+    """Every stay of signal in 'value' must last at least 'min_ms'; at least one stay must occur."""
+
+    label = "Dwell"
+
+    def __init__(self, signal: str, spec: Dict[str, Any]):
+        super().__init__(signal)
+        self.value = spec["value"]
+        self.min_us = int(spec["min_ms"] * 1000)
+        self.entered: Optional[int] = None
+        self.dwells_us: List[int] = []
+
+    def on_signal(self, signal_name: str, value: Any, timestamp: int):
+        if value == self.value:
+            if self.entered is None:
+                self.entered = timestamp
+        elif self.entered is not None:
+            dwell = timestamp - self.entered
+            self.entered = None
+            self.dwells_us.append(dwell)
+            if dwell < self.min_us:
+                self.violations.append(f"{self.value} held {dwell / 1000:.1f} ms (< {self.min_us / 1000:g} ms)")
+
+    def verdict(self, now: Optional[int]) -> Optional[bool]:
+        if self.violations:
+            return False
+        # Settled once one stay has lasted min_ms (without violations every completed one has)
+        if self.dwells_us or (self.entered is not None and now is not None and now - self.entered >= self.min_us):
+            return True
+        return None
+
+    def result(self, now: Optional[int]) -> Optional[str]:
+        held_now = now - self.entered if self.entered is not None and now is not None else None
+        if not self.dwells_us and (held_now is None or held_now < self.min_us):
+            return f"{self.label} Failure: {self.value} never held {self.min_us / 1000:g} ms"
+        return super().result(now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dwells": len(self.dwells_us),
+                "min_dwell_ms": min(self.dwells_us) / 1000 if self.dwells_us else None}
+
+
+class PeriodRule(TimingRule):
+    """Frames of 'can_id' must arrive every 'period_ms' +/- 'tolerance_pct'."""
+
+    label = "Period"
+
+    def __init__(self, signal: Optional[str], spec: Dict[str, Any]):
+        super().__init__(None)
+        self.can_id = spec["can_id"]
+        self.period_us = spec["period_ms"] * 1000
+        tolerance = self.period_us * spec.get("tolerance_pct", 10) / 100.0
+        self.low_us, self.high_us = self.period_us - tolerance, self.period_us + tolerance
+        self.max_violations = spec.get("max_violations", 0)
+        self.min_intervals = spec.get("min_intervals", 100)
+        self.last: Optional[int] = None
+        self.count = 0
+        self.min_us = self.max_us = None
+        self.total_us = 0
+        self.violation_count = 0
+
+    @property
+    def can_ids(self) -> Tuple[int, ...]:
+        return (self.can_id,)
+
+    def on_frame(self, can_id: int, data: bytes, timestamp: int):
+        last, self.last = self.last, timestamp
+        if last is None:
+            return
+        dt = timestamp - last
+        self.count += 1
+        self.total_us += dt
+        if self.min_us is None or dt < self.min_us:
+            self.min_us = dt
+        if self.max_us is None or dt > self.max_us:
+            self.max_us = dt
+        if not self.low_us <= dt <= self.high_us:
+            self.violation_count += 1
+            if len(self.violations) < 5:
+                self.violations.append(f"0x{self.can_id:X} interval {dt / 1000:.2f} ms")
+
+    def verdict(self, now: Optional[int]) -> Optional[bool]:
+        if self.violation_count > self.max_violations:
+            return False
+        return True if self.count >= self.min_intervals else None
+
+    def result(self, now: Optional[int]) -> Optional[str]:
+        if not self.count:
+            return f"{self.label} Failure: fewer than 2 frames of 0x{self.can_id:X}"
+        if self.violation_count > self.max_violations:
+            return (f"{self.label} Failure: {self.violation_count}/{self.count} intervals of 0x{self.can_id:X} "
+                    f"outside {self.low_us / 1000:g}-{self.high_us / 1000:g} ms "
+                    f"(min {self.min_us / 1000:.2f}, max {self.max_us / 1000:.2f} ms)")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"intervals": self.count, "violations": self.violation_count,
+                "min_ms": self.min_us / 1000 if self.min_us is not None else None,
+                "max_ms": self.max_us / 1000 if self.max_us is not None else None,
+                "mean_ms": self.total_us / self.count / 1000 if self.count else None}
+
+
+class TransitionLatencyRule(_TriggeredRule):
+    """
+    Percentile of the from -> to transition time must stay below 'max_ms'. Measured from leaving
+    'from' to reaching 'to' (covers intermediate states), or from the trigger when one is given.
+    """
+
+    label = "Transition Latency"
+
+    def __init__(self, signal: str, spec: Dict[str, Any]):
+        super().__init__(signal, spec.get("trigger"))
+        self.from_value = spec["from"]
+        self.to_value = spec["to"]
+        self.pct = spec.get("percentile", 95)
+        self.max_us = spec["max_ms"] * 1000
+        self.min_samples = spec.get("min_samples", 1)
+        self.current = None
+        self.start: Optional[int] = None
+        self.latencies_us: List[int] = []
+
+    def triggered(self, timestamp: int):
+        if self.current == self.from_value:
+            self.start = timestamp
+
+    def on_signal(self, signal_name: str, value: Any, timestamp: int):
+        if self.trigger is not None and self.trigger.matches_signal(signal_name, value):
+            self.triggers_seen += 1
+            self.triggered(timestamp)
+        if signal_name != self.signal:
+            return
+        previous, self.current = self.current, value
+        if value == self.from_value:
+            self.start = None
+        elif previous == self.from_value and self.trigger is None:
+            self.start = timestamp
+        if value == self.to_value and self.start is not None:
+            self.latencies_us.append(timestamp - self.start)
+            self.start = None
+
+    def verdict(self, now: Optional[int]) -> Optional[bool]:
+        # A percentile moves both ways with every new sample: settle on a pass only, the end-of-test
+        # result decides a failure
+        if len(self.latencies_us) < self.min_samples:
+            return None
+        return True if percentile(sorted(self.latencies_us), self.pct) <= self.max_us else None
+
+    def result(self, now: Optional[int]) -> Optional[str]:
+        if len(self.latencies_us) < self.min_samples:
+            return (f"{self.label} Failure: {len(self.latencies_us)} {self.from_value}->{self.to_value} "
+                    f"transitions (need {self.min_samples})")
+        value = percentile(sorted(self.latencies_us), self.pct)
+        if value > self.max_us:
+            return (f"{self.label} Failure: {self.from_value}->{self.to_value} p{self.pct:g} "
+                    f"{value / 1000:.1f} ms > {self.max_us / 1000:g} ms")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_us)
+        value = percentile(ordered, self.pct)
+        return {"samples": len(ordered), f"p{self.pct:g}_ms": value / 1000 if value is not None else None,
+                "max_ms": ordered[-1] / 1000 if ordered else None}
+
+
+# Validation YAML key -> rule class
+TIMING_RULES = {
+    "deadline": DeadlineRule,
+    "dwell": DwellRule,
+    "period": PeriodRule,
+    "transition_latency": TransitionLatencyRule,
+}
+
+
+def build_timing_rules(test: Dict[str, Any]) -> List[TimingRule]:
+    """Timing rules configured on one validation test (empty for value-only tests)."""
+    return [rule_class(test.get("signal"), test[key]) for key, rule_class in TIMING_RULES.items() if key in test]
@@ -2,9 +2,10 @@
 
 import threading
 import queue
-from business.can_decoder import CANDecoder
+from business.can_decoder import CANDecoder, PayloadChangeFilter
 from business.can_validator import Validator
 from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.can_frame_ring import unpack_frame
 # Assuming this lookup table is correctly imported from your can_fd library:
 from can_fd.canfd.canfd_enum import DLC_2_LEN
 from hardware.can.pcan_constants import *
@@ -19,15 +20,19 @@ class ValidationThread(threading.Thread):
         # Initialize the decoding and validation classes
         self.decoder = CANDecoder(decoder_cfg)
         self.validator = Validator(validation_cfg)
+        # Skips decode/feed/store when none of the configured bits changed since the last frame
+        self.change_filter = PayloadChangeFilter(self.decoder)
         self.stop_event = stop_event
         # Store the shared state object
         self.can_state_store = can_state_store
+        # Early per-test verdicts go straight to the store (and from there to CkptModel)
+        self.validator.on_verdict = can_state_store.report_verdict
 
     def run(self):
         while not self.stop_event.is_set():
             try:
                 # Attempt to get a message from the queue with a timeout to check stop_event
-                msg = self.frame_queue.get(timeout=0.1)
+                msg, timestamp = unpack_frame(self.frame_queue.get(timeout=0.1))
             except queue.Empty:
                 continue
 
@@ -49,20 +54,31 @@ class ValidationThread(threading.Thread):
             # 3. Slice the data to the actual payload length and convert to bytes
             data = bytes(msg.DATA[:payload_length])
 
-            # 4. Decode Signals
+            # Timing rules need every frame (periods, request triggers, deadline expiry)
+            self.validator.on_frame(can_id, data, timestamp)
+
+            # 4. Short-circuit: unconfigured ID, or same used bits as the previous frame of this ID
+            if not self.change_filter.changed(can_id, data):
+                continue
+
+            # 5. Decode Signals
             decoded = self.decoder.decode(can_id, data)
 
-            # 5. Process Decoded Signals (CRITICAL CHANGE)
+            # 6. Process Decoded Signals (CRITICAL CHANGE)
             for sig, val in decoded.items():
 
                 if sig in ["Vehicle_Power_Mode", "Windshield_Wiper_Switch_Status"]:
                     print(f"   [ValidationThread] Decoded: {sig} = {val}")
 
                 # Feed the validator for history and final result checks
-                self.validator.feed(sig, val)
+                self.validator.feed(sig, val, timestamp)
 
                 # Feed the shared state store for real-time monitoring and UI updates
-                self.can_state_store.update_state(sig, val)
+                self.can_state_store.update_state(sig, val, timestamp)
+
+    def get_decode_stats(self):
+        """Frames decoded vs. skipped by the payload-change short-circuit."""
+        return self.change_filter.stats()
 
     def get_results(self):
         """Returns the final validation results aggregated over the test run."""
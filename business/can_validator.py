@@ -1,28 +1,165 @@
+from collections import deque
+
 import yaml
 
+from business.can_timing_rules import DeadlineRule, build_timing_rules
+
 class Validator:
+    # A required final value / in-range value must be held this long before an early PASS verdict
+    FINAL_HOLD_MS = 200
+    # Frame-time interval between re-evaluations of undecided tests (hold times, period counts)
+    VERDICT_CHECK_US = 10_000
+    # Value changes kept per signal (a chattering signal over a long soak must not grow without bound)
+    MAX_TRANSITIONS = 1024
+
     def __init__(self, validation_config_path: str):
         with open(validation_config_path, "r") as f:
             cfg = yaml.safe_load(f)
         self.tests = cfg.get("tests", [])
         self.state_history = {}  # signal_name -> set of seen values
         self.last_value = {}     # signal_name -> last seen value
+        self.first_seen = {}     # signal_name -> {value: timestamp (us) the value was first seen}
+        self.transitions = {}    # signal_name -> deque of the last MAX_TRANSITIONS (timestamp (us), value) changes
+
+        # Time-aware rules (deadline / dwell / period / transition_latency), fed incrementally
+        self.now = None          # latest frame timestamp (us) seen
+        self.timing_rules = {test["name"]: build_timing_rules(test) for test in self.tests}
+        self._rules_by_signal = {}
+        self._rules_by_id = {}
+        self._deadline_rules = []
+        for rules in self.timing_rules.values():
+            for rule in rules:
+                for signal_name in rule.signals:
+                    self._rules_by_signal.setdefault(signal_name, []).append(rule)
+                for can_id in rule.can_ids:
+                    self._rules_by_id.setdefault(can_id, []).append(rule)
+                if isinstance(rule, DeadlineRule):
+                    self._deadline_rules.append(rule)
+
+        # Incremental verdicts: test name -> None (undecided) / True / False. An early verdict is
+        # provisional: validate_all() judges everything seen until the end and overwrites it
+        self.verdicts = {test["name"]: None for test in self.tests}
+        self.decided_at = {}     # test name -> timestamp (us) the verdict was decided
+        self.on_verdict = None   # callable(test_name, passed, reason), called from the feeding thread
+        self._tests_by_signal = {}
+        for test in self.tests:
+            for signal_name in {test.get("signal")} | {s for r in self.timing_rules[test["name"]] for s in r.signals}:
+                if signal_name:
+                    self._tests_by_signal.setdefault(signal_name, []).append(test)
+        self._undecided = list(self.tests)
+        self._next_check = None
+
+    @property
+    def all_decided(self):
+        """True once every test has an early verdict (the sequence need not wait any longer; call validate_all())."""
+        return not self._undecided
+
+    @property
+    def frame_ids(self):
+        """CAN IDs the timing rules watch at frame level (periods, request triggers)."""
+        return set(self._rules_by_id)
+
+    def on_frame(self, can_id, data, timestamp):
+        """Every received frame, before the payload-change short-circuit: periods, triggers, deadlines."""
+        if timestamp is None:
+            return
+        self.now = timestamp
+        rules = self._rules_by_id.get(can_id)
+        if rules:
+            for rule in rules:
+                rule.on_frame(can_id, data, timestamp)
+        for rule in self._deadline_rules:
+            if rule.pending:
+                rule.check(timestamp)
+        if self._undecided and (self._next_check is None or timestamp >= self._next_check):
+            self._next_check = timestamp + self.VERDICT_CHECK_US
+            self._evaluate(self._undecided)
 
     # def feed(self, signal_name, value):
     #     """Store new signal observation"""
     #     self.state_history.setdefault(signal_name, set()).add(value)
     #     self.last_value[signal_name] = value
 
-    def feed(self, signal_name, value):
+    def feed(self, signal_name, value, timestamp=None):
+        """timestamp: hardware receive time (us) of the frame the value was decoded from, if known."""
 
         if signal_name not in self.state_history:
             self.state_history[signal_name] = set()
+            self.first_seen[signal_name] = {}
+            self.transitions[signal_name] = deque(maxlen=self.MAX_TRANSITIONS)
 
         signal_set = self.state_history[signal_name]
-        signal_set.add(value)
+        if value not in signal_set:
+            signal_set.add(value)
+            self.first_seen[signal_name][value] = timestamp
+
+        if signal_name not in self.last_value or self.last_value[signal_name] != value:
+            self.transitions[signal_name].append((timestamp, value))
 
         self.last_value[signal_name] = value
 
+        if timestamp is not None and (self.now is None or timestamp > self.now):
+            self.now = timestamp
+        rules = self._rules_by_signal.get(signal_name)
+        if rules and timestamp is not None:
+            for rule in rules:
+                rule.on_signal(signal_name, value, timestamp)
+
+        tests = self._tests_by_signal.get(signal_name)
+        if tests and self._undecided:
+            self._evaluate(tests)
+
+    def _held_us(self, signal_name):
+        """How long the signal has held its current value (None without timestamps)."""
+        changes = self.transitions.get(signal_name)
+        if not changes or changes[-1][0] is None or self.now is None:
+            return None
+        return self.now - changes[-1][0]
+
+    def _test_verdict(self, test):
+        """Early verdict of one test: False as soon as a part fails for good, True once every part passed."""
+        sig = test.get("signal")
+        parts = []
+        if "required_states" in test:
+            parts.append(set(test["required_states"]) <= self.state_history.get(sig, set()) or None)
+        if "require_final" in test or "range" in test:
+            held = self._held_us(sig)
+            settled = held is not None and held >= test.get("final_hold_ms", self.FINAL_HOLD_MS) * 1000
+            val = self.last_value.get(sig)
+            if "require_final" in test:
+                parts.append((settled and val == test["require_final"]) or None)
+            if "range" in test:
+                in_range = isinstance(val, (int, float)) and test["range"]["min"] <= val <= test["range"]["max"]
+                parts.append((settled and in_range) or None)
+        for rule in self.timing_rules[test["name"]]:
+            parts.append(rule.verdict(self.now))
+
+        if any(part is False for part in parts):
+            return False
+        if parts and all(part is True for part in parts):
+            return True
+        return None
+
+    def _evaluate(self, tests):
+        for test in tests:
+            name = test["name"]
+            if self.verdicts[name] is not None:
+                continue
+            passed = self._test_verdict(test)
+            if passed is None:
+                continue
+            self.verdicts[name] = passed
+            self.decided_at[name] = self.now
+            self._undecided = [t for t in self._undecided if t["name"] != name]
+            if self.on_verdict is not None:
+                reason = "PASS" if passed else ";".join(
+                    rule.result(None) or "" for rule in self.timing_rules[name] if rule.verdict(self.now) is False)
+                self.on_verdict(name, passed, reason)
+
+    def get_transitions(self, signal_name):
+        """[(timestamp (us), value)] for the last MAX_TRANSITIONS value changes of a signal, oldest first."""
+        return list(self.transitions.get(signal_name, []))
+
 
 
     def validate_all(self):
@@ -30,7 +167,7 @@ class Validator:
         results = []
 
         for test in self.tests:
-            sig = test["signal"]
+            sig = test.get("signal")
             result = {"test": test["name"], "pass": True, "reason": "PASS"} # Initialize to PASS
 
             # Use a list to hold all failure messages for this specific test
@@ -71,6 +208,15 @@ class Validator:
                 if is_out_of_range:
                     failure_reasons.append(reason_message)
 
+            # --- 4. Timing Rules (deadline / dwell / period / transition latency) ---
+            rules = self.timing_rules.get(test["name"])
+            if rules:
+                for rule in rules:
+                    reason = rule.result(self.now)
+                    if reason:
+                        failure_reasons.append(reason)
+                result["timing"] = {rule.label: rule.stats() for rule in rules}
+
             # --- Finalize Result ---
             if failure_reasons:
                 result["pass"] = False
@@ -79,5 +225,13 @@ class Validator:
             else:
                 result["reason"] = "PASS" # Keep explicit PASS status
 
+            # The final result overrides a provisional early verdict (e.g. the value moved after the hold)
+            if self.verdicts.get(test["name"]) != result["pass"]:
+                self.verdicts[test["name"]] = result["pass"]
+                self.decided_at[test["name"]] = self.now
+                if self.on_verdict is not None:
+                    self.on_verdict(test["name"], result["pass"], result["reason"])
+
             results.append(result)
+        self._undecided = [t for t in self._undecided if self.verdicts[t["name"]] is None]
         return results
\ No newline at end of file
@@ -1,7 +1,7 @@
 # business/ckpt/ckpt_model.py
 
 import time
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 import threading
 import logging
 from PySide6.QtCore import QObject, Signal, QThread
@@ -12,6 +12,7 @@ from business.workers.can_state_store import CanStateStore
 from business.workers.can_test_worker import CanTestWorker
 from can_fd.canfd.canfd_enum import CANDLC
 from hardware.can.PCANBasic import PCANBasic, TPCANMsgFD
+from hardware.can.virtual_pcan import VirtualPCANBasic
 from hardware.can.pcan_constants import PCANCh, bitrate_fd_500K_2Mb, PCAN_ALLOW_ECHO_FRAMES, PCAN_PARAMETER_ON, \
     PCAN_ERROR_OK, PCAN_MESSAGE_EXTENDED, PCAN_MESSAGE_FD, PCAN_MESSAGE_STANDARD, PCAN_MESSAGE_BRS
 
@@ -39,8 +40,43 @@ class CkptModel(QObject):
     # Signal to update the lbl_Wiper_CurrentState label text (only text update needed)
     sig_wiper_current_state_update = Signal(str)
 
+    # RX frame ring of a started CAN worker (USE_CAN_FRAME_RING), for the raw trace view
+    sig_can_frame_ring_ready = Signal(object)
+
     BYPASS_WH_TEST: bool = True
 
+    # Program the PCAN acceptance filter from the decode config (only decoded IDs + UDS responses)
+    USE_CAN_ACCEPTANCE_FILTER: bool = False
+
+    # Bulk-drain received frames into a preallocated ring buffer (high FD bus load)
+    USE_CAN_FRAME_RING: bool = False
+
+    # RX thread sleeps on the PCAN receive event instead of polling every 1 ms
+    USE_CAN_RECEIVE_EVENT: bool = False
+
+    # CAN trace written by a background thread instead of the per-frame text logger:
+    # None (text log), "ctrace" (compact binary), "asc" / "blf" (Vector), "mf4" (ASAM MDF4)
+    CAN_TRACE_FORMAT: Optional[str] = None
+
+    # Rolling trace segments (needs CAN_TRACE_FORMAT), e.g.
+    # {"max_bytes": 256 << 20, "max_seconds": 3600, "compression": "gzip", "max_total_bytes": 20 << 30}
+    CAN_TRACE_ROTATION: Optional[Dict[str, Any]] = None
+
+    # Regression runs without hardware: replay a recorded trace (.txt / .ctrace / manifest / .asc / .blf / .mf4)
+    # into the decode/validation pipeline; speed None = as fast as possible, 1.0 = recorded timing
+    CAN_REPLAY_TRACE: Optional[str] = None
+    CAN_REPLAY_SPEED: Optional[float] = None
+
+    # In-process virtual PCAN (no DLL / device): echo frames, scripted UDS responses, optional random bus load
+    USE_VIRTUAL_PCAN: bool = False
+    VIRTUAL_PCAN_BUS_LOAD_FPS: int = 0
+
+    # Finish the CAN test as soon as every validation test has an early verdict (no fixed wait)
+    CAN_STOP_ON_VERDICT: bool = False
+
+    # Coalesce non-critical CAN signal updates into one batch per UI frame (e.g. 30-60 Hz); None = per change
+    CAN_UI_UPDATE_HZ: Optional[float] = None
+
     # Map raw signal states to UI object names (for the indicator logic)
     STATE_TO_OBJECT_NAME = {
         # Power Mode States
@@ -71,7 +107,9 @@ class CkptModel(QObject):
         self.t_tester_present = None
         # -------------------------------------------------
 
-        self.can_state_store = CanStateStore()
+        # The "once hit" indicators must see every wiper state, so it is never coalesced
+        self.can_state_store = CanStateStore(update_rate_hz=self.CAN_UI_UPDATE_HZ,
+                                             critical_signals=(self.WIPER_SIGNAL_NAME,))
 
         # Tracking dictionary for the "Never Hit = Yellow, Once Hit = Green" logic
         self.indicator_hit_status: Dict[str, bool] = {
@@ -85,6 +123,7 @@ class CkptModel(QObject):
         # Connect the state store to the model's signal for UI/logic updates
         self.can_state_store.sig_power_mode_changed.connect(self._handle_pm_state_change)
         self.can_state_store.sig_signal_updated.connect(self._handle_generic_signal_update)
+        self.can_state_store.sig_test_verdict.connect(self._handle_test_verdict)
 
     def _initialize_pcan(self) -> bool:
         """Initializes PCANBasic and stores the object."""
@@ -92,7 +131,9 @@ class CkptModel(QObject):
             return True
 
         try:
-            self.pcan = PCANBasic()
+            self.pcan = VirtualPCANBasic() if self.USE_VIRTUAL_PCAN else PCANBasic()
+            if self.USE_VIRTUAL_PCAN and self.VIRTUAL_PCAN_BUS_LOAD_FPS:
+                self.pcan.add_random_load(self.VIRTUAL_PCAN_BUS_LOAD_FPS)
             self.pcan.InitializeFD(self.channel, bitrate_fd_500K_2Mb)
             self.pcan.SetValue(self.channel, PCAN_ALLOW_ECHO_FRAMES, PCAN_PARAMETER_ON)
             time.sleep(0.5)
@@ -321,6 +362,12 @@ class CkptModel(QObject):
         # Update indicators and emit sig_indicator_status_update
         self._update_indicators(filtered_pm_states, new_state, 'POWER_MODE')
 
+    def _handle_test_verdict(self, test_name: str, passed: bool, reason: str):
+        """Relays a per-test verdict from the CAN validator (an early one is replaced by the final one)."""
+        print(f" CKPT Model (MAIN THREAD): Verdict {test_name}: {'PASS' if passed else 'FAIL'} {reason}")
+        self.test_statuses[test_name] = passed
+        self.sig_test_progress.emit(f"[CAN_DECODE_TEST] {test_name}: {'PASS' if passed else 'FAIL'}", 50)
+
     def check_pn_and_get_program_name(self, pn: str) -> None:
         """PHASE 1: Quick check of PN against the map and displays status."""
         print(f"CKPT Model: PHASE 1 - Checking PN: {pn}")
@@ -393,6 +440,8 @@ class CkptModel(QObject):
             return
 
         print(f"CKPT Model: PHASE 2 - Gathering config file paths for PN: {pn}")
+        self.test_statuses.clear()
+        self.can_state_store.clear_verdicts()
         self.sig_test_progress.emit("Mapping configuration files to test modules...", 5)
 
         if not self._initialize_pcan():
@@ -446,6 +495,14 @@ class CkptModel(QObject):
                         can_state_store=self.can_state_store,
                         decoder_cfg=decoder_cfg,
                         validation_cfg=validation_cfg,
+                        use_acceptance_filter=self.USE_CAN_ACCEPTANCE_FILTER,
+                        use_frame_ring=self.USE_CAN_FRAME_RING,
+                        use_receive_event=self.USE_CAN_RECEIVE_EVENT,
+                        trace_format=self.CAN_TRACE_FORMAT,
+                        trace_rotation=self.CAN_TRACE_ROTATION,
+                        replay_trace=self.CAN_REPLAY_TRACE,
+                        replay_speed=self.CAN_REPLAY_SPEED,
+                        stop_on_verdict=self.CAN_STOP_ON_VERDICT,
                         parent=self
                     )
 
@@ -455,6 +512,8 @@ class CkptModel(QObject):
                     self.active_workers[worker_id] = worker
                     worker.start()
                     print(f"CKPT Model: Started CAN Monitoring/Decoding Worker ID: {worker_id}")
+                    if worker.frame_ring is not None:
+                        self.sig_can_frame_ring_ready.emit(worker.frame_ring)
 
                     # Stop here to focus on CAN monitoring before running other tests
                     break
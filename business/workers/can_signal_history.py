@@ -0,0 +1,142 @@
+# business/workers/can_signal_history.py
+
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy only speeds up decimate(); the ring itself is stdlib arrays
+    np = None
+
+
+class SignalHistory:
+    """
+    Fixed-size history of one decoded signal: preallocated timestamp (us) and value arrays used
+    as a ring, so append is O(1) and memory stays the same however long the station runs.
+
+    The first sample fixes the kind of history. Numeric values are stored as floats; a later
+    text value is stored as NaN (a gap). Text states (stateencode, rawbyte) are stored as the
+    index into self.labels, later numbers as their str(); more than MAX_LABELS distinct texts
+    are stored as NaN.
+    """
+
+    MAX_LABELS = 256
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.timestamps = array("q", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.count = 0  # total samples appended; slot = count % capacity
+        self.labels: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        self._text: Optional[bool] = None  # set by the first sample
+        self.lock = threading.Lock()
+
+    @property
+    def is_numeric(self) -> bool:
+        """False if the first sample was a text value."""
+        return not self._text
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def _encode(self, value: Any) -> float:
+        numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if self._text is None:
+            self._text = not numeric
+        if not self._text:
+            return float(value) if numeric else float("nan")
+        text = str(value)
+        index = self._label_index.get(text)
+        if index is None:
+            if len(self.labels) >= self.MAX_LABELS:
+                return float("nan")
+            index = self._label_index[text] = len(self.labels)
+            self.labels.append(text)
+        return float(index)
+
+    def label(self, encoded: float) -> Any:
+        """Inverse of the value encoding for one stored value."""
+        if self.is_numeric or encoded != encoded:
+            return encoded
+        return self.labels[int(encoded)]
+
+    def append(self, timestamp: Optional[int], value: Any):
+        """timestamp: hardware time in us; None falls back to the host monotonic clock."""
+        if timestamp is None:
+            timestamp = time.monotonic_ns() // 1000
+        with self.lock:
+            slot = self.count % self.capacity
+            self.timestamps[slot] = timestamp
+            self.values[slot] = self._encode(value)
+            self.count += 1
+
+    def arrays(self) -> Tuple[array, array]:
+        """Copies of (timestamps, values), oldest first."""
+        with self.lock:
+            if self.count <= self.capacity:
+                return self.timestamps[:self.count], self.values[:self.count]
+            head = self.count % self.capacity
+            return (self.timestamps[head:] + self.timestamps[:head],
+                    self.values[head:] + self.values[:head])
+
+    def latest(self) -> Optional[Tuple[int, Any]]:
+        with self.lock:
+            if not self.count:
+                return None
+            slot = (self.count - 1) % self.capacity
+            return self.timestamps[slot], self.label(self.values[slot])
+
+    def value_at(self, t: int) -> Optional[float]:
+        """Stored (encoded) value held at time t: the last sample at or before t, None if older than the ring."""
+        timestamps, values = self.arrays()
+        index = bisect_right(timestamps, t)
+        return values[index - 1] if index else None
+
+    def decimate(self, t0: Optional[int] = None, t1: Optional[int] = None,
+                 buckets: int = 1000) -> List[Tuple[int, float, float]]:
+        """
+        Min/max per time bucket over [t0, t1] for display: at most `buckets` (t_start, min, max)
+        tuples, so spikes survive however many samples fall into one pixel column. Empty buckets
+        are left out (the signal held its previous value).
+        """
+        timestamps, values = self.arrays()
+        if not timestamps:
+            return []
+        t0 = timestamps[0] if t0 is None else t0
+        t1 = timestamps[-1] if t1 is None else t1
+        width = max(1, -(-(t1 - t0 + 1) // buckets))
+
+        if np is not None:
+            ts = np.frombuffer(timestamps, dtype=np.int64)
+            vs = np.frombuffer(values, dtype=np.float64)
+            lo = int(np.searchsorted(ts, t0, side="left"))
+            hi = int(np.searchsorted(ts, t1, side="right"))
+            if lo >= hi:
+                return []
+            ts, vs = ts[lo:hi], vs[lo:hi]
+            bucket = (ts - t0) // width
+            starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            mins = np.fmin.reduceat(vs, starts)
+            maxs = np.fmax.reduceat(vs, starts)
+            return list(zip((t0 + bucket[starts] * width).tolist(), mins.tolist(), maxs.tolist()))
+
+        result = []
+        current = None
+        for t, v in zip(timestamps, values):
+            if t < t0 or t > t1:
+                continue
+            b = (t - t0) // width
+            if current is None or b != current[0]:
+                if current is not None:
+                    result.append((t0 + current[0] * width, current[1], current[2]))
+                current = [b, v, v]
+            else:
+                current[1] = min(current[1], v)
+                current[2] = max(current[2], v)
+        if current is not None:
+            result.append((t0 + current[0] * width, current[1], current[2]))
+        return result
@@ -1,46 +1,212 @@
 # business/workers/can_state_store.py
 
 import threading
-from typing import Dict, Any
+import time
+from types import MappingProxyType
+from typing import Dict, Any, Iterable, Mapping, NamedTuple, Optional, Tuple
 
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from business.workers.can_signal_history import SignalHistory
+
+
+class StateSnapshot(NamedTuple):
+    """Immutable view of every signal at one version; never modified after it is published."""
+    version: int
+    states: Mapping[str, Any]
+    timestamps: Mapping[str, Optional[int]]
+
+
+EMPTY_SNAPSHOT = StateSnapshot(0, MappingProxyType({}), MappingProxyType({}))
 
 
 class CanStateStore(QObject):
     """
     Thread-safe storage for the latest decoded CAN signal states.
     Emits signals for critical changes (Power Mode, Wiper Status).
+
+    With an update rate set (set_update_rate, main thread), non-critical changes are coalesced:
+    the decode thread only marks signals dirty and a QTimer publishes one batch per UI frame
+    (latest value per signal), so a chattering signal cannot flood the GUI event loop.
+
+    States are published copy-on-write: every change builds a new StateSnapshot with the next
+    version number. snapshot() / get_state() just read the current reference (no lock), so the UI
+    and sequence logic never contend with the decode thread; wait_for_version() and
+    wait_for_value() block until a newer snapshot satisfies them.
+
+    Every change is also appended to a fixed-size per-signal SignalHistory (get_history) for
+    plotting and failure analysis.
     """
 
+    # Signals whose transitions are always emitted immediately, even when coalescing: state
+    # indicators must see every value, however briefly it was held
+    CRITICAL_SIGNALS = frozenset({"Vehicle_Power_Mode", "Windshield_Wiper_Switch_Status"})
+
     sig_power_mode_changed = Signal(str)
     # FIX: Replace the generic 'Any' with the base type 'object' for the signal definition.
     sig_signal_updated = Signal(str, object)
+    # Early per-test verdict from the incremental Validator: (test name, passed, reason)
+    sig_test_verdict = Signal(str, bool, str)
+    # Coalesced mode: {signal name: latest value} of everything that changed since the last UI frame
+    sig_signals_batch = Signal(dict)
 
-    def __init__(self):
+    def __init__(self, update_rate_hz: Optional[float] = None, history_size: int = 4096,
+                 critical_signals: Iterable[str] = ()):
+        """critical_signals: more signals to emit on every change (e.g. those driving indicators)."""
         super().__init__()
-        self.latest_states: Dict[str, Any] = {}
+        self.critical_signals = self.CRITICAL_SIGNALS | frozenset(critical_signals)
+        self._snapshot = EMPTY_SNAPSHOT
+        self.test_verdicts: Dict[str, bool] = {}
+        # Serializes writers only; readers use the published snapshot
         self.lock = threading.Lock()
+        # Woken on every publish while someone waits in wait_for_version / wait_for_value
+        self._published = threading.Condition()
+        self._waiters = 0
+
+        # Bounded change history per signal (history_size samples each, 0 = disabled)
+        self.history_size = history_size
+        self.histories: Dict[str, SignalHistory] = {}
+
+        # Coalescing state (see set_update_rate)
+        self._dirty: Dict[str, Any] = {}
+        self._flush_timer: Optional[QTimer] = None
+        self.updates_coalesced = 0
+        if update_rate_hz:
+            self.set_update_rate(update_rate_hz)
+
+    @property
+    def latest_states(self) -> Mapping[str, Any]:
+        """Read-only mapping of the current values."""
+        return self._snapshot.states
 
-    def update_state(self, signal_name: str, value: Any):
+    @property
+    def latest_timestamps(self) -> Mapping[str, Optional[int]]:
+        """Hardware receive time (us) of the frame that set each current value (None if unknown)."""
+        return self._snapshot.timestamps
+
+    def set_update_rate(self, rate_hz: Optional[float]):
+        """
+        Batches non-critical updates into one emission per 1/rate_hz (e.g. 30-60 Hz).
+        None / 0 returns to one emission per change. Call from the thread owning the store (GUI).
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+            self._flush_timer = None
+            self._flush_dirty()
+        if rate_hz:
+            self._flush_timer = QTimer(self)
+            self._flush_timer.setInterval(max(1, int(1000 / rate_hz)))
+            self._flush_timer.timeout.connect(self._flush_dirty)
+            self._flush_timer.start()
+
+    def update_state(self, signal_name: str, value: Any, timestamp: Optional[int] = None):
         """Called by the background ValidationThread to update a signal state."""
         with self.lock:
+            current = self._snapshot
             # Only update and signal if the value has actually changed
-            if self.latest_states.get(signal_name) == value:
+            if current.states.get(signal_name) == value:
                 return
 
-            self.latest_states[signal_name] = value
+            states = dict(current.states)
+            states[signal_name] = value
+            timestamps = dict(current.timestamps)
+            timestamps[signal_name] = timestamp
+            self._snapshot = StateSnapshot(current.version + 1, MappingProxyType(states),
+                                           MappingProxyType(timestamps))
+
+            if self.history_size:
+                history = self.histories.get(signal_name)
+                if history is None:
+                    history = self.histories[signal_name] = SignalHistory(self.history_size)
+                history.append(timestamp, value)
+
+            # Coalesced: the UI timer publishes the latest value with the next batch
+            coalesce = self._flush_timer is not None and signal_name not in self.critical_signals
+            if coalesce:
+                if signal_name in self._dirty:
+                    self.updates_coalesced += 1
+                self._dirty[signal_name] = value
+
+        if self._waiters:
+            with self._published:
+                self._published.notify_all()
 
         # Emit QSignals in the main thread context
         if signal_name == "Vehicle_Power_Mode":
             self.sig_power_mode_changed.emit(str(value))
 
+        if coalesce:
+            return
+
         # Emit general update for any signal
         # Note: We emit the actual 'value' which can be str, int, float, etc.
         self.sig_signal_updated.emit(signal_name, value)
 
+    def _flush_dirty(self):
+        """Timer slot (GUI thread): one batch plus per-signal updates for the existing slots."""
+        with self.lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+        self.sig_signals_batch.emit(dirty)
+        for signal_name, value in dirty.items():
+            self.sig_signal_updated.emit(signal_name, value)
+
+    def report_verdict(self, test_name: str, passed: bool, reason: str):
+        """Called by the ValidationThread the moment a test's verdict is decided."""
+        with self.lock:
+            self.test_verdicts[test_name] = passed
+        self.sig_test_verdict.emit(test_name, passed, reason)
 
+    def clear_verdicts(self):
+        """Forget the verdicts of the previous test run."""
+        with self.lock:
+            self.test_verdicts.clear()
 
     def get_state(self, signal_name: str) -> Any:
         """Called by CkptModel/Controller to check current state."""
-        with self.lock:
-            return self.latest_states.get(signal_name)
\ No newline at end of file
+        return self._snapshot.states.get(signal_name)
+
+    def get_state_with_timestamp(self, signal_name: str) -> Tuple[Any, Optional[int]]:
+        """(current value, hardware timestamp in us of the frame that set it)."""
+        snapshot = self._snapshot
+        return snapshot.states.get(signal_name), snapshot.timestamps.get(signal_name)
+
+    def get_history(self, signal_name: str) -> Optional[SignalHistory]:
+        """Change history of one signal (None before its first value or with history disabled)."""
+        return self.histories.get(signal_name)
+
+    def snapshot(self) -> StateSnapshot:
+        """Consistent view of all signals at the current version."""
+        return self._snapshot
+
+    def _wait_for(self, predicate, timeout: Optional[float]) -> Optional[StateSnapshot]:
+        snapshot = self._snapshot
+        if predicate(snapshot):
+            return snapshot
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._published:
+            self._waiters += 1
+            try:
+                while True:
+                    snapshot = self._snapshot
+                    if predicate(snapshot):
+                        return snapshot
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._published.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def wait_for_version(self, version: int, timeout: Optional[float] = None) -> Optional[StateSnapshot]:
+        """First snapshot newer than version, or None on timeout."""
+        return self._wait_for(lambda snap: snap.version > version, timeout)
+
+    def wait_for_value(self, signal_name: str, value: Any,
+                       timeout: Optional[float] = None) -> Optional[StateSnapshot]:
+        """
+        Snapshot in which signal_name == value (possibly the current one), or None on timeout.
+        Meant for states that persist: a value replaced before the waiter wakes up can be missed.
+        """
+        return self._wait_for(lambda snap: snap.states.get(signal_name) == value, timeout)
\ No newline at end of file
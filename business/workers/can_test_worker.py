@@ -2,14 +2,19 @@
 
 import threading, time, logging
 import queue
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional
 
 from PySide6.QtCore import QThread, Signal
 from hardware.can.PCANBasic import PCANBasic
 from hardware.can.pcan_constants import PCANCh
 from hardware.can.can_logger import setup_can_logger
-from hardware.can.can_workers import rx_monitor
+from hardware.can.can_binary_trace import setup_trace_writer
+from hardware.can.can_workers import rx_monitor, rx_monitor_ring, apply_acceptance_filter, UDS_RESPONSE_IDS
+from hardware.can.can_frame_ring import CanFrameRing
+from hardware.can.can_frame_bus import CanFrameBus, CanBusSubscriber
+from hardware.can.can_replay import replay_monitor
 from business.can_validation_thread import ValidationThread
+from business.can_signal_monitor_worker import CanSignalMonitorWorker
 from business.workers.can_state_store import CanStateStore
 
 logger = logging.getLogger(__name__)
@@ -24,8 +29,13 @@ class CanTestWorker(QThread):
     sig_progress_updated = Signal(str, int)
     sig_test_finished = Signal(bool, str)
 
+    REPLAY_QUEUE_SIZE = 10_000
+
     def __init__(self, pcan_instance: PCANBasic, can_state_store: CanStateStore, decoder_cfg: str,
-                 validation_cfg: str, parent=None):
+                 validation_cfg: str, use_acceptance_filter: bool = False, use_frame_ring: bool = False,
+                 use_receive_event: bool = False, trace_format: Optional[str] = None,
+                 trace_rotation: Optional[Dict[str, Any]] = None, replay_trace: Optional[str] = None,
+                 replay_speed: Optional[float] = None, stop_on_verdict: bool = False, parent=None):
         super().__init__(parent)
 
         # Receives the initialized PCAN object from the CkptModel
@@ -33,33 +43,57 @@ class CanTestWorker(QThread):
         self.can_state_store = can_state_store
         self.decoder_cfg = decoder_cfg
         self.validation_cfg = validation_cfg
+        # Only pull decoded IDs + UDS responses off the bus (trace then holds only those IDs)
+        self.use_acceptance_filter = use_acceptance_filter
+        # Bulk-drain the driver into a preallocated ring instead of one ReadFD + queue.put per frame
+        self.use_frame_ring = use_frame_ring
+        # Block on the PCAN receive event instead of 1 ms sleep polling
+        self.use_receive_event = use_receive_event
+        # None: text trace via logging; "ctrace" / "asc" / "blf" / "mf4": background trace writer
+        self.trace_format = trace_format
+        # Rolling segments / compression / retention for the trace writer (see TraceRotation)
+        self.trace_rotation = trace_rotation
+        # Feed a recorded trace instead of the PCAN RX queue (None speed = as fast as possible)
+        self.replay_trace = replay_trace
+        self.replay_speed = replay_speed
+        # Finish as soon as every validation test has an early verdict instead of running until stopped
+        self.stop_on_verdict = stop_on_verdict
+        self.trace_writer = None
 
         # Internal control objects
         self.channel = PCANCh.default
         self.stop_event = threading.Event()
-        self.frame_queue = queue.Queue()
+        self.frame_ring = CanFrameRing() if use_frame_ring else None
+        # Fans frames out to any number of subscribers (see subscribe()): in ring mode the RX ring
+        # itself, in queue mode a bus the RX thread also publishes to while someone subscribed
+        self.frame_bus = CanFrameBus(self.frame_ring)
+        # A bus subscriber has the same get(timeout) contract as queue.Queue
+        if use_frame_ring:
+            self.frame_queue = self.frame_bus.subscribe("validation")
+        else:
+            # Bounded during replay, so a fast replay waits for the validator instead of buffering the trace
+            self.frame_queue = queue.Queue(maxsize=self.REPLAY_QUEUE_SIZE if replay_trace else 0)
 
         self.t_rx = None
         self.validator_thread = None
 
+    def subscribe(self, name: str, id_filter: Optional[Iterable[int]] = None) -> CanBusSubscriber:
+        """
+        Additional frame consumer (UI monitor, UDS matching, ...) that sees every frame alongside
+        the validator, in ring and in queue mode. Subscribe before start() to see every frame.
+        """
+        return self.frame_bus.subscribe(name, id_filter)
+
+    def create_signal_monitor(self, parent=None) -> CanSignalMonitorWorker:
+        """CanSignalMonitorWorker on its own bus subscription, stopped together with this worker."""
+        return CanSignalMonitorWorker(self.frame_bus, self.decoder_cfg, self.stop_event, parent)
+
     def run(self):
         # --- REMOVED: PCAN Initialization Logic ---
         # The CkptModel must now handle the initialization and error checking before starting this worker.
         self.sig_progress_updated.emit("CAN Hardware Initialized. Starting Threads...", 15)
 
-        # 1. Start RX Monitor Thread (Logging to file and queuing messages)
-        logger.info("Starting RX Monitor Thread (Logging Bus Traffic)...")
-        can_logger = setup_can_logger()
-        self.t_rx = threading.Thread(
-            target=rx_monitor,
-            # We assume the PCAN object is ready to read from
-            args=(self.pcan, self.channel, self.stop_event, can_logger, self.frame_queue),
-            daemon=True
-        )
-        self.t_rx.start()
-
-        # 2. Start CAN State Monitor/Validation Thread (Decoding and state storage)
-        logger.info("Starting Validation/Decoding Thread...")
+        # 1. Create CAN State Monitor/Validation Thread first: its decoder defines the IDs of interest
         self.validator_thread = ValidationThread(
             frame_queue=self.frame_queue,
             decoder_cfg=self.decoder_cfg,
@@ -67,16 +101,101 @@ class CanTestWorker(QThread):
             stop_event=self.stop_event,
             can_state_store=self.can_state_store
         )
+
+        # 2. Start RX Monitor Thread (Logging to file and queuing messages)
+        if self.replay_trace:
+            self._start_replay()
+        else:
+            self._start_rx_monitor()
+
+        # 3. Start Decoding and state storage
+        logger.info("Starting Validation/Decoding Thread...")
         self.validator_thread.start()
 
         self.sig_progress_updated.emit("CAN Bus Monitoring and Decoding Active.", 20)
 
         # Main loop for QThread until stopped
+        all_decided = False
         while not self.stop_event.is_set():
             self.msleep(100)
+            if self.stop_on_verdict and self.validator_thread.validator.all_decided:
+                all_decided = True
+                break
 
         # Cleanup worker threads only
         self._cleanup()
+        if all_decided:
+            self._finish_on_verdicts()
+
+    def _start_replay(self):
+        """Recorded trace -> frame queue / bus in place of the PCAN RX thread (no hardware access)."""
+        logger.info(f"Replaying CAN trace {self.replay_trace} (speed: {self.replay_speed or 'max'})...")
+        self.t_rx = threading.Thread(
+            target=replay_monitor,
+            # Ring mode publishes straight onto the bus; queue mode fills the queue and tees to the bus
+            args=(self.replay_trace, self.stop_event, logger,
+                  self.frame_bus if self.use_frame_ring else self.frame_queue),
+            kwargs={"speed": self.replay_speed, "frame_bus": None if self.use_frame_ring else self.frame_bus},
+            daemon=True
+        )
+        self.t_rx.start()
+
+    def _start_rx_monitor(self):
+        logger.info("Starting RX Monitor Thread (Logging Bus Traffic)...")
+        if self.trace_format:
+            self.trace_writer = setup_trace_writer(self.trace_format, rotation=self.trace_rotation)
+            rx_logger = logger  # frames go to the trace writer; only RX errors are logged
+        else:
+            rx_logger = setup_can_logger()
+        id_filter = None
+        if self.use_acceptance_filter:
+            wanted_ids = (set(self.validator_thread.decoder.signal_map) | set(UDS_RESPONSE_IDS)
+                          | self.validator_thread.validator.frame_ids)
+            id_filter = apply_acceptance_filter(self.pcan, self.channel, wanted_ids, logger)
+        rx_kwargs = {"id_filter": id_filter, "use_receive_event": self.use_receive_event,
+                     "trace_writer": self.trace_writer}
+        if self.use_frame_ring:
+            rx_target, rx_sink = rx_monitor_ring, self.frame_ring
+        else:
+            rx_target, rx_sink = rx_monitor, self.frame_queue
+            rx_kwargs["frame_bus"] = self.frame_bus
+        self.t_rx = threading.Thread(
+            target=self._run_rx,
+            # We assume the PCAN object is ready to read from
+            args=(rx_target, self.pcan, self.channel, self.stop_event, rx_logger, rx_sink),
+            kwargs=rx_kwargs,
+            daemon=True
+        )
+        self.t_rx.start()
+
+    def _run_rx(self, rx_target, *args, **kwargs):
+        """RX thread body: the thread that writes the trace also closes it, however it exits."""
+        trace_writer = kwargs.get("trace_writer")
+        try:
+            rx_target(*args, **kwargs)
+        finally:
+            if trace_writer is not None:
+                self._close_trace_writer(trace_writer)
+
+    @staticmethod
+    def _close_trace_writer(trace_writer):
+        trace_writer.close()
+        logger.info(f"CAN trace {trace_writer.path}: {trace_writer.frames_written} frames written, "
+                    f"{trace_writer.frames_dropped} dropped")
+
+    def _finish_on_verdicts(self):
+        """
+        All tests decided early: report the overall result without waiting for the operator. The
+        early verdicts are provisional, so the result comes from the final validation of everything
+        received until the threads stopped.
+        """
+        results = self.validator_thread.get_results()
+        failed = [result["test"] for result in results if not result["pass"]]
+        self.sig_progress_updated.emit("All CAN validation tests decided.", 100)
+        if failed:
+            self.sig_test_finished.emit(False, f"CAN validation FAIL: {', '.join(failed)}")
+        else:
+            self.sig_test_finished.emit(True, f"CAN validation PASS ({len(results)} tests)")
 
     def _cleanup(self):
         """Stops all internal threads. DOES NOT uninitialize PCANBasic."""
@@ -89,6 +208,20 @@ class CanTestWorker(QThread):
         if self.validator_thread and self.validator_thread.is_alive():
             self.validator_thread.join(1)
 
+        if self.trace_writer:
+            if self.t_rx is None:
+                # RX thread never started (setup failed): nobody else will close the trace
+                self._close_trace_writer(self.trace_writer)
+            elif self.t_rx.is_alive():
+                logger.warning("CAN RX thread still running; the trace is closed when it exits.")
+            self.trace_writer = None
+
+        if self.validator_thread:
+            logger.info(f"CAN decode stats: {self.validator_thread.get_decode_stats()}")
+
+        if self.frame_bus.has_subscribers:
+            logger.info(f"CAN frame bus stats: {self.frame_bus.stats()}")
+
         # --- REMOVED: PCAN Uninitialization Logic ---
         # self.pcan.Uninitialize(self.channel)
         # The CkptModel (the owner) is now responsible for this cleanup.
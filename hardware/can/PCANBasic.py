@@ -631,6 +631,34 @@ class PCANBasic:
             print("Exception on PCANBasic.ReadFD")
             raise
 
+    # Reads a CAN message from the receive queue of a FD capable PCAN Channel
+    # into caller-owned (preallocated) buffers
+    #
+    def ReadFDInto(
+            self,
+            Channel,
+            MessageBuffer,
+            TimestampBuffer):
+
+        """
+          Reads a CAN message from the receive queue of a FD capable PCAN Channel
+          into caller-owned buffers (no per-call ctypes allocation)
+
+        Parameters:
+          Channel         : The handle of a FD capable PCAN Channel
+          MessageBuffer   : A TPCANMsgFD structure that receives the CAN message
+          TimestampBuffer : A TPCANTimestampFD that receives the reception time
+
+        Returns:
+          A TPCANStatus error code
+        """
+        try:
+            res = self.__m_dllBasic.CAN_ReadFD(Channel, byref(MessageBuffer), byref(TimestampBuffer))
+            return TPCANStatus(res)
+        except:
+            print("Exception on PCANBasic.ReadFDInto")
+            raise
+
             # Transmits a CAN message
 
     #
@@ -796,6 +824,8 @@ class PCANBasic:
                 mybuffer = create_string_buffer(256)
             elif Parameter == PCAN_ACCEPTANCE_FILTER_11BIT or Parameter == PCAN_ACCEPTANCE_FILTER_29BIT:
                 mybuffer = c_int64(0)
+            elif Parameter == PCAN_RECEIVE_EVENT and platform.system() == 'Windows':
+                mybuffer = c_void_p(0)  # Win32 HANDLE: pointer sized, would be truncated in a c_int
             else:
                 mybuffer = c_int(0)
 
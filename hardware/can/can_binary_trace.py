@@ -0,0 +1,358 @@
+# hardware/can/can_binary_trace.py
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.can_logger import TraceRecord, TRACE_HEADER_LINES, format_can_message
+from hardware.can.can_trace_rotation import TraceRotation, open_trace_file
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+logger = logging.getLogger(__name__)
+
+# File: FILE_HEADER, then blocks of BLOCK_HEADER + nframes * RECORD
+FILE_MAGIC = b"CANTRACE"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<8sHH")          # magic, version, record size
+BLOCK_MAGIC = b"BLK0"
+BLOCK_HEADER = struct.Struct("<4sIIQQ")       # magic, payload bytes, frames, first / last host time (us)
+# Record = host time (s since epoch) + hardware timestamp (us) + the raw 72-byte TPCANMsgFD
+RECORD_HEAD = struct.Struct("<dQ")
+RECORD = struct.Struct("<dQIBB64s2x")         # same bytes, unpacked: ..., ID, MSGTYPE, DLC, DATA
+MSG_OFFSET = RECORD_HEAD.size
+
+assert RECORD.size == RECORD_HEAD.size + struct.calcsize("<IBB64s2x")
+
+
+class AsyncTraceWriter:
+    """
+    Takes trace records off the RX thread: write() only packs the frame into the current
+    in-memory block; full (or flush_interval old) blocks are handed to a background thread
+    which does all formatting and file I/O. If the disk falls behind and max_pending_blocks
+    are queued, further blocks are dropped and counted - the receive loop never waits on I/O.
+
+    Subclasses implement _open() / _write_block() / _close() for a concrete file format.
+    """
+
+    def __init__(self, path: str, block_frames: int = 4096, flush_interval: float = 0.5,
+                 max_pending_blocks: int = 64, rotation: Optional[TraceRotation] = None):
+        # With rotation, path is only the base name: segments are <stem>_0001<ext>, _0002, ...
+        self.rotation = rotation
+        self.path = rotation.start(path) if rotation else path
+        self.block_frames = block_frames
+        self.flush_interval = flush_interval
+
+        self.frames_written = 0
+        # One drop counter per thread (RX side: queue full, writer side: I/O error), summed on read
+        self._dropped_queue_full = 0
+        self._dropped_io = 0
+        self._closed = False
+        self._reset_segment()
+
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending_blocks)
+        self._new_block()
+        self._open()
+        self._thread = threading.Thread(target=self._writer_loop, name="CanTraceWriter", daemon=True)
+        self._thread.start()
+
+    @property
+    def frames_dropped(self) -> int:
+        return self._dropped_queue_full + self._dropped_io
+
+    # ---- RX thread side ----
+
+    def _new_block(self):
+        self._block = bytearray()
+        self._block_frames = 0
+        self._block_first = self._block_last = 0.0
+        self._block_started = time.monotonic()
+
+    def write(self, msg: TPCANMsgFD, hw_timestamp: int = 0, host_time: Optional[float] = None):
+        """Appends one frame to the current block (cheap: one struct.pack + one buffer copy)."""
+        if host_time is None:
+            host_time = time.time()
+        if not self._block_frames:
+            self._block_first = host_time
+        self._block += RECORD_HEAD.pack(host_time, hw_timestamp)
+        self._block += msg
+        self._block_frames += 1
+        self._block_last = host_time
+        if self._block_frames >= self.block_frames:
+            self._submit()
+
+    def flush_if_due(self):
+        """Hands over a partial block once it is flush_interval old (call from the RX loop when idle)."""
+        if self._block_frames and time.monotonic() - self._block_started >= self.flush_interval:
+            self._submit()
+
+    def _submit(self):
+        item = (bytes(self._block), self._block_frames, self._block_first, self._block_last)
+        try:
+            self._pending.put_nowait(item)
+        except queue.Full:
+            self._dropped_queue_full += self._block_frames
+        self._new_block()
+
+    def write_block(self, payload: bytes, nframes: int, t_first: float, t_last: float):
+        """Queues an already packed block, waiting for room (offline conversion, not the RX path)."""
+        self._pending.put((payload, nframes, t_first, t_last))
+
+    def close(self):
+        """Flushes the last block and waits for the writer thread (call after the RX thread stopped; idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._block_frames:
+            self._submit()
+        self._pending.put(None)
+        self._thread.join()
+
+    # ---- background thread side ----
+
+    def _writer_loop(self):
+        while True:
+            try:
+                item = self._pending.get(timeout=self._rotation_timeout())
+            except queue.Empty:
+                # Idle bus: the time limit of a segment holding frames ran out without a new block
+                self._rotate_if_due()
+                continue
+            if item is None:
+                break
+            payload, nframes, t_first, t_last = item
+            try:
+                self._write_block(payload, nframes, t_first, t_last)
+                self.frames_written += nframes
+            except OSError as e:
+                self._dropped_io += nframes
+                logger.error(f"CAN trace write failed ({self.path}): {e}")
+                continue
+
+            if self.rotation:
+                seg = self._segment
+                seg["frames"] += nframes
+                seg["bytes"] += len(payload)
+                seg["t_first"] = seg["t_first"] or t_first
+                seg["t_last"] = t_last
+                self._rotate_if_due()
+        if self.rotation:
+            self._finish_segment()
+            self.rotation.close()
+        else:
+            self._close()
+
+    def _rotation_timeout(self) -> Optional[float]:
+        """How long the writer thread may wait for a block before a time-based rotation is due."""
+        if self.rotation is None or not self._segment["frames"]:
+            return None  # an empty segment is never closed, so there is nothing to wake up for
+        return self.rotation.seconds_to_rotate()
+
+    def _rotate_if_due(self):
+        if self.rotation and self.rotation.should_rotate(self._segment["bytes"]):
+            self._finish_segment()
+            self.path = self.rotation.next_segment()
+            self._open()
+
+    def _reset_segment(self):
+        self._segment = {"frames": 0, "bytes": 0, "t_first": 0.0, "t_last": 0.0}
+
+    def _finish_segment(self):
+        """Closes the current segment file and hands it to the rotation (manifest, compression, retention)."""
+        self._close()
+        seg = self._segment
+        if seg["frames"]:
+            self.rotation.segment_closed(self.path, seg["frames"], seg["t_first"], seg["t_last"],
+                                         **self._segment_files())
+        else:
+            # Nothing written since the last rotation (the final segment of an idle bus): not worth an entry
+            folder = os.path.dirname(self.path)
+            for name in (os.path.basename(self.path), *self._segment_files().values()):
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError as e:
+                    logger.warning(f"CAN trace: could not remove empty segment file {name}: {e}")
+        self._reset_segment()
+
+    def _segment_files(self) -> Dict[str, str]:
+        """Companion files of the current segment, recorded in the manifest and removed with it."""
+        return {}
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_block(self, payload: bytes, nframes: int, t_first: float, t_last: float):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+def index_path(trace_path: str) -> str:
+    """Index file of a binary trace segment (shared by the plain and the compressed segment)."""
+    for suffix in (".gz", ".zst"):
+        if trace_path.endswith(suffix):
+            trace_path = trace_path[:-len(suffix)]
+    return trace_path + ".idx"
+
+
+class TraceIndexBuilder:
+    """
+    Collects the block index of one binary trace file:
+    blocks  - [file offset, frames, first us, last us] per block, in file order
+    buckets - {time bucket: first block whose last frame is in or after that bucket}
+    ids     - {CAN ID: [[first block, last block], ...]} block ranges containing the ID
+    """
+
+    INDEX_VERSION = 1
+    _ID = struct.Struct("<I")
+
+    def __init__(self, bucket_us: int = 1_000_000):
+        self.bucket_us = bucket_us
+        self.blocks = []
+        self.buckets: Dict[int, int] = {}
+        self.ids: Dict[int, list] = {}
+
+    def add_block(self, offset: int, nframes: int, t_first_us: int, t_last_us: int, payload: bytes):
+        block_no = len(self.blocks)
+        self.blocks.append([offset, nframes, t_first_us, t_last_us])
+
+        last_bucket = max(self.buckets) if self.buckets else t_first_us // self.bucket_us - 1
+        for bucket in range(last_bucket + 1, t_last_us // self.bucket_us + 1):
+            self.buckets[bucket] = block_no
+
+        unpack_id = self._ID.unpack_from
+        for can_id in {unpack_id(payload, pos)[0] for pos in range(MSG_OFFSET, len(payload), RECORD.size)}:
+            ranges = self.ids.setdefault(can_id, [])
+            if ranges and ranges[-1][1] == block_no - 1:
+                ranges[-1][1] = block_no
+            else:
+                ranges.append([block_no, block_no])
+
+    def save(self, trace_path: str):
+        index = {
+            "version": self.INDEX_VERSION,
+            "record_size": RECORD.size,
+            "bucket_us": self.bucket_us,
+            "blocks": self.blocks,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "ids": {str(k): v for k, v in self.ids.items()},
+        }
+        tmp_path = index_path(trace_path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(tmp_path, index_path(trace_path))
+
+
+class BinaryTraceWriter(AsyncTraceWriter):
+    """Compact binary trace (88 bytes per frame, no formatting on any thread) plus its block index."""
+
+    def _open(self):
+        self._file = open(self.path, "wb")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, RECORD.size))
+        self._index = TraceIndexBuilder()
+
+    def _write_block(self, payload: bytes, nframes: int, t_first: float, t_last: float):
+        offset = self._file.tell()
+        t_first_us, t_last_us = int(t_first * 1e6), int(t_last * 1e6)
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), nframes, t_first_us, t_last_us))
+        self._file.write(payload)
+        self._file.flush()
+        self._index.add_block(offset, nframes, t_first_us, t_last_us, payload)
+
+    def _close(self):
+        self._file.close()
+        try:
+            self._index.save(self.path)
+        except OSError as e:
+            logger.error(f"CAN trace index not written for {self.path}: {e}")
+
+    def _segment_files(self) -> Dict[str, str]:
+        return {"index_file": os.path.basename(index_path(self.path))}
+
+
+def setup_trace_writer(trace_format: str = "ctrace", log_dir: str = "logs",
+                       rotation: Optional[Dict[str, Any]] = None) -> AsyncTraceWriter:
+    """
+    Asynchronous counterpart of setup_can_logger: logs/Can_Trace_<timestamp>.<trace_format>
+    trace_format: ctrace (binary, this module) or asc / blf / mf4 (python-can writers).
+    rotation: TraceRotation keyword arguments (max_bytes, max_seconds, compression, keep_segments,
+              max_total_bytes) to write rolling segments instead of one file.
+    """
+    if trace_format == "ctrace":
+        writer_class = BinaryTraceWriter
+    else:
+        # python-can (and asammdf for mf4) are only needed for the vendor formats
+        from hardware.can.can_trace_formats import TRACE_WRITERS
+        if trace_format not in TRACE_WRITERS:
+            raise ValueError(f"Unsupported CAN trace format '{trace_format}' (supported: {', '.join(TRACE_WRITERS)})")
+        writer_class = TRACE_WRITERS[trace_format]
+
+    os.makedirs(log_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return writer_class(os.path.join(log_dir, f"Can_Trace_{timestamp}.{trace_format}"),
+                        rotation=TraceRotation(**rotation) if rotation else None)
+
+
+# ------------------------------------------------------------------
+# Reading binary traces back
+# ------------------------------------------------------------------
+
+def iter_binary_blocks(path: str) -> Iterator[Tuple[int, int, int, int, bytes]]:
+    """Yields (file offset of the block header, frames, first us, last us, payload) per block."""
+    with open_trace_file(path) as f:
+        magic, version, record_size = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a version {FILE_VERSION} binary CAN trace")
+        while True:
+            offset = f.tell()
+            head = f.read(BLOCK_HEADER.size)
+            if len(head) < BLOCK_HEADER.size:
+                return
+            block_magic, nbytes, nframes, t_first, t_last = BLOCK_HEADER.unpack(head)
+            payload = f.read(nbytes)
+            if block_magic != BLOCK_MAGIC or len(payload) < nbytes:
+                # Truncated tail (e.g. process killed mid-write): everything before it is valid
+                logger.warning(f"{path}: incomplete block at offset {offset}, stopping")
+                return
+            yield offset, nframes, t_first, t_last, payload
+
+
+def iter_binary_frames(path: str) -> Iterator[Tuple[float, int, TPCANMsgFD]]:
+    """Yields (host time, hardware timestamp us, TPCANMsgFD) for every frame of a binary trace."""
+    for _, nframes, _, _, payload in iter_binary_blocks(path):
+        for pos in range(0, nframes * RECORD.size, RECORD.size):
+            host_time, hw_timestamp = RECORD_HEAD.unpack_from(payload, pos)
+            msg = TPCANMsgFD.from_buffer_copy(payload, pos + MSG_OFFSET)
+            yield host_time, hw_timestamp, msg
+
+
+def iter_binary_trace(path: str) -> Iterator[TraceRecord]:
+    """Same records as iter_text_trace(), read from a binary trace."""
+    for host_time, _, msg in iter_binary_frames(path):
+        length = DLC_2_LEN.get(msg.DLC, msg.DLC)
+        yield TraceRecord(host_time, msg.MSGTYPE, msg.ID, msg.DLC, bytes(msg.DATA[:length]))
+
+
+def export_text_trace(bin_path: str, txt_path: Optional[str] = None) -> str:
+    """Writes a binary trace in the Can_Trace_*.txt layout (same columns as log_can_message)."""
+    if txt_path is None:
+        stem = bin_path[:-len(".gz")] if bin_path.endswith(".gz") else bin_path
+        stem = stem[:-len(".zst")] if stem.endswith(".zst") else stem
+        txt_path = os.path.splitext(stem)[0] + ".txt"
+    with open(txt_path, "w", encoding="utf-8") as out:
+        header_written = False
+        for host_time, _, msg in iter_binary_frames(bin_path):
+            stamp = datetime.fromtimestamp(host_time).strftime("%Y-%m-%d %H:%M:%S.%f")
+            if not header_written:
+                for line in TRACE_HEADER_LINES:
+                    out.write(f"{stamp}  {line}\n")
+                header_written = True
+            out.write(f"{stamp}  {format_can_message(msg)}\n")
+    return txt_path
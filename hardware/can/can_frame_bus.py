@@ -0,0 +1,105 @@
+# hardware/can/can_frame_bus.py
+
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.can_frame_ring import CanFrame, CanFrameRing, CanRingReader
+
+
+class CanBusSubscriber(CanRingReader):
+    """
+    One consumer of a CanFrameBus: own cursor over the shared ring plus an optional ID filter.
+    Keeps the queue.Queue get(timeout) contract, so it can replace the frame queue handed to
+    ValidationThread / CanSignalMonitorWorker. get() returns a copy of the ring slot, checked
+    against being lapped; iter_batch() yields the shared ring slots themselves.
+    """
+
+    def __init__(self, ring: CanFrameRing, name: str, id_filter: Optional[Iterable[int]] = None):
+        super().__init__(ring)
+        self.name = name
+        self.id_filter = frozenset(id_filter) if id_filter is not None else None
+        self.delivered = 0
+        self.filtered = 0
+
+    def get(self, timeout: float = None) -> CanFrame:
+        id_filter = self.id_filter
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._wait(deadline)
+            frame = self._next_frame()
+            if frame is None:
+                continue
+            if id_filter is None or frame.msg.ID in id_filter:
+                self.delivered += 1
+                return frame
+            self.filtered += 1
+
+    def iter_batch(self, max_frames: int = 512, timeout: float = 0.1) -> Iterator[Tuple[TPCANMsgFD, int]]:
+        """Yields (message view, timestamp) for the frames available now that pass the ID filter."""
+        batch = self.read_batch(max_frames, timeout)
+        id_filter = self.id_filter
+        for msg, ts in self.ring.iter_frames(batch.start, batch.stop):
+            if id_filter is None or msg.ID in id_filter:
+                self.delivered += 1
+                yield msg, ts
+            else:
+                self.filtered += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "lag": self.lag(),
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "filtered": self.filtered,
+        }
+
+
+class CanFrameBus:
+    """
+    Single-producer / multi-consumer fan-out over a CanFrameRing.
+    The RX thread fills the ring (rx_monitor_ring, or publish() from rx_monitor / replay_monitor
+    next to their frame queue); each consumer subscribes with
+    its own cursor and ID filter, so validation, UI monitoring, logging and UDS matching all see
+    every frame instead of competing for items of one queue.Queue.
+    A subscriber that falls more than one ring behind loses the oldest frames (counted in
+    'dropped'); it never blocks the producer or the other subscribers.
+    """
+
+    def __init__(self, ring: Optional[CanFrameRing] = None):
+        self.ring = ring if ring is not None else CanFrameRing()
+        self._subscribers: Dict[str, CanBusSubscriber] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, id_filter: Optional[Iterable[int]] = None) -> CanBusSubscriber:
+        """New subscriber starting at the current head (it only sees frames published from now on)."""
+        with self._lock:
+            if name in self._subscribers:
+                raise ValueError(f"CAN frame bus subscriber '{name}' already exists")
+            subscriber = CanBusSubscriber(self.ring, name, id_filter)
+            self._subscribers[name] = subscriber
+            return subscriber
+
+    def unsubscribe(self, name: str):
+        with self._lock:
+            self._subscribers.pop(name, None)
+
+    @property
+    def has_subscribers(self) -> bool:
+        """Lets a queue-mode RX loop skip publishing while nobody listens."""
+        return bool(self._subscribers)
+
+    def publish(self, msg: TPCANMsgFD, timestamp: int = 0):
+        """Copies one frame onto the bus (replay / tests; the RX thread drains into self.ring)."""
+        self.ring.push(msg, timestamp)
+
+    def max_lag(self) -> int:
+        """Lag of the slowest subscriber (0 without subscribers)."""
+        with self._lock:
+            return max((sub.lag() for sub in self._subscribers.values()), default=0)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-subscriber lag / dropped / delivered / filtered counters."""
+        with self._lock:
+            return {name: sub.stats() for name, sub in self._subscribers.items()}
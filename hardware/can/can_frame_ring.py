@@ -0,0 +1,194 @@
+# hardware/can/can_frame_ring.py
+
+import queue
+import threading
+import time
+from ctypes import sizeof
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple
+
+from hardware.can.PCANBasic import PCANBasic, TPCANMsgFD, TPCANTimestampFD
+from hardware.can.pcan_constants import *
+
+
+class CanFrame(NamedTuple):
+    """
+    One received frame as it travels through the frame queue / ring readers: the message plus
+    the PCAN hardware receive timestamp in microseconds (TPCANTimestampFD; the 64-bit counter
+    already folds in what the classic TPCANTimestamp splits into millis / overflow / micros).
+    """
+    msg: TPCANMsgFD
+    timestamp: int
+
+
+def unpack_frame(item) -> Tuple[TPCANMsgFD, Optional[int]]:
+    """(message, timestamp in us) of a frame queue item; plain TPCANMsgFD items have no timestamp."""
+    if isinstance(item, tuple):
+        return item
+    return item, None
+
+
+class CanFrameRing:
+    """
+    Preallocated ring of fixed-size CAN frame records (ID, MSGTYPE flags, DLC, 64-byte payload
+    in self.msgs; hardware timestamp in self.timestamps). The RX thread reads the PCAN driver
+    queue straight into the next slot, so receiving allocates no ctypes objects per frame.
+
+    Frames are addressed by a monotonically increasing sequence number; slot = seq % capacity.
+    Single producer only. Readers keep their own cursor and detect being lapped by the producer;
+    CanFrameBus hands out such cursors to several consumers.
+    """
+
+    def __init__(self, capacity: int = 1 << 14):
+        if capacity & (capacity - 1):
+            raise ValueError("CanFrameRing capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+
+        self.msgs = (TPCANMsgFD * capacity)()
+        self.timestamps = (TPCANTimestampFD * capacity)()
+
+        # Slot views created once: indexing a ctypes array would build a new wrapper object per call
+        self._msg_slots = [self.msgs[i] for i in range(capacity)]
+        self._msg_size = sizeof(TPCANMsgFD)
+        ts_size = sizeof(TPCANTimestampFD)
+        self._ts_slots = [TPCANTimestampFD.from_buffer(self.timestamps, i * ts_size) for i in range(capacity)]
+
+        self.head = 0  # sequence number of the next frame to be written
+        self.not_empty = threading.Condition()
+
+    def drain(self, pcan: PCANBasic, channel, id_filter=None,
+              on_read: Optional[Callable[[TPCANMsgFD, int], None]] = None) -> Tuple[int, int]:
+        """
+        Reads the driver RX queue until it is empty (or an error occurs) into consecutive slots,
+        at most one ring's worth per call. Frames whose ID is not in id_filter are read but their
+        slot is reused. on_read(message view, timestamp) is called for every frame read, filtered
+        or not, before its slot can be reused. Returns (frames stored, last PCAN status);
+        PCAN_ERROR_OK means the per-call limit was hit and more frames may be waiting.
+        """
+        head = self.head
+        start = head
+        limit = start + self.capacity
+        msg_slots, ts_slots, mask = self._msg_slots, self._ts_slots, self._mask
+        read_into = pcan.ReadFDInto
+
+        result = PCAN_ERROR_OK
+        while head < limit:
+            slot = head & mask
+            result = read_into(channel, msg_slots[slot], ts_slots[slot])
+            if result != PCAN_ERROR_OK:
+                break
+            if on_read is not None:
+                on_read(msg_slots[slot], ts_slots[slot].value)
+            if id_filter is None or msg_slots[slot].ID in id_filter:
+                head += 1
+                # Publish per frame so readers never see a half-written batch as complete
+                self.head = head
+
+        stored = head - start
+        if stored:
+            with self.not_empty:
+                self.not_empty.notify_all()
+        return stored, result
+
+    def push(self, msg: TPCANMsgFD, timestamp: int = 0):
+        """Copies one frame into the ring (replay / tests; the RX path uses drain())."""
+        slot = self.head & self._mask
+        self.msgs[slot] = msg
+        self.timestamps[slot] = timestamp
+        self.head += 1
+        with self.not_empty:
+            self.not_empty.notify_all()
+
+    def frame(self, seq: int) -> Tuple[TPCANMsgFD, int]:
+        """(message slot view, timestamp in us) for a sequence number still held by the ring."""
+        slot = seq & self._mask
+        return self._msg_slots[slot], self.timestamps[slot]
+
+    def copy_frame(self, seq: int) -> Optional[CanFrame]:
+        """
+        Detached copy of a frame; None if the producer lapped the slot before or during the copy
+        (checked after copying, so ID, DLC and DATA always come from the same frame).
+        """
+        slot = seq & self._mask
+        msg = TPCANMsgFD.from_buffer_copy(self.msgs, slot * self._msg_size)
+        timestamp = self.timestamps[slot]
+        if not self.is_valid(seq):
+            return None
+        return CanFrame(msg, timestamp)
+
+    def is_valid(self, seq: int) -> bool:
+        """False once the producer may be overwriting the slot of this sequence number."""
+        return self.head - seq < self.capacity
+
+    def iter_frames(self, start: int, end: int) -> Iterator[Tuple[TPCANMsgFD, int]]:
+        """Yields (message view, timestamp) for seq in [start, end) - views are reused ring slots."""
+        msg_slots, timestamps, mask = self._msg_slots, self.timestamps, self._mask
+        for seq in range(start, end):
+            slot = seq & mask
+            yield msg_slots[slot], timestamps[slot]
+
+
+class CanRingReader:
+    """
+    Single consumer cursor over a CanFrameRing.
+    get(timeout) has queue.Queue semantics, so it can be handed to ValidationThread /
+    CanSignalMonitorWorker in place of the frame queue. The CanFrame it returns is a copy of the
+    ring slot; a frame the producer overwrote while it was being copied is counted in 'dropped'.
+    read_batch() only hands out sequence numbers: iter_frames() views must be consumed before
+    the producer wraps around (capacity frames later).
+    """
+
+    def __init__(self, ring: CanFrameRing):
+        self.ring = ring
+        self.cursor = ring.head
+        self.dropped = 0
+
+    def _catch_up(self):
+        """Skips frames the producer has overwritten (or is about to: the slot at head is being filled)."""
+        oldest = self.ring.head - self.ring.capacity + 1
+        if self.cursor < oldest:
+            self.dropped += oldest - self.cursor
+            self.cursor = oldest
+
+    def read_batch(self, max_frames: int = 512, timeout: float = 0.1) -> range:
+        """Returns the range of sequence numbers available now (waits up to timeout if none)."""
+        ring = self.ring
+        if self.cursor == ring.head:
+            with ring.not_empty:
+                ring.not_empty.wait_for(lambda: self.cursor != ring.head, timeout)
+        self._catch_up()
+        end = min(ring.head, self.cursor + max_frames)
+        batch = range(self.cursor, end)
+        self.cursor = end
+        return batch
+
+    def _wait(self, deadline: Optional[float]):
+        """Blocks until a frame is available at the cursor; queue.Empty once deadline (monotonic) passes."""
+        ring = self.ring
+        if self.cursor == ring.head:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            with ring.not_empty:
+                if not ring.not_empty.wait_for(lambda: self.cursor != ring.head, remaining):
+                    raise queue.Empty
+
+    def _next_frame(self) -> Optional[CanFrame]:
+        """Copies the frame at the cursor and advances; None (counted as dropped) if it was lapped."""
+        self._catch_up()
+        seq = self.cursor
+        self.cursor += 1
+        frame = self.ring.copy_frame(seq)
+        if frame is None:
+            self.dropped += 1
+        return frame
+
+    def get(self, timeout: float = None) -> CanFrame:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._wait(deadline)
+            frame = self._next_frame()
+            if frame is not None:
+                return frame
+
+    def lag(self) -> int:
+        """Frames written but not yet consumed by this reader."""
+        return self.ring.head - self.cursor
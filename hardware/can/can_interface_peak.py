@@ -1,6 +1,9 @@
 # hardware/can/can_interface_peak.py
 
 import can
+import queue
+import threading
+import time
 from typing import List, Optional
 from hardware.can.base_can_interface import BaseCANInterface
 from hardware.hardware_enums import Baudrate, CANFDDLC
@@ -116,3 +119,26 @@ class CANInterfacePeak(BaseCANInterface):
         if self.bus is None:
             raise RuntimeError("CAN bus not opened")
         return self.bus.recv(timeout=timeout)
+
+    def monitor(self, stop_event: threading.Event, frame_queue: queue.Queue,
+                wait_timeout: float = 0.1, poll_interval: Optional[float] = None) -> None:
+        """
+        RX loop putting received frames on frame_queue until stop_event is set.
+
+        Default (event mode): bus.recv(timeout) blocks inside python-can's PCAN backend, which
+        waits on the PCAN receive event, so the thread only wakes when frames arrive.
+        poll_interval: set to reproduce the legacy non-blocking poll + sleep behaviour.
+        """
+        if self.bus is None:
+            raise RuntimeError("CAN bus not opened")
+
+        while not stop_event.is_set():
+            if poll_interval is None:
+                msg = self.bus.recv(timeout=wait_timeout)
+            else:
+                msg = self.bus.recv(timeout=0)
+                if msg is None:
+                    time.sleep(poll_interval)
+                    continue
+            if msg is not None:
+                frame_queue.put(msg)
@@ -2,8 +2,9 @@
 
 import logging
 import os
+import re
 from datetime import datetime
-# from typing import List
+from typing import Iterator, NamedTuple
 from hardware.can.PCANBasic import TPCANMsgFD
 from hardware.can.pcan_constants import *
 from can_fd.canfd.canfd_enum import DLC_2_LEN
@@ -14,6 +15,16 @@ DATA_FIELD_WIDTH = 44
 TYPE_WIDTH = 12
 DLC_WIDTH = 5
 
+TRACE_HEADER_LINES = (
+    "===== PCAN Bus Trace Log =====",
+    "This log contains all CAN/CAN-FD messages on the bus.",
+    "TX = transmitted (echo), RX = received",
+    "DLC = DLC on physical bus, not length for the data",
+    "----------------------------------------",
+    "Dir Type         CAN_ID       DLC & Len   Data",
+    "----------------------------------------",
+)
+
 def setup_can_logger(log_dir: str = "logs") -> logging.Logger:
     """Setup CAN trace logger with timestamped file."""
     os.makedirs(log_dir, exist_ok=True)
@@ -42,13 +53,8 @@ def setup_can_logger(log_dir: str = "logs") -> logging.Logger:
     can_logger.addHandler(fh)
 
     # Header
-    can_logger.info("===== PCAN Bus Trace Log =====")
-    can_logger.info("This log contains all CAN/CAN-FD messages on the bus.")
-    can_logger.info("TX = transmitted (echo), RX = received")
-    can_logger.info("DLC = DLC on physical bus, not length for the data")
-    can_logger.info("----------------------------------------")
-    can_logger.info("Dir Type         CAN_ID       DLC & Len   Data")
-    can_logger.info("----------------------------------------")
+    for line in TRACE_HEADER_LINES:
+        can_logger.info(line)
 
     return can_logger
 
@@ -81,11 +87,70 @@ def fmt_can_type(msg: TPCANMsgFD) -> str:
     return "+".join([base] + flags)
 
 
-def log_can_message(msg: TPCANMsgFD, logger: logging.Logger):
-    """Log a formatted CAN frame."""
+def format_can_message(msg: TPCANMsgFD) -> str:
+    """Trace line body (Dir, Type, CAN_ID, DLC & Len, Data) for a frame; shared with the binary trace exporter."""
     direction = "TX" if (msg.MSGTYPE & PCAN_MESSAGE_ECHO) else "RX"
     dlc_str = f"DLC_x{msg.DLC:X}".ljust(DLC_WIDTH)
     length = DLC_2_LEN.get(msg.DLC, msg.DLC)
     data = " ".join(f"{msg.DATA[i]:02X}" for i in range(length))
-    line = f"{direction:<3} {fmt_can_type(msg):<{TYPE_WIDTH}} {fmt_can_id(msg):<{ID_FIELD_WIDTH}} {dlc_str} L{length:<2}  Hex: {data}"
-    logger.debug(line)
+    return f"{direction:<3} {fmt_can_type(msg):<{TYPE_WIDTH}} {fmt_can_id(msg):<{ID_FIELD_WIDTH}} {dlc_str} L{length:<2}  Hex: {data}"
+
+
+def log_can_message(msg: TPCANMsgFD, logger: logging.Logger):
+    """Log a formatted CAN frame."""
+    logger.debug(format_can_message(msg))
+
+
+# ------------------------------------------------------------------
+# Reading traces back (offline re-validation / reporting)
+# ------------------------------------------------------------------
+
+# e.g. "2025-10-16 15:21:50.770802  RX  FD+BRS       0x0AF        DLC_x5 L5   Hex: 00 B1 00 00 02"
+_TRACE_LINE_RE = re.compile(
+    r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+)\s+(RX|TX)\s+(\S+)\s+0x([0-9A-Fa-f]+)\s+"
+    r"DLC_x([0-9A-Fa-f]+)\s+L(\d+)\s+Hex:\s*([0-9A-Fa-f ]*)$"
+)
+
+_TYPE_FLAGS = {
+    "CAN": 0,
+    "FD": PCAN_MESSAGE_FD,
+    "STATUS": PCAN_MESSAGE_STATUS,
+    "ERRFRAME": PCAN_MESSAGE_ERRFRAME,
+    "BRS": PCAN_MESSAGE_BRS,
+    "ESI": PCAN_MESSAGE_ESI,
+}
+
+
+class TraceRecord(NamedTuple):
+    """One frame read back from a Can_Trace_*.txt file."""
+    timestamp: float  # host time, seconds since epoch
+    msgtype: int      # PCAN_MESSAGE_* flags rebuilt from the Dir/Type/ID columns
+    can_id: int
+    dlc: int
+    data: bytes
+
+
+def iter_text_trace(log_path: str) -> Iterator[TraceRecord]:
+    """Yields every frame line of a text trace; header and 'RX error' lines are skipped."""
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            m = _TRACE_LINE_RE.match(line.rstrip())
+            if not m:
+                continue
+            stamp, direction, type_str, id_hex, dlc_hex, _, data_hex = m.groups()
+
+            msgtype = 0
+            for part in type_str.split("+"):
+                msgtype |= _TYPE_FLAGS.get(part, 0)
+            if len(id_hex) > 3:
+                msgtype |= PCAN_MESSAGE_EXTENDED
+            if direction == "TX":
+                msgtype |= PCAN_MESSAGE_ECHO
+
+            yield TraceRecord(
+                timestamp=datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S.%f").timestamp(),
+                msgtype=msgtype,
+                can_id=int(id_hex, 16),
+                dlc=int(dlc_hex, 16),
+                data=bytes.fromhex(data_hex),
+            )
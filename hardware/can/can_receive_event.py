@@ -0,0 +1,76 @@
+# hardware/can/can_receive_event.py
+
+import platform
+import select
+from typing import Optional
+
+from hardware.can.PCANBasic import PCANBasic, PCAN_RECEIVE_EVENT
+from hardware.can.pcan_constants import *
+
+
+def _kernel32():
+    """
+    kernel32 with the prototypes this module uses. Without restype, ctypes returns c_int and a
+    64-bit HANDLE would be truncated. A private WinDLL keeps the declarations out of ctypes.windll.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateEventW.restype = wintypes.HANDLE
+    kernel32.CreateEventW.argtypes = [ctypes.c_void_p, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+    kernel32.WaitForSingleObject.restype = wintypes.DWORD
+    kernel32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+    kernel32.CloseHandle.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    return kernel32
+
+
+class PcanReceiveEvent:
+    """
+    PCAN receive event, so an RX thread can sleep until frames arrive instead of polling.
+
+    Linux: PCAN-Basic exposes the event as a file descriptor (GetValue PCAN_RECEIVE_EVENT)
+           that is readable while the channel RX queue holds frames -> select().
+    Windows: an auto-reset Win32 event is registered with SetValue PCAN_RECEIVE_EVENT
+           -> WaitForSingleObject(). PCANBasic.SetValue passes the HANDLE in a pointer-sized buffer.
+    Raises OSError when the driver does not provide the event (callers fall back to polling).
+    """
+
+    WAIT_OBJECT_0 = 0
+
+    def __init__(self, pcan: PCANBasic, channel):
+        self.pcan = pcan
+        self.channel = channel
+        self._fd: Optional[int] = None
+        self._handle = None
+        self._kernel32 = None
+
+        if platform.system() == 'Windows':
+            self._kernel32 = _kernel32()
+            self._handle = self._kernel32.CreateEventW(None, False, False, None)
+            if not self._handle:
+                raise OSError("CreateEventW failed for PCAN receive event")
+            result = pcan.SetValue(channel, PCAN_RECEIVE_EVENT, self._handle)
+            if result != PCAN_ERROR_OK:
+                self._kernel32.CloseHandle(self._handle)
+                raise OSError(f"PCAN_RECEIVE_EVENT could not be set (0x{result:X})")
+        else:
+            result, fd = pcan.GetValue(channel, PCAN_RECEIVE_EVENT)
+            if result != PCAN_ERROR_OK or fd <= 0:
+                raise OSError(f"PCAN_RECEIVE_EVENT not available (0x{result:X})")
+            self._fd = fd
+
+    def wait(self, timeout: float) -> bool:
+        """Blocks until the driver signals received frames or the timeout expires."""
+        if self._fd is not None:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            return bool(readable)
+        return self._kernel32.WaitForSingleObject(self._handle, int(timeout * 1000)) == self.WAIT_OBJECT_0
+
+    def close(self):
+        """Unregisters the Windows event (the Linux fd is owned by the driver)."""
+        if self._handle:
+            self.pcan.SetValue(self.channel, PCAN_RECEIVE_EVENT, 0)
+            self._kernel32.CloseHandle(self._handle)
+            self._handle = None
@@ -0,0 +1,134 @@
+# hardware/can/can_replay.py
+
+import logging
+import queue
+import threading
+import time
+from typing import Iterator, Optional, FrozenSet
+
+from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.can_logger import TraceRecord, iter_text_trace
+from hardware.can.can_binary_trace import iter_binary_trace
+from hardware.can.can_frame_bus import CanFrameBus
+from hardware.can.can_frame_ring import CanFrame
+from hardware.can.pcan_constants import *
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+
+def _iter_python_can_trace(path: str) -> Iterator[TraceRecord]:
+    """ASC / BLF / MF4 through python-can's LogReader (python-can is only needed for these)."""
+    import can
+    len_2_dlc = {length: dlc for dlc, length in DLC_2_LEN.items()}
+    for m in can.LogReader(path):
+        msgtype = PCAN_MESSAGE_STANDARD
+        if m.is_extended_id:
+            msgtype |= PCAN_MESSAGE_EXTENDED
+        if m.is_fd:
+            msgtype |= PCAN_MESSAGE_FD
+        if m.bitrate_switch:
+            msgtype |= PCAN_MESSAGE_BRS
+        if m.error_state_indicator:
+            msgtype |= PCAN_MESSAGE_ESI
+        if m.is_error_frame:
+            msgtype |= PCAN_MESSAGE_ERRFRAME
+        if not m.is_rx:
+            msgtype |= PCAN_MESSAGE_ECHO
+        data = bytes(m.data)
+        dlc = len_2_dlc.get(len(data), len(data)) if m.is_fd else len(data)
+        yield TraceRecord(m.timestamp, msgtype, m.arbitration_id, dlc, data)
+
+
+def _iter_manifest_trace(path: str) -> Iterator[TraceRecord]:
+    """Frames of a rotated trace; segment files are closed when the iteration ends or is abandoned."""
+    from hardware.can.can_trace_index import TraceReader
+    with TraceReader(path) as reader:
+        yield from reader.frames()
+
+
+def iter_trace_records(path: str) -> Iterator[TraceRecord]:
+    """Frames of any recorded trace, picked by file name: Can_Trace_*.txt, .ctrace(.gz/.zst),
+    a rotated trace's .manifest.json, or .asc / .blf / .mf4."""
+    lower = path.lower()
+    if lower.endswith(".txt"):
+        return iter_text_trace(path)
+    if lower.endswith(".manifest.json"):
+        return _iter_manifest_trace(path)
+    if lower.endswith((".ctrace", ".ctrace.gz", ".ctrace.zst")):
+        return iter_binary_trace(path)
+    if lower.endswith((".asc", ".blf", ".mf4")):
+        return _iter_python_can_trace(path)
+    raise ValueError(f"Unsupported CAN trace file: {path}")
+
+
+def record_to_msg(rec: TraceRecord) -> TPCANMsgFD:
+    """Rebuilds the TPCANMsgFD the RX thread would have queued for this frame."""
+    msg = TPCANMsgFD()
+    msg.ID = rec.can_id
+    msg.MSGTYPE = rec.msgtype
+    msg.DLC = rec.dlc
+    msg.DATA[:len(rec.data)] = rec.data
+    return msg
+
+
+def replay_monitor(trace_path: str,
+                   stop_event: threading.Event,
+                   logger: logging.Logger,
+                   frame_sink,
+                   speed: Optional[float] = None,
+                   id_filter: Optional[FrozenSet[int]] = None,
+                   done_event: Optional[threading.Event] = None,
+                   frame_bus: Optional[CanFrameBus] = None) -> int:
+    """
+    Stand-in for rx_monitor / rx_monitor_ring that publishes a recorded trace instead of reading
+    PCAN: frame_sink is the frame queue (put) or a CanFrameBus (publish).
+
+    speed: None replays as fast as the consumers keep up (a queue.Queue with maxsize or the bus
+           subscribers' lag provide the back-pressure); 1.0 = recorded timing, 10.0 = 10x faster.
+    Frames carry the recorded timestamp (in us) in place of the hardware one.
+    Returns the number of frames published; done_event is set when the trace is exhausted.
+    frame_bus: with a frame queue as sink, also publish every frame to this bus while it has
+    subscribers (like rx_monitor).
+    """
+    is_bus = isinstance(frame_sink, CanFrameBus)
+    # Keep the slowest subscriber within half a ring so fast replay does not lap it
+    max_lag = frame_sink.ring.capacity // 2 if is_bus else None
+
+    count = 0
+    t_start = trace_start = None
+    try:
+        for rec in iter_trace_records(trace_path):
+            if stop_event.is_set():
+                break
+            if id_filter is not None and rec.can_id not in id_filter:
+                continue
+
+            if speed:
+                if trace_start is None:
+                    trace_start, t_start = rec.timestamp, time.perf_counter()
+                delay = (rec.timestamp - trace_start) / speed - (time.perf_counter() - t_start)
+                if delay > 0:
+                    stop_event.wait(delay)
+
+            msg = record_to_msg(rec)
+            timestamp = int(rec.timestamp * 1e6)
+            if is_bus:
+                while frame_sink.max_lag() >= max_lag and not stop_event.is_set():
+                    time.sleep(0.001)
+                frame_sink.publish(msg, timestamp)
+            else:
+                while not stop_event.is_set():
+                    try:
+                        frame_sink.put(CanFrame(msg, timestamp), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if frame_bus is not None and frame_bus.has_subscribers:
+                    frame_bus.publish(msg, timestamp)
+            count += 1
+    except (OSError, ValueError) as e:
+        logger.error(f"Replay of {trace_path} failed after {count} frames: {e}")
+
+    logger.info(f"Replay of {trace_path} finished: {count} frames")
+    if done_event is not None:
+        done_event.set()
+    return count
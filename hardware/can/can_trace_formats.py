@@ -0,0 +1,85 @@
+# hardware/can/can_trace_formats.py
+
+import can
+from typing import Dict, Type
+
+from hardware.can.can_binary_trace import AsyncTraceWriter, BinaryTraceWriter, RECORD, iter_binary_blocks
+from hardware.can.pcan_constants import *
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+
+class PythonCanTraceWriter(AsyncTraceWriter):
+    """
+    Vector / ASAM trace formats through the python-can file writers.
+    The RX thread path is the same as for the binary trace (records packed into bounded blocks);
+    the conversion to can.Message and the python-can writer run on the background thread.
+    Message timestamps are the PCAN hardware timestamps (TPCANTimestampFD, us) in seconds.
+    """
+
+    writer_class = None  # python-can writer taking a file path
+
+    def __init__(self, path: str, channel: int = 1, **kwargs):
+        self.channel = channel
+        super().__init__(path, **kwargs)
+
+    def _open(self):
+        self._writer = self.writer_class(self.path)
+
+    def _write_block(self, payload: bytes, nframes: int, t_first: float, t_last: float):
+        channel, on_message = self.channel, self._writer.on_message_received
+        for _, hw_timestamp, can_id, msgtype, dlc, data in RECORD.iter_unpack(payload):
+            if msgtype & PCAN_MESSAGE_STATUS:
+                continue  # driver status notifications are not bus frames
+            length = DLC_2_LEN.get(dlc, dlc)
+            on_message(can.Message(
+                timestamp=hw_timestamp / 1e6,
+                arbitration_id=can_id,
+                is_extended_id=bool(msgtype & PCAN_MESSAGE_EXTENDED),
+                is_remote_frame=bool(msgtype & PCAN_MESSAGE_RTR),
+                is_error_frame=bool(msgtype & PCAN_MESSAGE_ERRFRAME),
+                is_fd=bool(msgtype & PCAN_MESSAGE_FD),
+                bitrate_switch=bool(msgtype & PCAN_MESSAGE_BRS),
+                error_state_indicator=bool(msgtype & PCAN_MESSAGE_ESI),
+                is_rx=not (msgtype & PCAN_MESSAGE_ECHO),
+                channel=channel,
+                dlc=length,
+                data=data[:length],
+            ))
+
+    def _close(self):
+        self._writer.stop()
+
+
+class AscTraceWriter(PythonCanTraceWriter):
+    """Vector ASC (text, opens in CANalyzer / CANoe)."""
+    writer_class = can.ASCWriter
+
+
+class BlfTraceWriter(PythonCanTraceWriter):
+    """Vector BLF (binary, zlib-compressed log containers)."""
+    writer_class = can.BLFWriter
+
+
+class Mf4TraceWriter(PythonCanTraceWriter):
+    """ASAM MDF4 bus logging (asammdf / CANape); needs the optional asammdf package."""
+    writer_class = can.MF4Writer
+
+
+TRACE_WRITERS: Dict[str, Type[AsyncTraceWriter]] = {
+    "ctrace": BinaryTraceWriter,
+    "asc": AscTraceWriter,
+    "blf": BlfTraceWriter,
+    "mf4": Mf4TraceWriter,
+}
+
+
+def convert_binary_trace(bin_path: str, out_path: str) -> str:
+    """Converts a recorded .ctrace file to the format given by out_path's extension (asc / blf / mf4)."""
+    trace_format = out_path.rsplit(".", 1)[-1].lower()
+    if trace_format not in TRACE_WRITERS:
+        raise ValueError(f"Unsupported CAN trace format '{trace_format}' (supported: {', '.join(TRACE_WRITERS)})")
+    writer = TRACE_WRITERS[trace_format](out_path)
+    for _, nframes, t_first, t_last, payload in iter_binary_blocks(bin_path):
+        writer.write_block(payload, nframes, t_first / 1e6, t_last / 1e6)
+    writer.close()
+    return out_path
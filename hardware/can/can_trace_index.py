@@ -0,0 +1,169 @@
+# hardware/can/can_trace_index.py
+
+import json
+import mmap
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from hardware.can.can_binary_trace import BLOCK_HEADER, RECORD, TraceIndexBuilder, index_path, iter_binary_blocks
+from hardware.can.can_logger import TraceRecord
+from hardware.can.can_trace_rotation import open_trace_file
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+
+def build_trace_index(trace_path: str) -> Dict[str, Any]:
+    """Scans a binary trace once and writes its index (for traces recorded without one)."""
+    builder = TraceIndexBuilder()
+    for offset, nframes, t_first, t_last, payload in iter_binary_blocks(trace_path):
+        builder.add_block(offset, nframes, t_first, t_last, payload)
+    builder.save(trace_path)
+    return load_trace_index(trace_path)
+
+
+def load_trace_index(trace_path: str) -> Dict[str, Any]:
+    with open(index_path(trace_path), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != TraceIndexBuilder.INDEX_VERSION or index.get("record_size") != RECORD.size:
+        raise ValueError(f"{index_path(trace_path)}: unsupported trace index")
+    index["buckets"] = {int(k): v for k, v in index["buckets"].items()}
+    index["ids"] = {int(k): v for k, v in index["ids"].items()}
+    return index
+
+
+class TraceSegment:
+    """
+    One binary trace file and its index. Uncompressed files are memory-mapped so a query only
+    touches the pages of the selected blocks; compressed (.gz / .zst) segments are read through
+    a decompressing stream, seeking forward from block to block.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self.index = load_trace_index(path)
+        except FileNotFoundError:
+            self.index = build_trace_index(path)
+        self.blocks = self.index["blocks"]
+        self._file = None
+        self._map = None
+
+    def select_blocks(self, t0_us: Optional[int], t1_us: Optional[int], ids: Optional[frozenset]) -> List[int]:
+        """Numbers of the blocks that may hold frames in [t0_us, t1_us] (host time) with an ID in ids."""
+        blocks, buckets = self.blocks, self.index["buckets"]
+        start = 0
+        if t0_us is not None and buckets:
+            bucket = t0_us // self.index["bucket_us"]
+            if bucket > max(buckets):
+                return []
+            start = buckets.get(bucket, 0)
+
+        allowed = None
+        if ids is not None:
+            allowed = set()
+            for can_id in ids:
+                for first, last in self.index["ids"].get(can_id, ()):
+                    allowed.update(range(first, last + 1))
+
+        selected = []
+        for block_no in range(start, len(blocks)):
+            _, _, t_first, t_last = blocks[block_no]
+            if t1_us is not None and t_first > t1_us:
+                break
+            if t0_us is not None and t_last < t0_us:
+                continue
+            if allowed is None or block_no in allowed:
+                selected.append(block_no)
+        return selected
+
+    def read_block(self, block_no: int) -> bytes:
+        """Raw RECORD-sized records of one block."""
+        offset, nframes = self.blocks[block_no][:2]
+        start, size = offset + BLOCK_HEADER.size, nframes * RECORD.size
+        if self._map is None and self._file is None:
+            if self.path.endswith((".gz", ".zst")):
+                self._file = open_trace_file(self.path)
+            else:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map is not None:
+            return self._map[start:start + size]
+        if self._file.tell() > start:
+            self._file.close()
+            self._file = open_trace_file(self.path)
+        self._file.seek(start)
+        return self._file.read(size)
+
+    def frames(self, t0: Optional[float] = None, t1: Optional[float] = None,
+               ids: Optional[frozenset] = None) -> Iterator[TraceRecord]:
+        t0_us = None if t0 is None else int(t0 * 1e6)
+        t1_us = None if t1 is None else int(t1 * 1e6)
+        for block_no in self.select_blocks(t0_us, t1_us, ids):
+            for host_time, _, can_id, msgtype, dlc, data in RECORD.iter_unpack(self.read_block(block_no)):
+                if (t0 is not None and host_time < t0) or (t1 is not None and host_time > t1):
+                    continue
+                if ids is not None and can_id not in ids:
+                    continue
+                yield TraceRecord(host_time, msgtype, can_id, dlc, data[:DLC_2_LEN.get(dlc, dlc)])
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TraceReader:
+    """
+    Time-range / CAN-ID queries over a binary trace: a single .ctrace file or the
+    <trace>.manifest.json of a rotated trace (segments outside the range are not opened).
+
+        with TraceReader("logs/Can_Trace_2026-01-01_06-00-00.manifest.json") as reader:
+            for rec in reader.frames(t_fail - 1.0, t_fail + 1.0, ids={0x111, 0x0AF}):
+                ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path.endswith(".manifest.json"):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            folder = os.path.dirname(path)
+            self._entries = [(os.path.join(folder, seg["file"]), seg["t_first"], seg["t_last"])
+                             for seg in manifest["segments"]]
+        else:
+            self._entries = [(path, None, None)]
+        self._segments: Dict[str, TraceSegment] = {}
+
+    def _segment(self, seg_path: str) -> TraceSegment:
+        if seg_path not in self._segments:
+            self._segments[seg_path] = TraceSegment(seg_path)
+        return self._segments[seg_path]
+
+    def segments(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Iterator[TraceSegment]:
+        """Segments overlapping [t0, t1] in recording order (opened on first use)."""
+        for seg_path, seg_first, seg_last in self._entries:
+            if t1 is not None and seg_first is not None and seg_first > t1:
+                break
+            if t0 is not None and seg_last is not None and seg_last < t0:
+                continue
+            yield self._segment(seg_path)
+
+    def frames(self, t0: Optional[float] = None, t1: Optional[float] = None,
+               ids: Optional[Iterable[int]] = None) -> Iterator[TraceRecord]:
+        """Frames with t0 <= host time <= t1 (seconds since epoch, None = open end) and ID in ids."""
+        ids = frozenset(ids) if ids is not None else None
+        for segment in self.segments(t0, t1):
+            yield from segment.frames(t0, t1, ids)
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,197 @@
+# hardware/can/can_trace_rotation.py
+
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def open_trace_file(path: str):
+    """Opens a (possibly compressed) trace segment for binary reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path}: the zstandard package is required to read .zst trace segments")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+class TraceRotation:
+    """
+    Rolling trace segments for an AsyncTraceWriter.
+
+    The writer thread calls should_rotate() after every block (and once seconds_to_rotate() ran
+    out while no block arrived) and segment_closed() when it
+    switches to the next file (Can_Trace_<timestamp>_0001.ctrace, _0002, ...). Closed segments
+    are compressed on a separate thread, the oldest ones are deleted by the retention limits,
+    and <trace>.manifest.json lists every kept segment with its time range and frame count.
+
+    max_bytes / max_seconds: start a new segment when either limit is reached (None = no limit)
+    compression: "gzip", "zstd" (optional zstandard package, falls back to gzip) or None
+    keep_segments / max_total_bytes: retention over closed segments (None = keep everything)
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 compression: Optional[str] = "gzip", keep_segments: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None):
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Unsupported trace compression '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard package not installed: compressing trace segments with gzip")
+            compression = "gzip"
+
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compression = compression
+        self.keep_segments = keep_segments
+        self.max_total_bytes = max_total_bytes
+
+        self.segments: List[Dict[str, Any]] = []
+        self._index = 0
+        self._lock = threading.Lock()
+        self._compress_queue: queue.Queue = queue.Queue()
+        self._compressing = set()  # "index" of entries queued for / being compressed: exempt from retention
+        self._compress_thread: Optional[threading.Thread] = None
+
+    # ---- called by the trace writer ----
+
+    def start(self, base_path: str) -> str:
+        """Returns the first segment path for a trace that would otherwise be written to base_path."""
+        self._stem, self._ext = os.path.splitext(base_path)
+        self.manifest_path = f"{self._stem}.manifest.json"
+        if self.compression:
+            self._compress_thread = threading.Thread(target=self._compress_loop, name="CanTraceCompress",
+                                                     daemon=True)
+            self._compress_thread.start()
+        return self.next_segment()
+
+    def next_segment(self) -> str:
+        self._index += 1
+        self._opened_at = time.monotonic()
+        return f"{self._stem}_{self._index:04d}{self._ext}"
+
+    def should_rotate(self, segment_bytes: int) -> bool:
+        if self.max_bytes is not None and segment_bytes >= self.max_bytes:
+            return True
+        return self.max_seconds is not None and time.monotonic() - self._opened_at >= self.max_seconds
+
+    def seconds_to_rotate(self) -> Optional[float]:
+        """Time left until max_seconds closes the current segment (None = no time limit)."""
+        if self.max_seconds is None:
+            return None
+        return max(0.0, self.max_seconds - (time.monotonic() - self._opened_at))
+
+    def segment_closed(self, path: str, frames: int, t_first: float, t_last: float, **extra):
+        """
+        Records a finished segment in the manifest and queues it for compression.
+        extra: companion file names (e.g. index_file=...) stored in the entry and deleted with the segment.
+        """
+        entry = {
+            "file": os.path.basename(path),
+            "index": self._index,
+            "t_first": t_first,
+            "t_last": t_last,
+            "frames": frames,
+            "bytes": os.path.getsize(path),
+            **extra,
+        }
+        with self._lock:
+            self.segments.append(entry)
+            if self.compression:
+                self._compressing.add(entry["index"])
+            self._apply_retention()
+            self._write_manifest()
+        if self.compression:
+            self._compress_queue.put(entry)
+
+    def close(self):
+        """Waits until every closed segment is compressed and writes the final manifest."""
+        if self._compress_thread:
+            self._compress_queue.put(None)
+            self._compress_thread.join()
+            self._compress_thread = None
+        with self._lock:
+            self._write_manifest()
+
+    # ---- internals ----
+
+    def _segment_file(self, entry: Dict[str, Any]) -> str:
+        return os.path.join(os.path.dirname(self.manifest_path), entry["file"])
+
+    def _apply_retention(self):
+        def over_limit():
+            if self.keep_segments is not None and len(self.segments) > self.keep_segments:
+                return True
+            total = sum(entry["bytes"] for entry in self.segments)
+            return self.max_total_bytes is not None and total > self.max_total_bytes and len(self.segments) > 1
+
+        # Oldest first; a segment still queued for compression is left alone (the compression
+        # thread applies retention again once it is done with it)
+        while over_limit() and self.segments[0]["index"] not in self._compressing:
+            entry = self.segments.pop(0)
+            for key in ("file", "index_file"):
+                if key not in entry:
+                    continue
+                try:
+                    os.remove(os.path.join(os.path.dirname(self.manifest_path), entry[key]))
+                    logger.info(f"CAN trace retention: removed {entry[key]}")
+                except OSError as e:
+                    logger.warning(f"CAN trace retention: could not remove {entry[key]}: {e}")
+
+    def _write_manifest(self):
+        manifest = {"base": os.path.basename(self._stem), "compression": self.compression, "segments": self.segments}
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _compress_loop(self):
+        while True:
+            entry = self._compress_queue.get()
+            if entry is None:
+                break
+            src = self._segment_file(entry)
+            dst = src + COMPRESSED_SUFFIXES[self.compression]
+            try:
+                self._compress_file(src, dst + ".tmp")
+                os.replace(dst + ".tmp", dst)
+                compressed = True
+            except OSError as e:
+                logger.error(f"CAN trace compression failed for {src}: {e}")
+                compressed = False  # the entry keeps pointing at the uncompressed segment
+            if compressed:
+                try:
+                    os.remove(src)
+                except OSError as e:
+                    logger.warning(f"CAN trace compression: could not remove {src}: {e}")
+            with self._lock:
+                self._compressing.discard(entry["index"])
+                if compressed:
+                    entry["file"] = os.path.basename(dst)
+                    entry["bytes"] = os.path.getsize(dst)
+                self._apply_retention()
+                self._write_manifest()
+
+    def _compress_file(self, src: str, dst: str):
+        with open(src, "rb") as f_in:
+            if self.compression == "zstd":
+                with open(dst, "wb") as f_out:
+                    zstandard.ZstdCompressor(level=3).copy_stream(f_in, f_out)
+            else:
+                with gzip.open(dst, "wb", compresslevel=6) as f_out:
+                    shutil.copyfileobj(f_in, f_out, 1 << 20)
@@ -4,10 +4,21 @@ import threading
 import logging
 import queue
 import yaml
-from hardware.can.PCANBasic import PCANBasic, TPCANMsgFD, TPCANTimestampFD
+from hardware.can.PCANBasic import PCANBasic, TPCANMsgFD, PCAN_MESSAGE_FILTER, \
+    PCAN_FILTER_CLOSE, PCAN_FILTER_OPEN, PCAN_MODE_STANDARD, PCAN_MODE_EXTENDED
 from hardware.can.can_logger import log_can_message
+from hardware.can.can_frame_ring import CanFrame, CanFrameRing
+from hardware.can.can_frame_bus import CanFrameBus
+from hardware.can.can_receive_event import PcanReceiveEvent
+from hardware.can.can_binary_trace import AsyncTraceWriter
 from hardware.can.pcan_constants import *
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Iterable, List, Tuple, FrozenSet, Callable
+
+# Highest 11-bit identifier; anything above is registered as a 29-bit range
+MAX_STANDARD_ID = 0x7FF
+
+# Physical UDS response IDs (ECU -> tester) that must pass the acceptance filter
+UDS_RESPONSE_IDS = (0x14DAF140,)
 
 
 class SignalDecoder(threading.Thread):
@@ -92,23 +103,113 @@ def start_decoder(config_path: str,
     return decoder
 
 
+def merge_id_ranges(can_ids: Iterable[int]) -> List[Tuple[int, int]]:
+    """Sorts IDs and merges adjacent ones into the minimal list of inclusive (from, to) ranges."""
+    ranges: List[Tuple[int, int]] = []
+    for can_id in sorted(set(can_ids)):
+        if ranges and can_id == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], can_id)
+        else:
+            ranges.append((can_id, can_id))
+    return ranges
+
+
+def split_id_ranges(ranges: Iterable[Tuple[int, int]]) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """Splits ranges into (standard, extended) lists; a range straddling 0x7FF/0x800 goes into both."""
+    standard: List[Tuple[int, int]] = []
+    extended: List[Tuple[int, int]] = []
+    for from_id, to_id in ranges:
+        if from_id <= MAX_STANDARD_ID:
+            standard.append((from_id, min(to_id, MAX_STANDARD_ID)))
+        if to_id > MAX_STANDARD_ID:
+            extended.append((max(from_id, MAX_STANDARD_ID + 1), to_id))
+    return standard, extended
+
+
+def apply_acceptance_filter(pcan: PCANBasic, channel, can_ids: Iterable[int],
+                            logger: logging.Logger) -> FrozenSet[int]:
+    """
+    Programs the PCAN acceptance filter for the given IDs (call before rx_monitor starts).
+
+    PCAN-Basic widens its filter with every FilterMessages call, so the hardware may still let
+    IDs between two ranges through. The returned set is therefore always used by rx_monitor as
+    an exact software filter; if the hardware filter cannot be set, it is the only filter.
+    """
+    id_set = frozenset(can_ids)
+    standard, extended = split_id_ranges(merge_id_ranges(id_set))
+
+    # Close the filter first so only the registered ranges are opened again
+    result = pcan.SetValue(channel, PCAN_MESSAGE_FILTER, PCAN_FILTER_CLOSE)
+    if result != PCAN_ERROR_OK:
+        logger.warning(f"Acceptance filter not supported (0x{result:X}); using software ID filter only.")
+        return id_set
+
+    for ranges, mode in ((standard, PCAN_MODE_STANDARD), (extended, PCAN_MODE_EXTENDED)):
+        for from_id, to_id in ranges:
+            result = pcan.FilterMessages(channel, from_id, to_id, mode)
+            if result != PCAN_ERROR_OK:
+                logger.warning(f"FilterMessages 0x{from_id:X}-0x{to_id:X} failed (0x{result:X}); "
+                               f"reopening filter, using software ID filter only.")
+                pcan.SetValue(channel, PCAN_MESSAGE_FILTER, PCAN_FILTER_OPEN)
+                return id_set
+
+    logger.info(f"Acceptance filter set: {len(standard)} standard / {len(extended)} extended range(s) "
+                f"for {len(id_set)} CAN IDs.")
+    return id_set
+
+
+def _make_rx_waiter(pcan: PCANBasic, channel, use_receive_event: bool, poll_interval: float,
+                    event_timeout: float, logger: logging.Logger) -> Tuple[Callable[[], Any], Callable[[], None]]:
+    """
+    Returns (wait, close) for an RX loop: either block on the PCAN receive event (wakes only
+    when frames arrive, event_timeout bounds the stop_event check) or the classic sleep poll.
+    """
+    if use_receive_event:
+        try:
+            event = PcanReceiveEvent(pcan, channel)
+            logger.info("RX thread waiting on PCAN receive event.")
+            return (lambda: event.wait(event_timeout)), event.close
+        except OSError as e:
+            logger.warning(f"PCAN receive event unavailable ({e}); falling back to {poll_interval}s polling.")
+    return (lambda: time.sleep(poll_interval)), (lambda: None)
+
+
 def rx_monitor(pcan: PCANBasic, channel,
                stop_event: threading.Event,
                logger: logging.Logger,
                frame_queue: queue.Queue,
-               poll_interval: float = 0.001):
-    """Continuously poll RX queue and log messages."""
-    msg, ts = TPCANMsgFD(), TPCANTimestampFD()
+               poll_interval: float = 0.001,
+               id_filter: Optional[FrozenSet[int]] = None,
+               use_receive_event: bool = False,
+               event_timeout: float = 0.1,
+               trace_writer: Optional[AsyncTraceWriter] = None,
+               frame_bus: Optional[CanFrameBus] = None):
+    """
+    Continuously poll RX queue and log messages.
+    id_filter: optional set of CAN IDs to enqueue (see apply_acceptance_filter); every frame that
+    reaches the PC is still written to the trace log.
+    use_receive_event: sleep on the PCAN receive event between drains instead of polling.
+    trace_writer: record frames through the asynchronous binary writer instead of the text logger.
+    frame_bus: also publish every enqueued frame to this bus while it has subscribers.
+    Queue items are CanFrame(msg, hardware timestamp in us).
+    """
+    wait, close_waiter = _make_rx_waiter(pcan, channel, use_receive_event, poll_interval, event_timeout, logger)
     while not stop_event.is_set():
         while True:
             result, msg, ts = pcan.ReadFD(channel)
             if result == PCAN_ERROR_OK:
 
                 """ write can bus message into the log """
-                log_can_message(msg, logger)
+                if trace_writer is not None:
+                    trace_writer.write(msg, ts.value)
+                else:
+                    log_can_message(msg, logger)
 
-                """ write can bus message into the log """
-                frame_queue.put(msg)  # enqueue valid message
+                """ enqueue valid message (only IDs someone consumes, when filtering) """
+                if id_filter is None or msg.ID in id_filter:
+                    frame_queue.put(CanFrame(msg, ts.value))
+                    if frame_bus is not None and frame_bus.has_subscribers:
+                        frame_bus.publish(msg, ts.value)
 
             elif result == PCAN_ERROR_QRCVEMPTY:
                 # no more frames in RX queue
@@ -121,7 +222,49 @@ def rx_monitor(pcan: PCANBasic, channel,
                 else:
                     logger.error(f"RX error: 0x{result:X} (failed to decode error text)")
                 break
-        time.sleep(poll_interval)
+        if trace_writer is not None:
+            trace_writer.flush_if_due()
+        wait()
+    close_waiter()
+
+
+def rx_monitor_ring(pcan: PCANBasic, channel,
+                    stop_event: threading.Event,
+                    logger: logging.Logger,
+                    ring: CanFrameRing,
+                    poll_interval: float = 0.001,
+                    id_filter: Optional[FrozenSet[int]] = None,
+                    use_receive_event: bool = False,
+                    event_timeout: float = 0.1,
+                    trace_writer: Optional[AsyncTraceWriter] = None):
+    """
+    Bulk RX path: drains the driver queue straight into the preallocated frame ring
+    (no per-frame ctypes allocation, no queue.put). Consumers read via CanRingReader.
+    Like rx_monitor, every frame that reaches the PC is traced, including those rejected by id_filter.
+    """
+    wait, close_waiter = _make_rx_waiter(pcan, channel, use_receive_event, poll_interval, event_timeout, logger)
+    """ write can bus messages into the log as they are read, before filtered slots are reused """
+    if trace_writer is not None:
+        trace = trace_writer.write
+    else:
+        trace = lambda msg, ts: log_can_message(msg, logger)
+    while not stop_event.is_set():
+        _, result = ring.drain(pcan, channel, id_filter, on_read=trace)
+        if trace_writer is not None:
+            trace_writer.flush_if_due()
+
+        if result == PCAN_ERROR_OK:
+            # ring-sized batch read and the driver may hold more: drain again without sleeping
+            continue
+        if result != PCAN_ERROR_QRCVEMPTY:
+            # unwrap error text safely
+            err_code, err_text = pcan.GetErrorText(result)
+            if err_code == PCAN_ERROR_OK:
+                logger.error(f"RX error: {err_text.decode('utf-8', errors='ignore')}")
+            else:
+                logger.error(f"RX error: 0x{result:X} (failed to decode error text)")
+        wait()
+    close_waiter()
 
 
 def periodic_tx(pcan: PCANBasic, channel, stop_event: threading.Event,
@@ -0,0 +1,391 @@
+# hardware/can/virtual_pcan.py
+
+import heapq
+import os
+import random
+import threading
+import time
+from collections import deque
+from ctypes import addressof, memmove, sizeof
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from hardware.can.PCANBasic import TPCANMsgFD, TPCANTimestampFD, \
+    PCAN_RECEIVE_EVENT, PCAN_MESSAGE_FILTER, PCAN_ALLOW_ECHO_FRAMES, PCAN_API_VERSION, \
+    PCAN_FILTER_CLOSE, PCAN_FILTER_OPEN, PCAN_FILTER_CUSTOM, PCAN_PARAMETER_ON, PCAN_PARAMETER_OFF, \
+    PCAN_ERROR_OK, PCAN_ERROR_QRCVEMPTY, PCAN_ERROR_QOVERRUN, PCAN_ERROR_INITIALIZE, PCAN_ERROR_ILLPARAMTYPE, \
+    PCAN_ERROR_ILLPARAMVAL, PCAN_ERROR_ILLOPERATION
+from hardware.can.pcan_constants import *
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+MSG_SIZE = sizeof(TPCANMsgFD)
+LEN_2_DLC = {length: dlc for dlc, length in DLC_2_LEN.items()}
+
+_ERROR_TEXTS = {
+    PCAN_ERROR_OK: b"No error",
+    PCAN_ERROR_QRCVEMPTY: b"The receive queue is empty",
+    PCAN_ERROR_QOVERRUN: b"The receive queue was read too late",
+    PCAN_ERROR_INITIALIZE: b"Channel is not initialized or already initialized",
+    PCAN_ERROR_ILLPARAMTYPE: b"Invalid parameter",
+    PCAN_ERROR_ILLPARAMVAL: b"Invalid parameter value",
+    PCAN_ERROR_ILLOPERATION: b"Invalid operation",
+}
+
+# Default UDS behaviour of the simulated ECU: request service data (after the ISO-TP PCI)
+# prefix -> response service data; None = no response (suppressPosRspMsgIndicationBit)
+DEFAULT_UDS_SCRIPT: Dict[bytes, Optional[List[bytes]]] = {
+    bytes([0x3E, 0x80]): None,
+    bytes([0x3E, 0x00]): [bytes([0x7E, 0x00])],
+    bytes([0x10, 0x01]): [bytes([0x50, 0x01, 0x00, 0x32, 0x01, 0xF4])],
+    bytes([0x10, 0x03]): [bytes([0x50, 0x03, 0x00, 0x32, 0x01, 0xF4])],
+    bytes([0x27, 0x01]): [bytes([0x67, 0x01, 0x11, 0x22, 0x33, 0x44])],
+    bytes([0x27, 0x02]): [bytes([0x67, 0x02])],
+    bytes([0x2F, 0xFD, 0x04]): [bytes([0x6F, 0xFD, 0x04, 0x03])],
+}
+
+
+def _param(value) -> int:
+    """PCAN parameters / modes are ctypes constants in PCANBasic.py; compare by value."""
+    return getattr(value, "value", value)
+
+
+def make_msg(can_id: int, data: bytes, msgtype: int = PCAN_MESSAGE_FD | PCAN_MESSAGE_BRS) -> TPCANMsgFD:
+    """TPCANMsgFD with DLC derived from the payload length (padded up to the next CAN FD length)."""
+    if can_id > 0x7FF:
+        msgtype |= PCAN_MESSAGE_EXTENDED
+    length = len(data)
+    if msgtype & PCAN_MESSAGE_FD:
+        length = min(l for l in LEN_2_DLC if l >= length)
+    msg = TPCANMsgFD()
+    msg.ID = can_id
+    msg.MSGTYPE = msgtype
+    msg.DLC = LEN_2_DLC[length] if msgtype & PCAN_MESSAGE_FD else length
+    msg.DATA[:len(data)] = data
+    for i in range(len(data), length):
+        msg.DATA[i] = 0xCC  # ISO-TP padding
+    return msg
+
+
+@dataclass(order=True)
+class _ScheduledFrame:
+    due: float
+    seq: int
+    frame: Union["LoadGenerator", Tuple[bytes, int]] = field(compare=False)
+
+
+@dataclass
+class LoadGenerator:
+    """
+    Periodic frame source on the virtual bus.
+    payload: fixed bytes, or a callable(frame counter) -> bytes (e.g. changing signal values)
+    can_ids: a list of IDs to cycle through (random bus load) instead of a single can_id
+    """
+    can_id: int
+    period: float
+    payload: Union[bytes, Callable[[int], bytes]] = bytes(8)
+    msgtype: int = PCAN_MESSAGE_FD | PCAN_MESSAGE_BRS
+    can_ids: Optional[List[int]] = None
+    count: int = 0
+
+    def next_frame(self) -> bytes:
+        data = self.payload(self.count) if callable(self.payload) else self.payload
+        can_id = self.can_ids[self.count % len(self.can_ids)] if self.can_ids else self.can_id
+        self.count += 1
+        return bytes(make_msg(can_id, data, self.msgtype))
+
+
+class _VirtualChannel:
+    def __init__(self, rx_queue_size: int):
+        self.rx = deque()
+        self.rx_queue_size = rx_queue_size
+        self.echo = False
+        self.filter_state = PCAN_FILTER_OPEN
+        self.filter_ranges: List[Tuple[int, int, bool]] = []
+        self.values: Dict[int, int] = {}
+        self.event_r = self.event_w = None
+        self.event_set = False
+        self.overrun = False
+        self.rx_dropped = 0
+
+    def accepts(self, can_id: int, extended: bool) -> bool:
+        if self.filter_state == PCAN_FILTER_OPEN:
+            return True
+        if self.filter_state == PCAN_FILTER_CLOSE:
+            return False
+        return any(lo <= can_id <= hi and ext == extended for lo, hi, ext in self.filter_ranges)
+
+
+class VirtualPCANBasic:
+    """
+    In-process stand-in for PCANBasic (no PEAK DLL, no device) with the subset of the API this
+    application uses: InitializeFD / Uninitialize / Reset / GetStatus / ReadFD / ReadFDInto /
+    WriteFD / FilterMessages / GetValue / SetValue / GetErrorText.
+
+    The virtual bus delivers
+      - echo frames of WriteFD (PCAN_ALLOW_ECHO_FRAMES on),
+      - frames from load generators (add_periodic / add_random_load), produced by a bus thread
+        in 1 ms batches so tens of thousands of frames per second are possible,
+      - scripted UDS responses to single-frame requests on uds_request_id (script_uds).
+    On Linux GetValue(PCAN_RECEIVE_EVENT) returns a pipe fd that is readable while frames are
+    queued, like the real driver, so the event-driven RX path can be exercised too.
+    """
+
+    def __init__(self, rx_queue_size: int = 32768, uds_request_id: int = 0x14DA40F1,
+                 uds_response_id: int = 0x14DAF140, uds_delay: float = 0.005, tick: float = 0.001):
+        self.rx_queue_size = rx_queue_size
+        self.uds_request_id = uds_request_id
+        self.uds_response_id = uds_response_id
+        self.uds_delay = uds_delay
+        self.tick = tick
+        self.uds_script: Dict[bytes, Optional[List[bytes]]] = dict(DEFAULT_UDS_SCRIPT)
+
+        self._channels: Dict[int, _VirtualChannel] = {}
+        self._lock = threading.Lock()
+        self._schedule: List[_ScheduledFrame] = []
+        self._seq = 0
+        self._t0 = time.perf_counter()
+        self._stop = threading.Event()
+        self._bus_thread: Optional[threading.Thread] = None
+
+    # ---- virtual bus configuration ----
+
+    def add_periodic(self, can_id: int, period: float, payload: Union[bytes, Callable[[int], bytes]] = bytes(8),
+                     msgtype: int = PCAN_MESSAGE_FD | PCAN_MESSAGE_BRS) -> LoadGenerator:
+        """Cyclic frame, e.g. add_periodic(0x111, 0.01, lambda n: bytes([n % 4, 0, 0x7C]))."""
+        generator = LoadGenerator(can_id, period, payload, msgtype)
+        self._schedule_frame(time.perf_counter(), generator)
+        return generator
+
+    def add_random_load(self, frames_per_second: float, id_range: Tuple[int, int] = (0x100, 0x6FF),
+                        length: int = 64, seed: int = 0) -> LoadGenerator:
+        """Background traffic of random IDs / payloads at a fixed frame rate (decoder ignores most of it)."""
+        rnd = random.Random(seed)
+        ids = [rnd.randint(*id_range) for _ in range(1024)]
+        payloads = [bytes(rnd.randrange(256) for _ in range(length)) for _ in range(64)]
+        generator = LoadGenerator(ids[0], 1.0 / frames_per_second, lambda n: payloads[n % len(payloads)],
+                                  can_ids=ids)
+        self._schedule_frame(time.perf_counter(), generator)
+        return generator
+
+    def script_uds(self, request: bytes, responses: Optional[List[bytes]]):
+        """Response service data for requests starting with `request` (None: no response)."""
+        self.uds_script[bytes(request)] = responses
+
+    # ---- PCANBasic API ----
+
+    def InitializeFD(self, Channel, BitrateFD):
+        channel = _param(Channel)
+        with self._lock:
+            if channel in self._channels:
+                return PCAN_ERROR_INITIALIZE
+            self._channels[channel] = _VirtualChannel(self.rx_queue_size)
+        if self._bus_thread is None:
+            self._stop.clear()
+            self._bus_thread = threading.Thread(target=self._bus_loop, name="VirtualPCANBus", daemon=True)
+            self._bus_thread.start()
+        return PCAN_ERROR_OK
+
+    def Uninitialize(self, Channel):
+        with self._lock:
+            ch = self._channels.pop(_param(Channel), None)
+            if ch is None:
+                return PCAN_ERROR_INITIALIZE
+            for fd in (ch.event_r, ch.event_w):
+                if fd is not None:
+                    os.close(fd)
+            if not self._channels:
+                self._stop.set()
+        if self._stop.is_set() and self._bus_thread is not None:
+            self._bus_thread.join()
+            self._bus_thread = None
+        return PCAN_ERROR_OK
+
+    def Reset(self, Channel):
+        with self._lock:
+            ch = self._channels.get(_param(Channel))
+            if ch is None:
+                return PCAN_ERROR_INITIALIZE
+            ch.rx.clear()
+            self._set_event(ch)
+        return PCAN_ERROR_OK
+
+    def GetStatus(self, Channel):
+        return PCAN_ERROR_OK if _param(Channel) in self._channels else PCAN_ERROR_INITIALIZE
+
+    def ReadFD(self, Channel):
+        msg, timestamp = TPCANMsgFD(), TPCANTimestampFD()
+        return self.ReadFDInto(Channel, msg, timestamp), msg, timestamp
+
+    def ReadFDInto(self, Channel, MessageBuffer, TimestampBuffer):
+        with self._lock:
+            ch = self._channels.get(_param(Channel))
+            if ch is None:
+                return PCAN_ERROR_INITIALIZE
+            if not ch.rx:
+                return PCAN_ERROR_QRCVEMPTY
+            raw, timestamp = ch.rx.popleft()
+            if not ch.rx:
+                self._set_event(ch)
+            status = PCAN_ERROR_QOVERRUN if ch.overrun else PCAN_ERROR_OK
+            ch.overrun = False
+        memmove(addressof(MessageBuffer), raw, MSG_SIZE)
+        TimestampBuffer.value = timestamp
+        return status
+
+    def WriteFD(self, Channel, MessageBuffer):
+        channel = _param(Channel)
+        ch = self._channels.get(channel)
+        if ch is None:
+            return PCAN_ERROR_INITIALIZE
+        raw = bytes(MessageBuffer)
+        if ch.echo:
+            echo = TPCANMsgFD.from_buffer_copy(raw)
+            echo.MSGTYPE |= PCAN_MESSAGE_ECHO
+            self._deliver(bytes(echo), self._now_us())
+        if MessageBuffer.ID == self.uds_request_id:
+            self._respond_uds(MessageBuffer)
+        return PCAN_ERROR_OK
+
+    def FilterMessages(self, Channel, FromID, ToID, Mode):
+        ch = self._channels.get(_param(Channel))
+        if ch is None:
+            return PCAN_ERROR_INITIALIZE
+        with self._lock:
+            ch.filter_ranges.append((FromID, ToID, bool(_param(Mode) & PCAN_MESSAGE_EXTENDED)))
+            ch.filter_state = PCAN_FILTER_CUSTOM
+        return PCAN_ERROR_OK
+
+    def GetValue(self, Channel, Parameter):
+        ch = self._channels.get(_param(Channel))
+        parameter = _param(Parameter)
+        if parameter == _param(PCAN_API_VERSION):
+            return PCAN_ERROR_OK, b"virtual"
+        if ch is None:
+            return PCAN_ERROR_INITIALIZE, 0
+        with self._lock:
+            if parameter == _param(PCAN_RECEIVE_EVENT):
+                if not hasattr(os, "pipe") or os.name == "nt":
+                    return PCAN_ERROR_ILLPARAMTYPE, 0
+                if ch.event_r is None:
+                    ch.event_r, ch.event_w = os.pipe()
+                    os.set_blocking(ch.event_r, False)
+                    self._set_event(ch)
+                return PCAN_ERROR_OK, ch.event_r
+            if parameter == _param(PCAN_MESSAGE_FILTER):
+                return PCAN_ERROR_OK, ch.filter_state
+            if parameter == _param(PCAN_ALLOW_ECHO_FRAMES):
+                return PCAN_ERROR_OK, PCAN_PARAMETER_ON if ch.echo else PCAN_PARAMETER_OFF
+            if parameter in ch.values:
+                return PCAN_ERROR_OK, ch.values[parameter]
+        return PCAN_ERROR_ILLPARAMTYPE, 0
+
+    def SetValue(self, Channel, Parameter, Buffer):
+        ch = self._channels.get(_param(Channel))
+        if ch is None:
+            return PCAN_ERROR_INITIALIZE
+        parameter = _param(Parameter)
+        with self._lock:
+            if parameter == _param(PCAN_MESSAGE_FILTER):
+                if Buffer not in (PCAN_FILTER_OPEN, PCAN_FILTER_CLOSE):
+                    return PCAN_ERROR_ILLPARAMVAL
+                ch.filter_state = Buffer
+                ch.filter_ranges.clear()
+            elif parameter == _param(PCAN_ALLOW_ECHO_FRAMES):
+                ch.echo = Buffer == PCAN_PARAMETER_ON
+            elif parameter == _param(PCAN_RECEIVE_EVENT):
+                return PCAN_ERROR_ILLPARAMTYPE  # Win32 event handles are not simulated
+            else:
+                ch.values[parameter] = Buffer
+        return PCAN_ERROR_OK
+
+    def GetErrorText(self, Error, Language=0):
+        return PCAN_ERROR_OK, _ERROR_TEXTS.get(Error, b"Unknown error")
+
+    def stats(self) -> Dict[int, Dict[str, int]]:
+        """Per-channel queued / dropped frame counts (RX queue overflow = consumer too slow)."""
+        with self._lock:
+            return {channel: {"queued": len(ch.rx), "dropped": ch.rx_dropped}
+                    for channel, ch in self._channels.items()}
+
+    # ---- virtual bus internals ----
+
+    def _now_us(self) -> int:
+        return int((time.perf_counter() - self._t0) * 1e6)
+
+    def _set_event(self, ch: _VirtualChannel):
+        """Keeps the event pipe readable exactly while the RX queue is non-empty (lock held)."""
+        if ch.event_r is None:
+            return
+        if ch.rx and not ch.event_set:
+            os.write(ch.event_w, b"x")
+            ch.event_set = True
+        elif not ch.rx and ch.event_set:
+            os.read(ch.event_r, 1)
+            ch.event_set = False
+
+    def _deliver(self, raw: bytes, timestamp: int):
+        msg_id = int.from_bytes(raw[:4], "little")
+        extended = bool(raw[4] & PCAN_MESSAGE_EXTENDED)
+        with self._lock:
+            for ch in self._channels.values():
+                if not ch.accepts(msg_id, extended):
+                    continue
+                if len(ch.rx) >= ch.rx_queue_size:
+                    ch.rx_dropped += 1
+                    ch.overrun = True
+                    continue
+                ch.rx.append((raw, timestamp))
+                self._set_event(ch)
+
+    def _schedule_frame(self, due: float, frame):
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._schedule, _ScheduledFrame(due, self._seq, frame))
+
+    def _bus_loop(self):
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            due_frames = []
+            with self._lock:
+                while self._schedule and self._schedule[0].due <= now:
+                    due_frames.append(heapq.heappop(self._schedule))
+            timestamp = self._now_us()
+            for item in due_frames:
+                if isinstance(item.frame, LoadGenerator):
+                    # Catch up on every period that elapsed during the last tick
+                    due = item.due
+                    while due <= now:
+                        self._deliver(item.frame.next_frame(), timestamp)
+                        due += item.frame.period
+                    self._schedule_frame(due, item.frame)
+                else:
+                    self._deliver(item.frame[0], timestamp)
+            self._stop.wait(self.tick)
+
+    def _respond_uds(self, request: TPCANMsgFD):
+        """Single-frame ISO-TP request -> scripted single-frame response(s) after uds_delay."""
+        data = bytes(request.DATA[:DLC_2_LEN.get(request.DLC, request.DLC)])
+        if not data:
+            return
+        if data[0] & 0xF0:
+            return  # first / consecutive / flow-control frames are not simulated
+        if data[0]:
+            service_data = data[1:1 + data[0]]
+        else:
+            service_data = data[2:2 + data[1]]  # CAN FD single frame with escape length byte
+        if not service_data:
+            return
+
+        responses = [bytes([0x7F, service_data[0], 0x11])]  # default: serviceNotSupported
+        for prefix in sorted(self.uds_script, key=len, reverse=True):
+            if service_data.startswith(prefix):
+                responses = self.uds_script[prefix] or []
+                break
+
+        due = time.perf_counter() + self.uds_delay
+        for response in responses:
+            pci = bytes([len(response)]) if len(response) <= 7 else bytes([0x00, len(response)])
+            payload = pci + response
+            msg = make_msg(self.uds_response_id, payload + bytes([0xCC] * max(0, 8 - len(payload))),
+                           request.MSGTYPE & (PCAN_MESSAGE_FD | PCAN_MESSAGE_BRS))
+            self._schedule_frame(due, (bytes(msg), 0))
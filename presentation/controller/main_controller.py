@@ -34,6 +34,13 @@ class MainController(QObject):
         self.model.sig_wiper_current_state_update.connect(self._handle_wiper_current_state_text_update)
         # -------------------------------------
 
+        # Live plot of any decoded signal, fed from the state store's history rings
+        self.view.add_signal_plot(self.model.can_state_store)
+
+        # Raw frame table: live RX ring once a CAN worker runs with USE_CAN_FRAME_RING, or a recorded trace
+        self.view.add_trace_view()
+        self.model.sig_can_frame_ring_ready.connect(self.view.trace_view.set_ring)
+
     # --- Slots for UI Input (Phase 1: PN Scan) ---
 
     @Slot(str)
@@ -0,0 +1,419 @@
+# presentation/views/can_trace_view.py
+
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from ctypes import sizeof
+from typing import Iterable, Optional, Tuple
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PySide6.QtGui import QFont
+from PySide6.QtWidgets import (QCheckBox, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QLineEdit,
+                               QPushButton, QTableView, QVBoxLayout, QWidget)
+
+from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.pcan_constants import *
+from hardware.can.can_logger import fmt_can_id, fmt_can_type
+from hardware.can.can_binary_trace import MSG_OFFSET, RECORD, RECORD_HEAD
+from hardware.can.can_frame_ring import CanFrameRing
+from hardware.can.can_trace_index import TraceReader
+from can_fd.canfd.canfd_enum import DLC_2_LEN
+
+TRACE_COLUMNS = ("Time (s)", "Dir", "Type", "ID", "DLC", "Len", "Data")
+
+
+def parse_id_filter(text: str) -> Optional[frozenset]:
+    """'0x111, 14DAF140' -> frozenset of IDs (hex, optional 0x); empty text = no filter."""
+    ids = [int(part, 16) for part in text.replace(";", ",").replace(" ", ",").split(",") if part.strip()]
+    return frozenset(ids) if ids else None
+
+
+class _TraceTableModel(QAbstractTableModel):
+    """
+    Shared table layout. Subclasses only map a row number to (relative time in s, TPCANMsgFD);
+    the cell text is built in data(), i.e. only for the rows the view actually paints.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.ids: Optional[frozenset] = None
+        self.t_from: Optional[float] = None
+        self.t_to: Optional[float] = None
+
+    def frame(self, row: int) -> Optional[Tuple[float, TPCANMsgFD]]:
+        raise NotImplementedError
+
+    def set_filter(self, ids: Optional[Iterable[int]], t_from: Optional[float], t_to: Optional[float]):
+        """ID set (None = all) and time range in seconds relative to the start of the source."""
+        raise NotImplementedError
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(TRACE_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return TRACE_COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        frame = self.frame(index.row())
+        if frame is None:
+            return "(overwritten)" if index.column() == 0 else ""
+        seconds, msg = frame
+        column = index.column()
+        if column == 0:
+            return f"{seconds:.6f}"
+        if column == 1:
+            return "TX" if msg.MSGTYPE & PCAN_MESSAGE_ECHO else "RX"
+        if column == 2:
+            return fmt_can_type(msg)
+        if column == 3:
+            return fmt_can_id(msg)
+        if column == 4:
+            return f"{msg.DLC:X}"
+        length = DLC_2_LEN.get(msg.DLC, msg.DLC)
+        if column == 5:
+            return str(length)
+        return " ".join(f"{b:02X}" for b in bytes(msg.DATA[:length]))
+
+
+class RingTraceModel(_TraceTableModel):
+    """
+    Live view of a CanFrameRing (RX thread in frame ring mode). Rows are ring sequence numbers:
+    a GUI timer appends the new ones that pass the filter and drops those the producer has
+    overwritten, so the table never holds more than one ring of rows. Paused, the model works on
+    a copy of the ring taken at pause time.
+    """
+
+    def __init__(self, ring: CanFrameRing, refresh_ms: int = 100, parent=None):
+        super().__init__(parent)
+        self.ring = ring
+        self._seqs = array("q")    # matching sequence numbers, oldest first
+        self._next = ring.head     # first sequence number not looked at yet
+        self._frozen = None        # (msgs bytes, timestamps, first valid seq, end seq) while paused
+        self.t_origin_us: Optional[int] = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(refresh_ms)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start()
+
+    @property
+    def paused(self) -> bool:
+        return self._frozen is not None
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._seqs)
+
+    def _matches(self, msg: TPCANMsgFD, timestamp: int) -> bool:
+        if self.ids is not None and msg.ID not in self.ids:
+            return False
+        if self.t_from is None and self.t_to is None:
+            return True
+        seconds = (timestamp - self.t_origin_us) / 1e6
+        return (self.t_from is None or seconds >= self.t_from) and (self.t_to is None or seconds <= self.t_to)
+
+    def poll(self):
+        """Timer slot: drop overwritten rows, append new matching frames."""
+        if self.paused:
+            return
+        ring = self.ring
+        head = ring.head
+        oldest = head - ring.capacity + 1
+
+        stale = bisect_left(self._seqs, oldest)
+        if stale:
+            self.beginRemoveRows(QModelIndex(), 0, stale - 1)
+            del self._seqs[:stale]
+            self.endRemoveRows()
+
+        new = array("q")
+        for seq in range(max(self._next, oldest), head):
+            msg, timestamp = ring.frame(seq)
+            if self.t_origin_us is None:
+                self.t_origin_us = timestamp
+            if self._matches(msg, timestamp):
+                new.append(seq)
+        self._next = head
+        if new:
+            first = len(self._seqs)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self._seqs.extend(new)
+            self.endInsertRows()
+
+    def _frozen_frame(self, seq: int) -> Tuple[TPCANMsgFD, int]:
+        msgs, timestamps, _, _ = self._frozen
+        slot = seq & (self.ring.capacity - 1)
+        return TPCANMsgFD.from_buffer_copy(msgs, slot * sizeof(TPCANMsgFD)), timestamps[slot]
+
+    def set_paused(self, paused: bool):
+        if paused and not self.paused:
+            self.poll()
+            ring = self.ring
+            end = self._next  # rows cover everything before the poll's head
+            msgs, timestamps = bytes(ring.msgs), array("Q", bytes(ring.timestamps))
+            # Slots the producer reached while they were copied are not part of the snapshot
+            oldest = max(0, ring.head - ring.capacity + 1)
+            self._frozen = (msgs, timestamps, oldest, end)
+            stale = bisect_left(self._seqs, oldest)
+            if stale:
+                self.beginRemoveRows(QModelIndex(), 0, stale - 1)
+                del self._seqs[:stale]
+                self.endRemoveRows()
+        elif not paused and self.paused:
+            self._frozen = None
+            self.poll()
+
+    def set_filter(self, ids, t_from, t_to):
+        """
+        Applies to the frames still held by the ring and to everything received afterwards.
+        While paused, the rows are rebuilt from the frozen snapshot.
+        """
+        self.beginResetModel()
+        self.ids = frozenset(ids) if ids is not None else None
+        self.t_from, self.t_to = t_from, t_to
+        ring = self.ring
+        self._seqs = array("q")
+        if self.paused:
+            _, _, oldest, end = self._frozen
+            for seq in range(oldest, end):
+                msg, timestamp = self._frozen_frame(seq)
+                if self._matches(msg, timestamp):
+                    self._seqs.append(seq)
+        else:
+            self._next = max(0, ring.head - ring.capacity + 1)
+        self.endResetModel()
+        self.poll()
+
+    def frame(self, row: int) -> Optional[Tuple[float, TPCANMsgFD]]:
+        seq = self._seqs[row]
+        if self._frozen is not None:
+            msg, timestamp = self._frozen_frame(seq)
+        else:
+            if not self.ring.is_valid(seq):
+                return None
+            msg, timestamp = self.ring.frame(seq)
+        return (timestamp - (self.t_origin_us or 0)) / 1e6, msg
+
+
+class FileTraceModel(_TraceTableModel):
+    """
+    A recorded binary trace (.ctrace(.gz/.zst) or rotated .manifest.json) read straight from its
+    segments. Rows map onto (segment, block, record) through the segment index: unfiltered, the
+    row count comes from the index alone; with an ID / time filter the selected blocks are
+    scanned a chunk at a time as the view scrolls (canFetchMore / fetchMore), keeping only the
+    matching record numbers. Block payloads are read on demand into a small LRU cache.
+    """
+
+    FETCH_BLOCKS = 32
+    CACHE_BLOCKS = 16
+
+    def __init__(self, path: str, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.reader = TraceReader(path)
+        first = next(iter(self.reader.segments()), None)
+        self.t_origin = first.blocks[0][2] / 1e6 if first is not None and first.blocks else 0.0
+
+        self._pending = []                  # (segment, block_no) not scanned yet
+        self._blocks = []                   # (segment, block_no, matching record numbers or None = all)
+        self._starts = array("q")           # first row of each entry of _blocks
+        self._rows = 0
+        self._cache = OrderedDict()
+        self.set_filter(None, None, None)
+
+    def close(self):
+        self.reader.close()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._rows
+
+    def _add_block(self, segment, block_no: int, matches: Optional[array], count: int):
+        self._blocks.append((segment, block_no, matches))
+        self._starts.append(self._rows)
+        self._rows += count
+
+    def set_filter(self, ids, t_from, t_to):
+        self.beginResetModel()
+        self.ids = frozenset(ids) if ids is not None else None
+        self.t_from, self.t_to = t_from, t_to
+        t0 = None if t_from is None else self.t_origin + t_from
+        t1 = None if t_to is None else self.t_origin + t_to
+        self._abs_range = (t0, t1)
+        t0_us = None if t0 is None else int(t0 * 1e6)
+        t1_us = None if t1 is None else int(t1 * 1e6)
+
+        self._blocks, self._starts, self._rows = [], array("q"), 0
+        self._pending = [(segment, block_no)
+                         for segment in self.reader.segments(t0, t1)
+                         for block_no in segment.select_blocks(t0_us, t1_us, self.ids)]
+        if self.ids is None and t0 is None and t1 is None:
+            # Every record of every block is a row: no scan needed
+            for segment, block_no in self._pending:
+                self._add_block(segment, block_no, None, segment.blocks[block_no][1])
+            self._pending = []
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and bool(self._pending)
+
+    def fetchMore(self, parent=QModelIndex()):
+        chunk, self._pending = self._pending[:self.FETCH_BLOCKS], self._pending[self.FETCH_BLOCKS:]
+        ids, (t0, t1) = self.ids, self._abs_range
+        scanned = []
+        for segment, block_no in chunk:
+            matches = array("I")
+            for record_no, (host_time, _, can_id, _, _, _) in enumerate(RECORD.iter_unpack(self._block(segment, block_no))):
+                if ids is not None and can_id not in ids:
+                    continue
+                if (t0 is not None and host_time < t0) or (t1 is not None and host_time > t1):
+                    continue
+                matches.append(record_no)
+            if matches:
+                scanned.append((segment, block_no, matches))
+
+        added = sum(len(matches) for _, _, matches in scanned)
+        if not added:
+            return
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + added - 1)
+        for segment, block_no, matches in scanned:
+            self._add_block(segment, block_no, matches, len(matches))
+        self.endInsertRows()
+
+    def _block(self, segment, block_no: int) -> bytes:
+        key = (segment.path, block_no)
+        payload = self._cache.get(key)
+        if payload is None:
+            payload = self._cache[key] = segment.read_block(block_no)
+            if len(self._cache) > self.CACHE_BLOCKS:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return payload
+
+    def frame(self, row: int) -> Optional[Tuple[float, TPCANMsgFD]]:
+        entry = bisect_right(self._starts, row) - 1
+        segment, block_no, matches = self._blocks[entry]
+        record_no = row - self._starts[entry]
+        if matches is not None:
+            record_no = matches[record_no]
+        payload = self._block(segment, block_no)
+        offset = record_no * RECORD.size
+        host_time, _ = RECORD_HEAD.unpack_from(payload, offset)
+        return host_time - self.t_origin, TPCANMsgFD.from_buffer_copy(payload, offset + MSG_OFFSET)
+
+
+class CanTraceView(QWidget):
+    """
+    Raw CAN trace table for the live RX ring or a recorded binary trace, with ID / time filters,
+    pause (freeze the live view) and follow (keep the newest row in view).
+    """
+
+    ROW_HEIGHT = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model: Optional[_TraceTableModel] = None
+        self.live_ring: Optional[CanFrameRing] = None
+
+        self.open_button = QPushButton("Open trace...")
+        self.live_button = QPushButton("Live")
+        self.live_button.setEnabled(False)
+        self.id_edit = QLineEdit()
+        self.id_edit.setPlaceholderText("IDs (hex), e.g. 111, 14DAF140")
+        self.from_edit = QLineEdit()
+        self.from_edit.setPlaceholderText("from s")
+        self.from_edit.setMaximumWidth(80)
+        self.to_edit = QLineEdit()
+        self.to_edit.setPlaceholderText("to s")
+        self.to_edit.setMaximumWidth(80)
+        self.apply_button = QPushButton("Filter")
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setCheckable(True)
+        self.follow_check = QCheckBox("Follow")
+        self.follow_check.setChecked(True)
+        self.source_label = QLabel("No source")
+
+        controls = QHBoxLayout()
+        for widget in (self.open_button, self.live_button, self.id_edit, self.from_edit, self.to_edit,
+                       self.apply_button, self.pause_button, self.follow_check):
+            controls.addWidget(widget)
+        controls.addWidget(self.source_label, 1)
+
+        self.table = QTableView()
+        self.table.setFont(QFont("Consolas", 9))
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setWordWrap(False)
+        # Fixed row height: the view then never measures rows, whatever the row count
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.ROW_HEIGHT)
+        self.table.horizontalHeader().setStretchLastSection(True)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(controls)
+        layout.addWidget(self.table, 1)
+
+        self.open_button.clicked.connect(self._choose_trace)
+        self.live_button.clicked.connect(self.show_live)
+        self.apply_button.clicked.connect(self.apply_filter)
+        for edit in (self.id_edit, self.from_edit, self.to_edit):
+            edit.returnPressed.connect(self.apply_filter)
+        self.pause_button.toggled.connect(self._set_paused)
+
+    def _set_model(self, model: _TraceTableModel, source: str):
+        old = self.model
+        self.model = model
+        self.table.setModel(model)
+        model.rowsInserted.connect(self._rows_inserted)
+        if isinstance(old, FileTraceModel):
+            old.close()
+        if old is not None:
+            old.deleteLater()
+        self.pause_button.setChecked(False)
+        self.pause_button.setEnabled(isinstance(model, RingTraceModel))
+        self.source_label.setText(source)
+        self.apply_filter()
+
+    def set_ring(self, ring: CanFrameRing):
+        """Live source (the RX frame ring of the running CanTestWorker)."""
+        self.live_ring = ring
+        self.live_button.setEnabled(True)
+        self.show_live()
+
+    def show_live(self):
+        if self.live_ring is not None:
+            self._set_model(RingTraceModel(self.live_ring), "Live RX ring")
+
+    def open_trace(self, path: str):
+        self._set_model(FileTraceModel(path), os.path.basename(path))
+
+    def _choose_trace(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open CAN trace", "logs",
+                                              "Binary CAN traces (*.ctrace *.ctrace.gz *.ctrace.zst *.manifest.json)")
+        if path:
+            self.open_trace(path)
+
+    def apply_filter(self):
+        if self.model is None:
+            return
+        try:
+            ids = parse_id_filter(self.id_edit.text())
+            t_from = float(self.from_edit.text()) if self.from_edit.text().strip() else None
+            t_to = float(self.to_edit.text()) if self.to_edit.text().strip() else None
+        except ValueError as e:
+            self.source_label.setText(f"Bad filter: {e}")
+            return
+        self.model.set_filter(ids, t_from, t_to)
+
+    def _set_paused(self, paused: bool):
+        if isinstance(self.model, RingTraceModel):
+            self.model.set_paused(paused)
+        self.pause_button.setText("Resume" if paused else "Pause")
+
+    def _rows_inserted(self, parent, first, last):
+        if self.follow_check.isChecked() and not self.pause_button.isChecked():
+            self.table.scrollToBottom()
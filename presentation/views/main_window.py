@@ -1,10 +1,12 @@
 # presentation/view/main_window.py
 
-from PySide6.QtWidgets import QMainWindow, QLabel
+from PySide6.QtWidgets import QMainWindow, QLabel, QDockWidget
 from PySide6.QtCore import Qt, QTimer, QDateTime
 # Import the class generated by pyuic6 from your .ui file
 # Make sure this import path is correct for your project structure
 from presentation.views.UI import Ui_MainWindow
+from presentation.views.signal_plot_widget import SignalPlotWidget
+from presentation.views.can_trace_view import CanTraceView
 
 
 class MainWindow(QMainWindow, Ui_MainWindow):  # Inherit from the generated UI class
@@ -40,6 +42,24 @@ class MainWindow(QMainWindow, Ui_MainWindow):  # Inherit from the generated UI c
         self.controller = controller
         self._connect_ui()
 
+    def add_signal_plot(self, can_state_store, max_fps: int = 20):
+        """Adds the live signal plot as a bottom dock (the .ui layout stays untouched)."""
+        self.signal_plot = SignalPlotWidget(can_state_store, max_fps=max_fps)
+        self.dock_signal_plot = QDockWidget("CAN Signal Plot", self)
+        self.dock_signal_plot.setObjectName("dock_signal_plot")
+        self.dock_signal_plot.setWidget(self.signal_plot)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.dock_signal_plot)
+
+    def add_trace_view(self):
+        """Adds the raw CAN trace table as a bottom dock, tabbed with the signal plot when present."""
+        self.trace_view = CanTraceView()
+        self.dock_trace_view = QDockWidget("CAN Trace", self)
+        self.dock_trace_view.setObjectName("dock_trace_view")
+        self.dock_trace_view.setWidget(self.trace_view)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.dock_trace_view)
+        if hasattr(self, "dock_signal_plot"):
+            self.tabifyDockWidget(self.dock_signal_plot, self.dock_trace_view)
+
     def _setup_status_bar(self):
         """Creates and attaches the permanent status label to the QStatusBar."""
         # Use the QStatusBar defined in the .ui file
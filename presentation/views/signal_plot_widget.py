@@ -0,0 +1,168 @@
+# presentation/views/signal_plot_widget.py
+
+import math
+
+from PySide6.QtCore import Qt, QTimer, QPointF, QRectF
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QLabel, QSpinBox, QVBoxLayout, QWidget
+
+
+class SignalPlotCanvas(QWidget):
+    """
+    Draws one SignalHistory over the `window_s` seconds up to `t_end` (us, bus time). Each pixel
+    column gets the min/max of its time bucket (SignalHistory.decimate), so the drawing cost depends
+    on the widget width, not on how many values arrived. Text states are drawn as a step plot with
+    their names on the y axis.
+    """
+
+    MARGIN_LEFT = 90
+    MARGIN = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.history = None
+        self.window_s = 10
+        self.t_end = None
+        self.setMinimumHeight(160)
+        self.setAutoFillBackground(True)
+        self.setStyleSheet("background-color: #1E1E1E;")
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1E1E1E"))
+        plot = QRectF(self.MARGIN_LEFT, self.MARGIN, self.width() - self.MARGIN_LEFT - self.MARGIN,
+                      self.height() - 2 * self.MARGIN)
+        painter.setPen(QPen(QColor("#555555")))
+        painter.drawRect(plot)
+
+        history = self.history
+        latest = history.latest() if history is not None else None
+        if latest is None or plot.width() < 2:
+            painter.setPen(QColor("#AAAAAA"))
+            painter.drawText(plot, Qt.AlignmentFlag.AlignCenter, "no data")
+            return
+
+        t1 = max(latest[0], self.t_end or 0)
+        t0 = t1 - self.window_s * 1_000_000
+        columns = history.decimate(t0, t1, int(plot.width()))
+        # The value held when the window starts (its change may be older than the window)
+        held = history.value_at(t0)
+        if held is not None and (not columns or columns[0][0] > t0):
+            columns.insert(0, (t0, held, held))
+        finite = [(t, lo, hi) for t, lo, hi in columns if not (math.isnan(lo) or math.isnan(hi))]
+        if not finite:
+            return
+
+        if history.is_numeric:
+            y_min = min(lo for _, lo, _ in finite)
+            y_max = max(hi for _, _, hi in finite)
+        else:
+            y_min, y_max = 0.0, float(max(len(history.labels) - 1, 1))
+        if y_max == y_min:
+            y_min, y_max = y_min - 1.0, y_max + 1.0
+
+        def x_of(t):
+            return plot.left() + (t - t0) / (t1 - t0 or 1) * plot.width()
+
+        def y_of(v):
+            return plot.bottom() - (v - y_min) / (y_max - y_min) * plot.height()
+
+        # Y axis: numeric range or state names
+        painter.setPen(QColor("#AAAAAA"))
+        if history.is_numeric:
+            for v in (y_min, (y_min + y_max) / 2, y_max):
+                painter.drawText(QRectF(0, y_of(v) - 8, self.MARGIN_LEFT - 4, 16),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, f"{v:.4g}")
+        else:
+            for index, name in enumerate(history.labels):
+                painter.drawText(QRectF(0, y_of(index) - 8, self.MARGIN_LEFT - 4, 16),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, name)
+
+        # Min/max bar per column plus a step line through the column ranges (values hold until the next change)
+        painter.setPen(QPen(QColor("#4CAF50"), 1.5))
+        previous = None
+        for t, lo, hi in finite:
+            x = x_of(t)
+            if previous is not None:
+                painter.drawLine(QPointF(previous[0], previous[1]), QPointF(x, previous[1]))
+                painter.drawLine(QPointF(x, previous[1]), QPointF(x, y_of(lo)))
+            painter.drawLine(QPointF(x, y_of(lo)), QPointF(x, y_of(hi)))
+            previous = (x, y_of(hi))
+        painter.drawLine(QPointF(previous[0], previous[1]), QPointF(plot.right(), previous[1]))
+
+
+class SignalPlotWidget(QWidget):
+    """
+    Live plot panel for any decoded signal of a CanStateStore. The decode thread only appends to
+    the store's history rings; this widget polls them from the GUI thread at most `max_fps`
+    times per second and repaints only when the store published a new version.
+    """
+
+    def __init__(self, can_state_store, max_fps: int = 20, parent=None):
+        super().__init__(parent)
+        self.store = can_state_store
+        self._last_version = None
+
+        self.signal_combo = QComboBox()
+        self.signal_combo.setMinimumWidth(240)
+        self.window_spin = QSpinBox()
+        self.window_spin.setRange(1, 3600)
+        self.window_spin.setValue(10)
+        self.window_spin.setSuffix(" s")
+        self.value_label = QLabel("-")
+        self.canvas = SignalPlotCanvas()
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Signal:"))
+        controls.addWidget(self.signal_combo)
+        controls.addWidget(QLabel("Window:"))
+        controls.addWidget(self.window_spin)
+        controls.addStretch(1)
+        controls.addWidget(self.value_label)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addLayout(controls)
+        layout.addWidget(self.canvas, 1)
+
+        self.signal_combo.currentTextChanged.connect(self._select_signal)
+        self.window_spin.valueChanged.connect(self._set_window)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(max(1, int(1000 / max_fps)))
+        self.refresh_timer.timeout.connect(self._refresh)
+        self.refresh_timer.start()
+
+    def _select_signal(self, signal_name: str):
+        self.canvas.history = self.store.get_history(signal_name) if signal_name else None
+        self._last_version = None
+
+    def _set_window(self, seconds: int):
+        self.canvas.window_s = seconds
+        self.canvas.update()
+
+    def _refresh(self):
+        """Timer slot: picks up new signals and repaints when any signal changed."""
+        names = sorted(self.store.histories)
+        if len(names) != self.signal_combo.count():
+            current = self.signal_combo.currentText()
+            self.signal_combo.blockSignals(True)
+            self.signal_combo.clear()
+            self.signal_combo.addItems(names)
+            self.signal_combo.setCurrentText(current)
+            self.signal_combo.blockSignals(False)
+            if self.canvas.history is None and names:
+                self._select_signal(self.signal_combo.currentText())
+
+        snapshot = self.store.snapshot()
+        history = self.canvas.history
+        if history is None or snapshot.version == self._last_version:
+            return
+        self._last_version = snapshot.version
+        # Scroll with the newest bus time of any signal, so a held value keeps moving left
+        self.canvas.t_end = max((ts for ts in snapshot.timestamps.values() if ts is not None), default=None)
+        latest = history.latest()
+        if latest is not None:
+            value = latest[1]
+            self.value_label.setText(f"{value:.4g}" if isinstance(value, float) else str(value))
+        self.canvas.update()
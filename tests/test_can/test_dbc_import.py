@@ -0,0 +1,146 @@
+# tests/test_can/test_dbc_import.py
+#
+# DBC -> decode model conversion and the .dbc_cache JSON cache (no hardware):
+#   PYTHONPATH=. python tests/test_can/test_dbc_import.py
+
+import os
+import glob
+import struct
+import logging
+import tempfile
+
+import yaml
+
+from business import can_dbc_import
+from business.can_dbc_import import DBC_EXTENDED_FLAG, load_dbc, parse_dbc
+from business.can_decoder import CANDecoder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DIAG_ID = 0x18DAF140
+
+DBC_TEXT = f"""VERSION ""
+
+BU_: BCM ECU1
+
+BO_ 273 Body_Control_Status: 8 BCM
+ SG_ Vehicle_Power_Mode : 48|2@1+ (1,0) [0|3] "" ECU1
+ SG_ Ignition_Voltage : 16|8@1+ (0.1,0) [0|25.5] "V" ECU1
+ SG_ Vehicle_Speed : 39|16@0+ (0.01,0) [0|655.35] "km/h" ECU1
+ SG_ Cabin_Temperature : 56|8@1- (1,-40) [-168|87] "degC" ECU1
+
+BO_ {DIAG_ID | DBC_EXTENDED_FLAG} Diag_Data: 64 ECU1
+ SG_ Diag_Page M : 0|4@1+ (1,0) [0|15] "" BCM
+ SG_ Page0_Counter m0 : 8|8@1+ (1,0) [0|255] "" BCM
+ SG_ Page1_Pressure m1 : 8|32@1- (1,0) [0|0] "bar" BCM
+
+BO_ 1024 No_Signals: 8 BCM
+
+VAL_ 273 Vehicle_Power_Mode 0 "OFF" 1 "ACC"
+   2 "RUN" 3 "CRANK" ;
+SIG_VALTYPE_ {DIAG_ID | DBC_EXTENDED_FLAG} Page1_Pressure : 1;
+"""
+
+
+def write_dbc(folder: str, text: str = DBC_TEXT) -> str:
+    path = os.path.join(folder, "body.dbc")
+    with open(path, "w", encoding="cp1252") as f:
+        f.write(text)
+    return path
+
+
+def check_conversion():
+    """BO_/SG_/VAL_/SIG_VALTYPE_, Motorola start bits, extended IDs and multiplexing."""
+    model = parse_dbc(DBC_TEXT)
+    messages = {msg["can_id"]: msg for msg in model["can_signals"]}
+    assert set(messages) == {0x111, DIAG_ID}  # messages without signals are dropped
+    assert not messages[0x111]["is_extended"] and messages[DIAG_ID]["is_extended"]
+
+    signals = {sig["name"]: sig for msg in messages.values() for sig in msg["parameters"]}
+    power_mode = signals["Vehicle_Power_Mode"]
+    assert (power_mode["start_byte"], power_mode["start_bit"], power_mode["bit_length"]) == (6, 0, 2)
+    assert power_mode["decode_type"] == "stateEncoded"
+    assert power_mode["values"] == {0: "OFF", 1: "ACC", 2: "RUN", 3: "CRANK"}
+    assert signals["Ignition_Voltage"]["decode_type"] == "linear" and signals["Ignition_Voltage"]["unit"] == "V"
+    speed = signals["Vehicle_Speed"]
+    assert (speed["start_byte"], speed["start_bit"], speed["byte_order"]) == (4, 7, "big_endian")
+    assert signals["Cabin_Temperature"]["value_type"] == "signed"
+    assert signals["Diag_Page"]["multiplexer"] is True
+    assert signals["Page0_Counter"]["mux_value"] == 0 and signals["Page1_Pressure"]["mux_value"] == 1
+    assert signals["Page1_Pressure"]["value_type"] == "float"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        decoder = CANDecoder(write_dbc(tmp))
+    data = bytes([0, 0, 124, 0, 0x30, 0x39, 2, 0xF6])
+    decoded = decoder.decode(0x111, data)
+    assert decoded["Vehicle_Power_Mode"] == "RUN"
+    assert abs(decoded["Ignition_Voltage"] - 12.4) < 1e-9
+    assert abs(decoded["Vehicle_Speed"] - 123.45) < 1e-9  # 0x3039 * 0.01
+    assert decoded["Cabin_Temperature"] == -50.0          # -10 * 1 - 40
+    page1 = decoder.decode(DIAG_ID, bytes([0x01]) + struct.pack("<f", 2.5))
+    assert page1 == {"Diag_Page": 1, "Page1_Pressure": 2.5}, page1
+    logger.info("DBC conversion OK")
+
+
+def check_yaml_dbc_merge():
+    """A decode YAML pulls in DBC files; its own can_signals override DBC messages with the same ID."""
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dbc(tmp)
+        override = {"can_id": 0x111, "parameters": [
+            {"name": "Override_Byte", "start_byte": 0, "bit_length": 8, "decode_type": "raw"}]}
+        path = os.path.join(tmp, "decode.yaml")
+        with open(path, "w") as f:
+            yaml.safe_dump({"dbc_files": ["body.dbc"], "can_signals": [override]}, f)
+        decoder = CANDecoder(path)
+    assert decoder.decode(0x111, bytes([7] + [0] * 7)) == {"Override_Byte": 7}
+    assert DIAG_ID in decoder.signal_map
+    logger.info("YAML + DBC merge OK")
+
+
+def check_cache():
+    """Miss writes the JSON cache, hit skips parsing, content change or unusable cache file reparses."""
+    calls = []
+    real_parse = can_dbc_import.parse_dbc
+
+    def counting_parse(text):
+        calls.append(1)
+        return real_parse(text)
+
+    can_dbc_import.parse_dbc = counting_parse
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            dbc_path = write_dbc(tmp)
+            cache_dir = os.path.join(tmp, ".dbc_cache")
+
+            first = load_dbc(dbc_path)  # default cache folder next to the DBC
+            cache_files = glob.glob(os.path.join(cache_dir, "body.*.json"))
+            assert len(calls) == 1 and len(cache_files) == 1
+
+            assert load_dbc(dbc_path) == first and len(calls) == 1  # hit (int VAL_ keys restored from JSON)
+
+            # Edited DBC: new content hash, new cache file
+            write_dbc(tmp, DBC_TEXT.replace("(0.1,0)", "(0.2,0)"))
+            edited = load_dbc(dbc_path)
+            assert len(calls) == 2 and len(glob.glob(os.path.join(cache_dir, "body.*.json"))) == 2
+            assert edited != first
+
+            # Truncated file, a file written for other content, and a pickle planted in its place
+            # (must be rejected as data, never unpickled): reparse, rewrite
+            cache_file = [f for f in glob.glob(os.path.join(cache_dir, "body.*.json")) if f not in cache_files][0]
+            for broken in (b'{"sha256": "', b'{"sha256": "0", "model": {"can_signals": []}}',
+                           b"cbuiltins\nprint\n(S'pickle executed'\ntR."):
+                with open(cache_file, "wb") as f:
+                    f.write(broken)
+                assert load_dbc(dbc_path) == edited
+            assert len(calls) == 5
+            assert load_dbc(dbc_path) == edited and len(calls) == 5  # rewritten cache is used again
+    finally:
+        can_dbc_import.parse_dbc = real_parse
+    logger.info("DBC cache OK")
+
+
+if __name__ == "__main__":
+    check_conversion()
+    check_yaml_dbc_merge()
+    check_cache()
@@ -0,0 +1,208 @@
+# tests/test_can/test_decoder.py
+#
+# CANDecoder signal extraction against hand-computed vectors, multiplexed dispatch (per frame
+# and batch) and the payload-change short-circuit (no hardware):
+#   PYTHONPATH=. python tests/test_can/test_decoder.py
+
+import os
+import struct
+import logging
+import tempfile
+from typing import Any, Dict, List
+
+import yaml
+
+from business import can_decoder
+from business.can_decoder import CANDecoder, PayloadChangeFilter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_decoder(folder: str, can_signals: List[Dict[str, Any]]) -> CANDecoder:
+    path = os.path.join(folder, "decode.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump({"can_signals": can_signals}, f)
+    return CANDecoder(path)
+
+
+def raw(name: str, start_byte: int, start_bit: int, bit_length: int, **extra) -> Dict[str, Any]:
+    return dict(name=name, start_byte=start_byte, start_bit=start_bit, bit_length=bit_length,
+                decode_type="raw", **extra)
+
+
+# (signal definition, payload, expected value); Motorola start_byte/start_bit address the MSB
+EXTRACTION_VECTORS = [
+    (raw("Intel_U16", 1, 0, 16), bytes([0x00, 0x34, 0x12]), 0x1234),
+    (raw("Intel_U12_Bit4", 0, 4, 12), bytes([0xA0, 0xBC]), 0xBCA),
+    (raw("Intel_U3_Bit5", 0, 5, 3), bytes([0b1010_0000]), 0b101),
+    (raw("Intel_U64", 0, 0, 64), bytes(range(1, 9)), 0x0807060504030201),
+    (raw("Motorola_U16", 0, 7, 16, byte_order="big_endian"), bytes([0x12, 0x34]), 0x1234),
+    (raw("Motorola_U12", 0, 7, 12, byte_order="motorola"), bytes([0xAB, 0xC0]), 0xABC),
+    (raw("Motorola_U10_Bit3", 1, 3, 10, byte_order="big_endian"), bytes([0x00, 0x0A, 0xFC]), 0x2BF),
+    (raw("Intel_S8", 0, 0, 8, value_type="signed"), bytes([0xFF]), -1),
+    (raw("Intel_S12", 0, 0, 12, value_type="signed"), bytes([0x00, 0x08]), -2048),
+    (raw("Intel_S12_Positive", 0, 0, 12, value_type="signed"), bytes([0xFF, 0x07]), 2047),
+    (raw("Motorola_S16", 2, 7, 16, byte_order="big_endian", value_type="signed"), bytes([0, 0, 0xFF, 0xFE]), -2),
+    (raw("Intel_F32", 0, 0, 32, value_type="float"), struct.pack("<f", 1.5), 1.5),
+    (raw("Motorola_F64", 8, 7, 64, byte_order="big_endian", value_type="float"),
+     bytes(8) + struct.pack(">d", -12.25), -12.25),
+    (dict(raw("Intel_S16_Linear", 0, 0, 16, value_type="signed"), decode_type="linear",
+          calculation={"a": 0.1, "b": 40.0}), struct.pack("<h", -200), -200 * 0.1 + 40.0),
+]
+
+
+def check_signal_extraction():
+    """Multi-byte Intel/Motorola, signed and float fields decode to the known values."""
+    with tempfile.TemporaryDirectory() as tmp:
+        messages = [{"can_id": 0x100 + n, "parameters": [signal]} for n, (signal, _, _) in enumerate(EXTRACTION_VECTORS)]
+        decoder = make_decoder(tmp, messages)
+
+    for n, (signal, data, expected) in enumerate(EXTRACTION_VECTORS):
+        value = decoder.decode(0x100 + n, data)[signal["name"]]
+        assert value == expected, f"{signal['name']}: {value!r} != {expected!r}"
+        # Short frame: missing trailing bytes read as zero instead of raising
+        decoder.decode(0x100 + n, data[:1])
+
+    if can_decoder.np is not None:
+        # The columnar path must agree with the per-frame decoders
+        np = can_decoder.np
+        payloads = np.zeros((len(EXTRACTION_VECTORS), 64), dtype=np.uint8)
+        for n, (_, data, _) in enumerate(EXTRACTION_VECTORS):
+            payloads[n, :len(data)] = np.frombuffer(data, dtype=np.uint8)
+        ids = np.arange(0x100, 0x100 + len(EXTRACTION_VECTORS))
+        columns = decoder.decode_batch(ids, payloads, np.zeros(len(ids)))
+        for signal, _, expected in EXTRACTION_VECTORS:
+            assert columns[signal["name"]][1][0] == expected, signal["name"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for bad in (raw("Float_Unaligned", 0, 3, 32, value_type="float"), raw("Too_Long", 0, 0, 65),
+                    raw("Bad_Order", 0, 0, 8, byte_order="middle_endian")):
+            try:
+                make_decoder(tmp, [{"can_id": 0x1, "parameters": [bad]}])
+            except Exception as e:
+                assert bad["name"] in str(e)
+            else:
+                raise AssertionError(f"{bad['name']} was accepted")
+    logger.info(f"Signal extraction OK ({len(EXTRACTION_VECTORS)} vectors)")
+
+
+MUX_MESSAGE = {
+    "can_id": 0x3A0,
+    "multiplexer": raw("Diag_Page", 0, 0, 4),
+    "parameters": [raw("Diag_Counter", 0, 4, 4)],
+    "mux_groups": [
+        {"mux_value": 0, "parameters": [raw("Page0_Status", 1, 0, 8)]},
+        {"mux_value": 1, "parameters": [dict(raw("Page1_Temperature", 1, 0, 16, value_type="signed"),
+                                             decode_type="linear", calculation={"a": 0.1, "b": 0.0})]},
+    ],
+}
+
+# Same layout in the flat DBC form (multiplexor flagged, group signals tagged with mux_value)
+MUX_MESSAGE_FLAT = {
+    "can_id": 0x3A1,
+    "parameters": [dict(MUX_MESSAGE["multiplexer"], multiplexer=True), MUX_MESSAGE["parameters"][0],
+                   dict(MUX_MESSAGE["mux_groups"][0]["parameters"][0], mux_value=0),
+                   dict(MUX_MESSAGE["mux_groups"][1]["parameters"][0], mux_value=1)],
+}
+
+
+def check_mux_dispatch():
+    """Only the group selected by the mux value is decoded; both config forms behave the same."""
+    with tempfile.TemporaryDirectory() as tmp:
+        decoder = make_decoder(tmp, [MUX_MESSAGE, MUX_MESSAGE_FLAT])
+
+    for can_id in (0x3A0, 0x3A1):
+        assert {key for key in decoder.mux_decoders if key[0] == can_id} == {(can_id, 0), (can_id, 1)}
+        assert len(decoder.signal_map[can_id]) == 4  # flat view keeps every signal the ID can carry
+
+        page0 = decoder.decode(can_id, bytes([0x50, 0x7F, 0xAA]))
+        assert page0 == {"Diag_Page": 0, "Diag_Counter": 5, "Page0_Status": 0x7F}, page0
+        page1 = decoder.decode(can_id, bytes([0x61]) + struct.pack("<h", -125))
+        assert page1 == {"Diag_Page": 1, "Diag_Counter": 6, "Page1_Temperature": -12.5}, page1
+        unknown = decoder.decode(can_id, bytes([0x77, 0xFF, 0xFF]))
+        assert unknown == {"Diag_Page": 7, "Diag_Counter": 7}, unknown
+
+    if can_decoder.np is not None:
+        np = can_decoder.np
+        payloads = np.zeros((3, 64), dtype=np.uint8)
+        payloads[0, :2] = (0x50, 0x7F)
+        payloads[1, :3] = (0x61, 0x83, 0xFF)
+        payloads[2, :2] = (0x12, 0x01)
+        columns = decoder.decode_batch(np.full(3, 0x3A0), payloads, np.array([0.0, 1.0, 2.0]))
+        assert list(columns["Diag_Page"][1]) == [0, 1, 2]
+        assert list(columns["Page0_Status"][0]) == [0.0] and list(columns["Page0_Status"][1]) == [0x7F]
+        assert list(columns["Page1_Temperature"][0]) == [1.0] and list(columns["Page1_Temperature"][1]) == [-12.5]
+    logger.info("Mux dispatch OK")
+
+
+def check_batch_shared_names():
+    """A signal name carried by several mux groups keeps every group's rows in one column."""
+    if can_decoder.np is None:
+        logger.info("Batch shared names skipped: numpy not installed")
+        return
+    np = can_decoder.np
+    message = {
+        "can_id": 0x3A2,
+        "multiplexer": raw("Diag_Page", 0, 0, 4),
+        "mux_groups": [
+            {"mux_value": 0, "parameters": [raw("Page_Value", 1, 0, 8), raw("Page0_Flag", 2, 0, 1)]},
+            {"mux_value": 1, "parameters": [dict(raw("Page_Value", 1, 0, 16), decode_type="linear",
+                                                 calculation={"a": 0.5, "b": 0.0})]},
+        ],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        decoder = make_decoder(tmp, [message])
+
+    payloads = np.zeros((5, 64), dtype=np.uint8)
+    payloads[:, :3] = [(0x00, 0x11, 0x01), (0x01, 0x10, 0x00), (0x00, 0x22, 0x00),
+                       (0x07, 0xFF, 0xFF), (0x01, 0x20, 0x01)]
+    columns = decoder.decode_batch(np.full(5, 0x3A2), payloads, np.array([0.0, 1.0, 2.0, 3.0, 4.0]))
+    times, values = columns["Page_Value"]
+    assert list(times) == [0.0, 1.0, 2.0, 4.0], times   # unknown page 7 decodes neither group
+    assert list(values) == [0x11, 8.0, 0x22, 144.0], values
+    # Row by row the batch column matches decode()
+    expected = [decoder.decode(0x3A2, bytes(payloads[row, :3]))["Page_Value"] for row in (0, 1, 2, 4)]
+    assert list(values) == expected
+    assert list(columns["Page0_Flag"][0]) == [0.0, 2.0]
+    logger.info("Batch shared names OK")
+
+
+def check_payload_change_filter():
+    """Frames are skipped while the bits the signals read repeat; other bits are masked out."""
+    with tempfile.TemporaryDirectory() as tmp:
+        decoder = make_decoder(tmp, [
+            {"can_id": 0x111, "parameters": [raw("Low_Nibble", 0, 0, 4),
+                                             raw("Motorola_U10_Bit3", 1, 3, 10, byte_order="big_endian")]},
+            MUX_MESSAGE,
+        ])
+    # Motorola 10 bits from byte 1 bit 3: byte 1 bits 0-3 and byte 2 bits 2-7
+    assert decoder.payload_masks[0x111] == (3, 0x0F | 0x0F << 8 | 0xFC << 16)
+    # Multiplexor + base + every group: byte 0 and bytes 1-2
+    assert decoder.payload_masks[0x3A0] == (3, 0xFFFFFF)
+
+    change_filter = PayloadChangeFilter(decoder)
+    frames = [
+        (0x111, bytes([0x01, 0x00, 0x00, 0x00]), True),    # first frame of the ID
+        (0x111, bytes([0xF1, 0xF0, 0x03, 0x55]), False),   # only unused bits differ (byte 0/1 high nibble, byte 2 bits 0-1, byte 3)
+        (0x111, bytes([0x01, 0x00, 0x04, 0x00]), True),    # byte 2 bit 2 is read by the Motorola signal
+        (0x111, bytes([0x01, 0x00, 0x04]), False),         # shorter frame, same used bits
+        (0x222, bytes(8), False),                          # not configured
+        (0x3A0, bytes([0x00, 0x10]), True),
+        (0x3A0, bytes([0x01, 0x10]), True),                # mux value change
+        (0x3A0, bytes([0x01, 0x10, 0x00, 0xFF]), False),
+    ]
+    for can_id, data, expected in frames:
+        assert change_filter.changed(can_id, data) is expected, (hex(can_id), data.hex())
+    assert change_filter.stats() == {"frames_decoded": 4, "frames_skipped": 3, "frames_unconfigured": 1}
+
+    change_filter.reset()
+    assert change_filter.changed(0x111, bytes([0x01, 0x00, 0x04]))
+    logger.info("Payload change filter OK")
+
+
+if __name__ == "__main__":
+    check_signal_extraction()
+    check_mux_dispatch()
+    check_batch_shared_names()
+    check_payload_change_filter()
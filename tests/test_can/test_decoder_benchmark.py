@@ -0,0 +1,176 @@
+# tests/test_can/test_decoder_benchmark.py
+
+import time
+import random
+import logging
+from typing import Dict, Any, List, Tuple
+
+from business.can_decoder import CANDecoder, PayloadChangeFilter, records_to_arrays
+from business.can_validator import Validator
+from business.workers.can_state_store import CanStateStore
+from hardware.can.can_logger import iter_text_trace
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DECODE_CFG = "config/PN36666666_can_decode.yaml"
+VALIDATION_CFG = "config/PN36666666_can_validation.yaml"
+
+
+def legacy_extract_bits(data: bytes, start_byte: int, start_bit: int, length: int) -> int:
+    """Reference copy of the removed CANDecoder._extract_bits (single-byte fields only)."""
+    if start_byte >= len(data):
+        return 0
+    return (data[start_byte] >> start_bit) & ((1 << length) - 1)
+
+
+def legacy_decode(decoder: CANDecoder, can_id: int, data: bytes) -> Dict[str, Any]:
+    """Reference copy of the pre-compile decode loop (dict reads + decode_type branches per frame)."""
+    decoded_signals = {}
+    signals_to_decode = decoder.signal_map.get(can_id)
+    if not signals_to_decode:
+        return decoded_signals
+
+    for signal_def in signals_to_decode:
+        raw_value = legacy_extract_bits(
+            data, signal_def['start_byte'], signal_def.get('start_bit', 0), signal_def['bit_length'])
+        decoded_value = raw_value
+        decode_type = signal_def['decode_type']
+        if decode_type == "stateEncoded":
+            decoded_value = signal_def.get('values', {}).get(raw_value, f"UNKNOWN({raw_value})")
+        elif decode_type == "linear":
+            calc = signal_def.get('calculation', {})
+            decoded_value = raw_value * calc.get('a', 1.0) + calc.get('b', 0.0)
+        decoded_signals[signal_def['name']] = decoded_value
+    return decoded_signals
+
+
+def make_frames(decoder: CANDecoder, count: int, unknown_ratio: float = 0.5) -> List[Tuple[int, bytes]]:
+    """Synthetic bus mix: configured IDs plus unrelated traffic, 8..64 byte payloads."""
+    rnd = random.Random(1234)
+    ids = list(decoder.signal_map.keys())
+    frames = []
+    for _ in range(count):
+        can_id = rnd.randrange(0x700) if rnd.random() < unknown_ratio else rnd.choice(ids)
+        length = rnd.choice((8, 8, 16, 64))
+        frames.append((can_id, bytes(rnd.randrange(256) for _ in range(length))))
+    return frames
+
+
+def run_decode_benchmark(frame_count: int = 200_000, repeat: int = 3) -> Dict[str, float]:
+    """Prints and returns frames/sec for the legacy loop and the compiled decoders."""
+    decoder = CANDecoder(DECODE_CFG)
+    frames = make_frames(decoder, frame_count)
+
+    # Sanity: both paths must agree before timing anything
+    for can_id, data in frames[:1000]:
+        assert legacy_decode(decoder, can_id, data) == decoder.decode(can_id, data)
+
+    results = {}
+    for label, fn in (("legacy", lambda i, d: legacy_decode(decoder, i, d)), ("compiled", decoder.decode)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for can_id, data in frames:
+                fn(can_id, data)
+            best = min(best, time.perf_counter() - t0)
+        results[label] = frame_count / best
+        logger.info(f"{label:<9}: {results[label]:>12,.0f} frames/sec")
+
+    logger.info(f"speed-up : {results['compiled'] / results['legacy']:.2f}x")
+    return results
+
+
+def run_batch_benchmark(trace_path: str = "logs/Can_Trace_2025-10-16_15-21-50.txt", repeat: int = 3) -> Dict[str, float]:
+    """Per-frame decode() vs columnar decode_batch() over a recorded text trace (needs numpy)."""
+    decoder = CANDecoder(DECODE_CFG)
+    records = list(iter_text_trace(trace_path))
+    frames = records_to_arrays(records)
+
+    best_loop = best_batch = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for rec in records:
+            decoder.decode(rec.can_id, rec.data)
+        best_loop = min(best_loop, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        decoder.decode_batch(frames["id"], frames, frames["timestamp"])
+        best_batch = min(best_batch, time.perf_counter() - t0)
+
+    results = {"per_frame": len(records) / best_loop, "batch": len(records) / best_batch}
+    for label, fps in results.items():
+        logger.info(f"{label:<9}: {fps:>12,.0f} frames/sec ({len(records)} frames)")
+    return results
+
+
+def make_cyclic_frames(decoder: CANDecoder, count: int, change_every: int = 50) -> List[Tuple[int, bytes, int]]:
+    """
+    Cyclic bus traffic: the configured IDs round robin every 1 ms; each ID's signal bits change
+    every `change_every` frames of that ID, while the unused bits (alive counters, CRCs) change
+    in every frame.
+    """
+    rnd = random.Random(4321)
+    ids = sorted(decoder.payload_masks)
+    current = {can_id: rnd.getrandbits(64) for can_id in ids}
+    frames = []
+    for n in range(count):
+        can_id = ids[n % len(ids)]
+        _, used = decoder.payload_masks[can_id]
+        if (n // len(ids)) % change_every == 0:
+            current[can_id] = rnd.getrandbits(64)
+        payload = (current[can_id] & used) | (rnd.getrandbits(64) & ~used)
+        frames.append((can_id, payload.to_bytes(8, "little"), n * 1000))
+    return frames
+
+
+def run_change_filter_benchmark(frame_count: int = 200_000, change_every: int = 50, repeat: int = 3) -> Dict[str, float]:
+    """
+    ValidationThread per-frame work (on_frame, decode, Validator.feed, CanStateStore.update_state)
+    with and without the PayloadChangeFilter short-circuit, on cyclic traffic.
+    """
+    from PySide6.QtCore import QCoreApplication
+    app = QCoreApplication.instance() or QCoreApplication([])  # the coalescing store uses a QTimer
+
+    decoder = CANDecoder(DECODE_CFG)
+    frames = make_cyclic_frames(decoder, frame_count, change_every)
+
+    def pipeline(use_filter: bool):
+        validator = Validator(VALIDATION_CFG)
+        store = CanStateStore(update_rate_hz=50)
+        change_filter = PayloadChangeFilter(decoder)
+        decode, feed, update = decoder.decode, validator.feed, store.update_state
+        t0 = time.perf_counter()
+        for can_id, data, timestamp in frames:
+            validator.on_frame(can_id, data, timestamp)
+            if use_filter and not change_filter.changed(can_id, data):
+                continue
+            for sig, val in decode(can_id, data).items():
+                feed(sig, val, timestamp)
+                update(sig, val, timestamp)
+        elapsed = time.perf_counter() - t0
+        store.set_update_rate(None)
+        return elapsed, dict(store.snapshot().states), change_filter.stats()
+
+    results = {}
+    final_states = {}
+    for label, use_filter in (("every frame", False), ("change filter", True)):
+        best = float("inf")
+        for _ in range(repeat):
+            elapsed, final_states[label], stats = pipeline(use_filter)
+            best = min(best, elapsed)
+        results[label] = frame_count / best
+        logger.info(f"{label:<13}: {results[label]:>12,.0f} frames/sec" + (f"  {stats}" if use_filter else ""))
+
+    # Skipping frames must not change what the store ends up with
+    assert final_states["every frame"] == final_states["change filter"]
+    logger.info(f"speed-up     : {results['change filter'] / results['every frame']:.2f}x "
+                f"(signal bits change every {change_every} frames per ID)")
+    return results
+
+
+if __name__ == "__main__":
+    run_decode_benchmark()
+    run_batch_benchmark()
+    run_change_filter_benchmark()
@@ -0,0 +1,218 @@
+# tests/test_can/test_pipeline_benchmark.py
+#
+# End-to-end CAN pipeline benchmark on the virtual PCAN backend (no hardware):
+#   virtual bus -> rx_monitor / rx_monitor_ring -> ValidationThread (decode, Validator.feed,
+#   CanStateStore.update_state) at increasing offered frame rates, plus per-call component costs.
+#
+#   PYTHONPATH=. python tests/test_can/test_pipeline_benchmark.py --json bench_pipeline.json
+#
+# Output is JSON so runs can be compared between commits.
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+from typing import Any, Dict, List
+
+import yaml
+
+from business.can_decoder import CANDecoder
+from business.can_validator import Validator
+from business.can_validation_thread import ValidationThread
+from business.workers.can_state_store import CanStateStore
+from hardware.can.PCANBasic import PCAN_USBBUS1
+from hardware.can.pcan_constants import *
+from hardware.can.can_workers import rx_monitor, rx_monitor_ring
+from hardware.can.can_frame_ring import CanFrameRing, CanRingReader
+from hardware.can.virtual_pcan import VirtualPCANBasic
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+CHANNEL = PCAN_USBBUS1
+DECODE_CFG = "config/PN36666666_can_decode.yaml"
+VALIDATION_CFG = "config/PN36666666_can_validation.yaml"
+
+# Latency probe: a 32-bit counter frame whose send time is recorded when the virtual bus generates it
+PROBE_ID = 0x123
+PROBE_SIGNAL = "Bench_Probe_Counter"
+PROBE_PERIOD = 0.002
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100.0))]
+
+
+def write_bench_decode_cfg(folder: str) -> str:
+    """Station decode config plus the probe message."""
+    with open(DECODE_CFG, "r") as f:
+        cfg = yaml.safe_load(f)
+    cfg["can_signals"].append({
+        "can_id": PROBE_ID,
+        "description": "Benchmark latency probe",
+        "parameters": [{"name": PROBE_SIGNAL, "start_byte": 0, "start_bit": 0, "bit_length": 32,
+                        "decode_type": "raw"}],
+    })
+    path = os.path.join(folder, "bench_decode.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(cfg, f)
+    return path
+
+
+class TimedStateStore(CanStateStore):
+    """CanStateStore that timestamps when each probe counter value reaches the store."""
+
+    def __init__(self):
+        super().__init__()
+        self.probe_arrivals: Dict[int, float] = {}
+
+    def update_state(self, signal_name: str, value: Any, timestamp: int = None):
+        super().update_state(signal_name, value, timestamp)
+        if signal_name == PROBE_SIGNAL:
+            self.probe_arrivals[value] = time.perf_counter()
+
+
+def run_rate(decode_cfg: str, offered_fps: int, duration: float, use_ring: bool, use_receive_event: bool) -> Dict[str, Any]:
+    pcan = VirtualPCANBasic(rx_queue_size=65536)
+    pcan.InitializeFD(CHANNEL, bitrate_fd_500K_2Mb)
+
+    probe_sent: Dict[int, float] = {}
+
+    def probe_payload(n: int) -> bytes:
+        probe_sent[n] = time.perf_counter()
+        return n.to_bytes(4, "little") + bytes(4)
+
+    # Station signals change every frame so decode/feed/store are exercised, not short-circuited
+    rnd = random.Random(7)
+    pcan.add_periodic(0x111, 0.01, lambda n: bytes([0, 0, 120 + n % 20, 0, 0, 0, n % 4, 0]))
+    pcan.add_periodic(0x200, 0.01, lambda n: bytes(rnd.randrange(256) for _ in range(8)))
+    pcan.add_periodic(PROBE_ID, PROBE_PERIOD, probe_payload)
+    background = offered_fps - int(2 / 0.01) - int(1 / PROBE_PERIOD)
+    if background > 0:
+        pcan.add_random_load(background)
+
+    stop_event = threading.Event()
+    trace_logger = logging.getLogger("bench_trace")
+    trace_logger.disabled = True
+    if use_ring:
+        ring = CanFrameRing(1 << 16)
+        rx_sink, frame_queue, rx_target = ring, CanRingReader(ring), rx_monitor_ring
+        depth = frame_queue.lag
+    else:
+        rx_sink = frame_queue = queue.Queue()
+        rx_target = rx_monitor
+        depth = frame_queue.qsize
+
+    store = TimedStateStore()
+    validator = ValidationThread(frame_queue, decode_cfg, VALIDATION_CFG, stop_event, store)
+    t_rx = threading.Thread(target=rx_target, args=(pcan, CHANNEL, stop_event, trace_logger, rx_sink),
+                            kwargs={"use_receive_event": use_receive_event}, daemon=True)
+    validator.start()
+    t_rx.start()
+
+    depths = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        depths.append(depth())
+        time.sleep(0.05)
+    driver_stats = pcan.stats().get(CHANNEL.value, {})
+    stop_event.set()
+    t_rx.join()
+    validator.join()
+    pcan.Uninitialize(CHANNEL)
+
+    stats = validator.get_decode_stats()
+    consumed = stats["frames_decoded"] + stats["frames_skipped"] + stats["frames_unconfigured"]
+    latencies = sorted((store.probe_arrivals[n] - sent) * 1e3
+                       for n, sent in probe_sent.items() if n in store.probe_arrivals)
+    return {
+        "offered_fps": offered_fps,
+        "consumed_fps": round(consumed / duration),
+        "frame_queue_depth_max": max(depths, default=0),
+        "frame_queue_depth_end": depths[-1] if depths else 0,
+        "driver_queue_end": driver_stats.get("queued", 0),
+        "driver_dropped": driver_stats.get("dropped", 0),
+        "ring_dropped": frame_queue.dropped if use_ring else 0,
+        "probe_frames": len(probe_sent),
+        "probe_received": len(latencies),
+        "latency_p50_ms": round(percentile(latencies, 50), 3),
+        "latency_p99_ms": round(percentile(latencies, 99), 3),
+        "decode_stats": stats,
+    }
+
+
+def component_costs(decode_cfg: str, count: int = 100_000) -> Dict[str, float]:
+    """Per-call cost (us) of the stages ValidationThread runs for every changed frame."""
+    decoder = CANDecoder(decode_cfg)
+    validator = Validator(VALIDATION_CFG)
+    store = CanStateStore()
+    rnd = random.Random(3)
+    frames = [(0x111, bytes(rnd.randrange(256) for _ in range(8))) for _ in range(count)]
+    decoded = [decoder.decode(can_id, data) for can_id, data in frames[:1000]]
+
+    t0 = time.perf_counter()
+    for can_id, data in frames:
+        decoder.decode(can_id, data)
+    decode_us = (time.perf_counter() - t0) / count * 1e6
+
+    items = [item for d in decoded for item in d.items()]
+    t0 = time.perf_counter()
+    for _ in range(count // len(items) + 1):
+        for sig, val in items:
+            validator.feed(sig, val)
+    feed_us = (time.perf_counter() - t0) / ((count // len(items) + 1) * len(items)) * 1e6
+
+    t0 = time.perf_counter()
+    for n in range(count):
+        store.update_state("Bench_Signal", n)
+    store_us = (time.perf_counter() - t0) / count * 1e6
+
+    return {"decode_us": round(decode_us, 3), "validator_feed_us": round(feed_us, 3),
+            "state_store_update_us": round(store_us, 3)}
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(
+        description="End-to-end CAN pipeline benchmark on the virtual PCAN backend (JSON results).")
+    parser.add_argument("--rates", default="1000,2000,5000,10000,20000",
+                        help="comma separated offered frame rates (frames/sec)")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per rate")
+    parser.add_argument("--ring", action="store_true", help="use rx_monitor_ring + CanRingReader")
+    parser.add_argument("--poll", action="store_true", help="1 ms polling instead of the receive event")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        decode_cfg = write_bench_decode_cfg(tmp)
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "rx_path": "ring" if args.ring else "queue",
+                "rx_wait": "poll" if args.poll else "event",
+                "duration_s": args.duration,
+            },
+            "components": component_costs(decode_cfg),
+            "rates": [run_rate(decode_cfg, int(rate), args.duration, args.ring, not args.poll)
+                      for rate in args.rates.split(",")],
+        }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
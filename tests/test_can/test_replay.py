@@ -0,0 +1,51 @@
+# tests/test_can/test_replay.py
+
+import time
+import queue
+import logging
+import threading
+
+from business.can_validation_thread import ValidationThread
+from business.workers.can_state_store import CanStateStore
+from hardware.can.can_replay import replay_monitor, iter_trace_records
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DECODE_CFG = "config/PN36666666_can_decode.yaml"
+VALIDATION_CFG = "config/PN36666666_can_validation.yaml"
+TRACE = "logs/Can_Trace_2025-10-16_15-21-50.txt"
+
+
+def run_replay(trace_path: str = TRACE, speed: float = None):
+    """Replays a recorded trace through ValidationThread (no PCAN hardware) and prints the verdicts."""
+    stop_event = threading.Event()
+    done_event = threading.Event()
+    frame_queue = queue.Queue(maxsize=10_000)
+    store = CanStateStore()
+
+    validator = ValidationThread(frame_queue, DECODE_CFG, VALIDATION_CFG, stop_event, store)
+    replay = threading.Thread(target=replay_monitor,
+                              args=(trace_path, stop_event, logger, frame_queue),
+                              kwargs={"speed": speed, "done_event": done_event}, daemon=True)
+
+    t0 = time.perf_counter()
+    validator.start()
+    replay.start()
+    done_event.wait()
+    while not frame_queue.empty():
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+    stop_event.set()
+    validator.join()
+
+    frames = sum(1 for _ in iter_trace_records(trace_path))
+    logger.info(f"Replayed {frames} frames in {elapsed:.2f} s ({frames / elapsed:,.0f} frames/sec)")
+    logger.info(f"Decode stats: {validator.get_decode_stats()}")
+    for result in validator.get_results():
+        logger.info(f"  {result['test']}: {'PASS' if result['pass'] else 'FAIL'} {result['reason']}")
+
+
+if __name__ == "__main__":
+    run_replay()
@@ -0,0 +1,120 @@
+# tests/test_can/test_rx_event_benchmark.py
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Dict
+
+from hardware.can.PCANBasic import TPCANMsgFD, TPCANTimestampFD, PCAN_RECEIVE_EVENT, PCAN_USBBUS1, \
+    PCAN_ERROR_ILLPARAMTYPE
+from hardware.can.pcan_constants import *
+from hardware.can.can_workers import rx_monitor
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHANNEL = PCAN_USBBUS1
+
+
+class PipeEventDriver:
+    """
+    Minimal PCANBasic stand-in for ReadFD/GetValue: frames are queued by a sender thread and
+    the receive event is a pipe fd that is readable while the RX queue is non-empty, like the
+    Linux PCAN-Basic event fd.
+    """
+
+    def __init__(self):
+        self._rx = deque()
+        self._lock = threading.Lock()
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+
+    def send(self, can_id: int):
+        with self._lock:
+            self._rx.append((can_id, time.perf_counter()))
+            os.write(self._w, b"x")
+
+    def GetValue(self, channel, parameter):
+        if parameter == PCAN_RECEIVE_EVENT:
+            return PCAN_ERROR_OK, self._r
+        return PCAN_ERROR_ILLPARAMTYPE, 0
+
+    def ReadFD(self, channel):
+        with self._lock:
+            if not self._rx:
+                return PCAN_ERROR_QRCVEMPTY, None, None
+            can_id, sent = self._rx.popleft()
+            try:
+                os.read(self._r, 1)
+            except BlockingIOError:
+                pass
+        msg = TPCANMsgFD()
+        msg.ID = can_id
+        msg.MSGTYPE = PCAN_MESSAGE_FD
+        msg.DLC = 8
+        ts = TPCANTimestampFD(int(sent * 1e6))
+        return PCAN_ERROR_OK, msg, ts
+
+    def GetErrorText(self, error, language=0):
+        return PCAN_ERROR_OK, b"emulated"
+
+    def close(self):
+        os.close(self._r)
+        os.close(self._w)
+
+
+def run_rx_benchmark(use_receive_event: bool, duration: float = 3.0, frame_interval: float = 0.01) -> Dict[str, float]:
+    """CPU time of the RX thread and frame latency for a sparse 100 Hz bus (polling vs receive event)."""
+    driver = PipeEventDriver()
+    stop_event = threading.Event()
+    frame_queue = queue.Queue()
+    trace_logger = logging.getLogger("rx_bench_trace")
+    trace_logger.disabled = True
+
+    cpu = {}
+
+    def rx_thread():
+        t0 = time.thread_time()
+        rx_monitor(driver, CHANNEL, stop_event, trace_logger, frame_queue,
+                   use_receive_event=use_receive_event)
+        cpu["rx"] = time.thread_time() - t0
+
+    thread = threading.Thread(target=rx_thread, daemon=True)
+    thread.start()
+
+    latencies = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        sent = time.perf_counter()
+        driver.send(0x111)
+        try:
+            frame_queue.get(timeout=1.0)
+            latencies.append(time.perf_counter() - sent)
+        except queue.Empty:
+            pass
+        time.sleep(frame_interval)
+
+    stop_event.set()
+    thread.join()
+    driver.close()
+
+    latencies.sort()
+    results = {
+        "rx_cpu_pct": 100.0 * cpu["rx"] / duration,
+        "latency_p50_us": latencies[len(latencies) // 2] * 1e6,
+        "latency_p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }
+    label = "event" if use_receive_event else "poll"
+    logger.info(f"{label:<6}: RX thread CPU {results['rx_cpu_pct']:6.2f}%  "
+                f"latency p50 {results['latency_p50_us']:8.1f} us  p99 {results['latency_p99_us']:8.1f} us  "
+                f"({len(latencies)} frames)")
+    return results
+
+
+if __name__ == "__main__":
+    run_rx_benchmark(use_receive_event=False)
+    run_rx_benchmark(use_receive_event=True)
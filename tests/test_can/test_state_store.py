@@ -0,0 +1,145 @@
+# tests/test_can/test_state_store.py
+#
+# CanStateStore behaviour without hardware:
+#   PYTHONPATH=. python tests/test_can/test_state_store.py
+
+import sys
+import time
+import logging
+import threading
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from business.workers import can_signal_history
+from business.workers.can_signal_history import SignalHistory
+from business.workers.can_state_store import CanStateStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def check_coalescing(rate_hz: float = 50.0, updates: int = 200_000, duration: float = 1.0):
+    """A chattering signal from a worker thread reaches the GUI thread at most once per UI frame."""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    store = CanStateStore(update_rate_hz=rate_hz)
+    batches, updated, power_modes = [], [], []
+    store.sig_signals_batch.connect(batches.append)
+    store.sig_signal_updated.connect(lambda name, value: updated.append(name))
+    store.sig_power_mode_changed.connect(power_modes.append)
+
+    def chatter():
+        for n in range(updates):
+            store.update_state("Chatter_Signal", n, n)
+            if n % 50_000 == 0:
+                store.update_state("Vehicle_Power_Mode", "RUN" if n % 100_000 else "OFF", n)
+
+    worker = threading.Thread(target=chatter, daemon=True)
+    t0 = time.perf_counter()
+    worker.start()
+    QTimer.singleShot(int(duration * 1000), app.quit)
+    app.exec()
+    worker.join()
+    elapsed = time.perf_counter() - t0
+
+    logger.info(f"{updates} updates in {elapsed:.2f} s -> {len(batches)} batches, {len(updated)} signal updates, "
+                f"{len(power_modes)} immediate power mode changes, {store.updates_coalesced} coalesced")
+    assert len(batches) <= rate_hz * elapsed + 2
+    assert power_modes == ["OFF", "RUN", "OFF", "RUN"]
+    assert batches[-1]["Chatter_Signal"] == updates - 1
+    store.set_update_rate(None)
+
+
+def check_critical_signals(rate_hz: float = 50.0):
+    """Two wiper states inside one flush interval both reach the indicator logic, in order."""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    store = CanStateStore(update_rate_hz=rate_hz, critical_signals=("Hazard_Switch",))
+    updated = []
+    store.sig_signal_updated.connect(lambda name, value: updated.append((name, value)))
+    for n, state in enumerate(("OFF", "INTERMITTENT", "OFF")):
+        store.update_state("Windshield_Wiper_Switch_Status", state, n)
+        store.update_state("Hazard_Switch", n % 2, n)
+        store.update_state("Chatter_Signal", n, n)
+    wiper = [value for name, value in updated if name == "Windshield_Wiper_Switch_Status"]
+    assert wiper == ["OFF", "INTERMITTENT", "OFF"], updated
+    assert [value for name, value in updated if name == "Hazard_Switch"] == [0, 1, 0]
+    assert all(name != "Chatter_Signal" for name, _ in updated)  # still coalesced
+    store.set_update_rate(None)
+    logger.info("Critical signals OK")
+
+
+def check_snapshots(updates: int = 20_000):
+    """Lock-free readers see consistent, monotonically versioned snapshots while a writer runs."""
+    store = CanStateStore()
+    done = threading.Event()
+
+    def writer():
+        for n in range(1, updates + 1):
+            # Both signals change together: a consistent snapshot never shows them apart by more than one step
+            store.update_state("Counter_A", n, n)
+            store.update_state("Counter_B", n, n)
+        store.update_state("Writer_Phase", "DONE")
+        done.set()
+
+    threading.Thread(target=writer, daemon=True).start()
+    first = store.wait_for_version(0, timeout=10.0)
+    assert first is not None and first.version >= 1
+
+    reads, last_version = 0, 0
+    while not done.is_set():
+        snap = store.snapshot()
+        a, b = snap.states.get("Counter_A", 0), snap.states.get("Counter_B", 0)
+        assert a - 1 <= b <= a and snap.version >= last_version
+        last_version = snap.version
+        reads += 1
+
+    final = store.wait_for_value("Writer_Phase", "DONE", timeout=10.0)
+    assert final is not None and final.version == 2 * updates + 1
+    assert store.wait_for_version(final.version, timeout=0.05) is None
+    assert store.get_state_with_timestamp("Counter_B") == (updates, updates)
+    logger.info(f"{reads} consistent snapshot reads during {updates} writer updates (version {final.version})")
+
+
+def check_history(capacity: int = 1024):
+    """Ring keeps the newest `capacity` samples; min/max decimation keeps spikes; text states map to labels."""
+    history = SignalHistory(capacity)
+    for n in range(10 * capacity):
+        history.append(n * 1000, 100.0 if n == 9 * capacity + 5 else float(n % 10))
+    timestamps, values = history.arrays()
+    assert len(history) == capacity and timestamps[0] == 9 * capacity * 1000 and list(timestamps) == sorted(timestamps)
+
+    numpy_module = can_signal_history.np
+    for module in (numpy_module, None):  # vectorised and pure Python decimation
+        can_signal_history.np = module
+        buckets = history.decimate(buckets=64)
+        assert len(buckets) == 64 and max(b[2] for b in buckets) == 100.0 and min(b[1] for b in buckets) == 0.0
+    can_signal_history.np = numpy_module
+
+    states = SignalHistory(16)
+    for n, state in enumerate(["OFF", "ACC", "RUN", "OFF", "RUN"]):
+        states.append(n, state)
+    assert not states.is_numeric and states.labels == ["OFF", "ACC", "RUN"]
+    assert states.latest() == (4, "RUN")
+    states.append(5, 7)  # number in a text history: stored as its label
+    assert states.latest() == (5, "7") and states.labels[-1] == "7"
+
+    mixed = SignalHistory(16)
+    mixed.append(0, 12.5)
+    mixed.append(1, "UNKNOWN(3)")  # text in a numeric history: a gap, not a label index
+    mixed.append(2, 13.0)
+    assert mixed.is_numeric and not mixed.labels
+    values = mixed.arrays()[1]
+    assert values[0] == 12.5 and values[1] != values[1] and values[2] == 13.0
+    assert mixed.latest() == (2, 13.0)
+
+    store = CanStateStore(history_size=8)
+    for n in range(20):
+        store.update_state("Ignition_Voltage", 12.0 + n / 10, n)
+    assert len(store.get_history("Ignition_Voltage")) == 8
+    logger.info("Signal history OK")
+
+
+if __name__ == "__main__":
+    check_history()
+    check_critical_signals()
+    check_snapshots()
+    check_coalescing()
@@ -0,0 +1,158 @@
+# tests/test_can/test_timing_rules.py
+#
+# Deadline / dwell / period / transition latency rules and early verdicts on synthetic timestamped
+# events (no hardware):
+#   PYTHONPATH=. python tests/test_can/test_timing_rules.py
+
+import os
+import logging
+import tempfile
+
+import yaml
+
+from business.can_validator import Validator
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MS = 1000  # timestamps are in us
+
+VALIDATION_CFG = "config/PN36666666_can_validation.yaml"
+
+TESTS = [
+    {"name": "RUN_Deadline", "signal": "Vehicle_Power_Mode",
+     "deadline": {"trigger": {"can_id": 0x14DA40F1, "service": 0x2F}, "value": "RUN", "within_ms": 800}},
+    {"name": "RUN_Dwell", "signal": "Vehicle_Power_Mode", "dwell": {"value": "RUN", "min_ms": 200}},
+    {"name": "Status_Period", "period": {"can_id": 0x111, "period_ms": 10, "tolerance_pct": 10}},
+    {"name": "OFF_RUN_Latency", "signal": "Vehicle_Power_Mode",
+     "transition_latency": {"from": "OFF", "to": "RUN", "percentile": 95, "max_ms": 300}},
+]
+
+IO_CONTROL_REQUEST = bytes([0x05, 0x2F, 0x01, 0x02, 0x03, 0x00, 0x00, 0x00])
+
+
+def make_validator(folder: str) -> Validator:
+    path = os.path.join(folder, "timing_validation.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump({"tests": TESTS}, f)
+    return Validator(path)
+
+
+def drive(validator: Validator, ts_run: int, run_held_ms: int, jitter_ms: float = 0.0):
+    """0x111 every 10 ms for 2 s; IO-control request at 100 ms; OFF -> ACC at 150 ms -> RUN at ts_run."""
+    events = [(ts, "frame", 0x111) for ts in range(0, 2000 * MS, 10 * MS)]
+    events.append((100 * MS, "frame", 0x14DA40F1))
+    events += [(0, "OFF"), (150 * MS, "ACC"), (ts_run, "RUN"), (ts_run + run_held_ms * MS, "OFF")]
+    if jitter_ms:
+        events.append((1005 * MS + int(jitter_ms * MS), "frame", 0x111))
+    for event in sorted(events, key=lambda e: e[0]):
+        if event[1] == "frame":
+            data = IO_CONTROL_REQUEST if event[2] == 0x14DA40F1 else bytes(8)
+            validator.on_frame(event[2], data, event[0])
+        else:
+            validator.feed("Vehicle_Power_Mode", event[1], event[0])
+
+
+def results(validator: Validator):
+    return {r["test"]: r for r in validator.validate_all()}
+
+
+def check_timing_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        good = make_validator(tmp)
+        drive(good, ts_run=400 * MS, run_held_ms=500)
+        for name, result in results(good).items():
+            logger.info(f"good  {name}: {result['reason']} {result['timing']}")
+            assert result["pass"], result
+
+        late = make_validator(tmp)
+        drive(late, ts_run=1000 * MS, run_held_ms=100, jitter_ms=1)
+        late_results = results(late)
+        for name, result in late_results.items():
+            logger.info(f"late  {name}: {result['reason']}")
+        assert not late_results["RUN_Deadline"]["pass"]
+        assert not late_results["RUN_Dwell"]["pass"]
+        assert not late_results["Status_Period"]["pass"]
+        assert not late_results["OFF_RUN_Latency"]["pass"]
+
+        never = make_validator(tmp)
+        never.feed("Vehicle_Power_Mode", "OFF", 0)
+        never.on_frame(0x111, bytes(8), 5 * MS)
+        assert "never seen" in results(never)["RUN_Deadline"]["reason"]
+    logger.info("Timing rules OK")
+
+
+def check_early_verdicts():
+    """Station tests decide as soon as required states are seen and the final value is held."""
+    validator = Validator(VALIDATION_CFG)
+    decided = []
+    validator.on_verdict = lambda name, passed, reason: decided.append((name, passed, validator.now))
+
+    validator.feed("Vehicle_Power_Mode", "OFF", 0)
+    validator.feed("Ignition_Voltage", 12.4, 0)
+    validator.feed("Vehicle_Power_Mode", "RUN", 100 * MS)
+    for ts in range(0, 1000 * MS, 10 * MS):
+        validator.on_frame(0x111, bytes(8), ts)
+    for name, passed, at in decided:
+        logger.info(f"verdict {name}: {'PASS' if passed else 'FAIL'} at {at / MS:.0f} ms")
+
+    verdicts = {name: passed for name, passed, _ in decided}
+    assert verdicts == {"IgnitionVoltage_Test": True, "PowerMode_Test": True}, verdicts
+    assert validator.decided_at["PowerMode_Test"] <= 100 * MS + validator.FINAL_HOLD_MS * MS + validator.VERDICT_CHECK_US
+    assert not validator.all_decided  # wiper states never seen
+
+    for state in ("OFF", "INTERMITTENT", "LOW", "OFF"):
+        validator.feed("Windshield_Wiper_Switch_Status", state, validator.now)
+    for ts in range(1000 * MS, 1300 * MS, 10 * MS):
+        validator.on_frame(0x111, bytes(8), ts)
+    assert validator.all_decided and all(validator.verdicts.values())
+    logger.info("Early verdicts OK")
+
+
+def check_timing_verdicts():
+    """Timing rules settle when their window runs out; validate_all() overrides a provisional verdict."""
+    with tempfile.TemporaryDirectory() as tmp:
+        good = make_validator(tmp)
+        drive(good, ts_run=400 * MS, run_held_ms=500)
+        assert all(good.verdicts[name] is True for name in good.verdicts), good.verdicts
+        assert good.all_decided  # stop_on_verdict can end a passing run early
+        assert all(r["pass"] for r in good.validate_all())
+
+        late = make_validator(tmp)
+        drive(late, ts_run=1000 * MS, run_held_ms=100)
+        assert late.verdicts["RUN_Deadline"] is False and late.verdicts["RUN_Dwell"] is False
+        assert late.verdicts["OFF_RUN_Latency"] is None  # a failing percentile is decided by validate_all()
+        assert not results(late)["OFF_RUN_Latency"]["pass"] and late.verdicts["OFF_RUN_Latency"] is False
+
+        # 100 good intervals settle the period early; a late frame afterwards still fails the test
+        jitter = make_validator(tmp)
+        reported = []
+        jitter.on_verdict = lambda name, passed, reason: reported.append((name, passed))
+        drive(jitter, ts_run=400 * MS, run_held_ms=500, jitter_ms=1)
+        assert ("Status_Period", True) in reported
+        assert not results(jitter)["Status_Period"]["pass"]
+        assert jitter.verdicts["Status_Period"] is False and reported[-1] == ("Status_Period", False)
+
+    # Range PASS settled after FINAL_HOLD_MS, then the value leaves the range
+    moved = Validator(VALIDATION_CFG)
+    reported = []
+    moved.on_verdict = lambda name, passed, reason: reported.append((name, passed, reason))
+    moved.feed("Ignition_Voltage", 12.4, 0)
+    moved.on_frame(0x111, bytes(8), moved.FINAL_HOLD_MS * MS)
+    assert moved.verdicts["IgnitionVoltage_Test"] is True
+    moved.feed("Ignition_Voltage", 16.0, 2 * moved.FINAL_HOLD_MS * MS)
+    final = {r["test"]: r for r in moved.validate_all()}["IgnitionVoltage_Test"]
+    assert not final["pass"] and moved.verdicts["IgnitionVoltage_Test"] is False
+    assert reported[-1] == ("IgnitionVoltage_Test", False, final["reason"])
+
+    chatter = Validator(VALIDATION_CFG)
+    for n in range(10 * Validator.MAX_TRANSITIONS):
+        chatter.feed("Vehicle_Power_Mode", "RUN" if n % 2 else "OFF", n)
+    assert len(chatter.get_transitions("Vehicle_Power_Mode")) == Validator.MAX_TRANSITIONS
+    logger.info("Timing verdicts OK")
+
+
+if __name__ == "__main__":
+    check_timing_rules()
+    check_early_verdicts()
+    check_timing_verdicts()
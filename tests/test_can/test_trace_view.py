@@ -0,0 +1,110 @@
+# tests/test_can/test_trace_view.py
+#
+# Trace table models over a CanFrameRing and a recorded ctrace (no hardware, no display needed):
+#   QT_QPA_PLATFORM=offscreen PYTHONPATH=. python tests/test_can/test_trace_view.py
+
+import os
+import sys
+import logging
+import tempfile
+
+from PySide6.QtCore import QModelIndex
+from PySide6.QtWidgets import QApplication
+
+from hardware.can.can_frame_ring import CanFrameRing
+from hardware.can.can_binary_trace import BinaryTraceWriter
+from presentation.views.can_trace_view import CanTraceView, FileTraceModel, RingTraceModel
+from tests.test_can.test_trace_writer import make_messages
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def cell(model, row: int, column: int) -> str:
+    return model.data(model.index(row, column))
+
+
+def check_ring_model(capacity: int = 1024):
+    """Rows follow the ring: overwritten frames drop out, filters apply, pause freezes the rows."""
+    ring = CanFrameRing(capacity)
+    model = RingTraceModel(ring)
+    messages = make_messages(3 * capacity)
+    for n, msg in enumerate(messages[:capacity // 2]):
+        ring.push(msg, 1_000_000 + n * 100)
+    model.poll()
+    assert model.rowCount() == capacity // 2 and cell(model, 0, 0) == "0.000000"
+
+    for n, msg in enumerate(messages[capacity // 2:], start=capacity // 2):
+        ring.push(msg, 1_000_000 + n * 100)
+    model.poll()
+    assert model.rowCount() == capacity - 1
+    last = messages[-1]
+    assert cell(model, model.rowCount() - 1, 3) == (f"0x{last.ID:08X}" if last.ID > 0x7FF else f"0x{last.ID:03X}")
+
+    model.set_filter({0x111}, None, None)
+    expected = sum(1 for msg in messages[-(capacity - 1):] if msg.ID == 0x111)
+    assert model.rowCount() == expected
+
+    model.set_paused(True)
+    frozen = [cell(model, row, 6) for row in range(model.rowCount())]
+    for n, msg in enumerate(messages[:capacity], start=len(messages)):
+        ring.push(msg, 1_000_000 + n * 100)
+    model.poll()
+    assert [cell(model, row, 6) for row in range(model.rowCount())] == frozen
+
+    # Refiltering while paused works on the frozen frames, not the ring that moved on
+    model.set_filter({0x3A0}, None, None)
+    held = messages[-(capacity - 1):]
+    assert model.rowCount() == sum(1 for msg in held if msg.ID == 0x3A0) > 0
+    assert all(cell(model, row, 3) == "0x3A0" for row in range(model.rowCount()))
+    model.set_filter({0x111}, None, None)
+    assert [cell(model, row, 6) for row in range(model.rowCount())] == frozen
+
+    model.set_paused(False)
+    assert all(cell(model, row, 3) == "0x111" for row in range(model.rowCount()))
+    assert model.rowCount() == sum(1 for msg in messages[:capacity][-(capacity - 1):] if msg.ID == 0x111)
+    logger.info(f"Ring model OK ({model.rowCount()} rows for ID 0x111)")
+
+
+def check_file_model(frame_count: int = 50_000):
+    """Unfiltered rows come from the index alone; filtered rows are fetched block chunk by chunk."""
+    messages = make_messages(frame_count)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.ctrace")
+        writer = BinaryTraceWriter(path, block_frames=256, max_pending_blocks=frame_count // 256 + 1)  # no drops
+        for n, msg in enumerate(messages):
+            writer.write(msg, n * 100, host_time=1_700_000_000 + n * 0.0001)
+        writer.close()
+
+        model = FileTraceModel(path)
+        assert model.rowCount() == frame_count and not model.canFetchMore(QModelIndex())
+        row = frame_count - 7
+        assert cell(model, row, 0) == f"{row * 0.0001:.6f}"
+        assert cell(model, row, 6).split()[0] == f"{messages[row].DATA[0]:02X}"
+
+        model.set_filter({0x3A0}, 1.0, 2.0)
+        while model.canFetchMore(QModelIndex()):
+            model.fetchMore(QModelIndex())
+        expected = [n for n, msg in enumerate(messages) if msg.ID == 0x3A0 and 1.0 <= n * 0.0001 <= 2.0]
+        assert model.rowCount() == len(expected)
+        assert cell(model, 0, 3) == "0x3A0" and abs(float(cell(model, 0, 0)) - expected[0] * 0.0001) < 1e-5
+        model.close()
+    logger.info(f"File model OK ({len(expected)} filtered rows of {frame_count})")
+
+
+def check_view():
+    view = CanTraceView()
+    view.set_ring(CanFrameRing(256))
+    view.id_edit.setText("111, 3a0")
+    view.apply_filter()
+    assert view.model.ids == frozenset({0x111, 0x3A0})
+    view.pause_button.setChecked(True)
+    assert view.model.paused
+    logger.info("Trace view OK")
+
+
+if __name__ == "__main__":
+    app = QApplication.instance() or QApplication(sys.argv)
+    check_ring_model()
+    check_file_model()
+    check_view()
@@ -0,0 +1,216 @@
+# tests/test_can/test_trace_writer.py
+
+import os
+import json
+import importlib.util
+import time
+import random
+import logging
+import tempfile
+from typing import Dict, List
+
+from hardware.can.PCANBasic import TPCANMsgFD
+from hardware.can.pcan_constants import *
+from hardware.can.can_logger import setup_can_logger, log_can_message, iter_text_trace
+from hardware.can.can_binary_trace import BinaryTraceWriter, iter_binary_trace, export_text_trace
+from hardware.can.can_replay import iter_trace_records
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_messages(count: int) -> List[TPCANMsgFD]:
+    rnd = random.Random(42)
+    messages = []
+    for _ in range(count):
+        msg = TPCANMsgFD()
+        msg.ID = rnd.choice((0x0AF, 0x111, 0x3A0, 0x14DAF140))
+        msg.MSGTYPE = PCAN_MESSAGE_FD | PCAN_MESSAGE_BRS
+        if msg.ID > 0x7FF:
+            msg.MSGTYPE |= PCAN_MESSAGE_EXTENDED
+        msg.DLC = rnd.choice((5, 8, 15))
+        for i in range(64):
+            msg.DATA[i] = rnd.randrange(256)
+        messages.append(msg)
+    return messages
+
+
+def check_roundtrip(messages: List[TPCANMsgFD]):
+    """Binary trace -> records and -> exported text must match what went in."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.ctrace")
+        writer = BinaryTraceWriter(path, block_frames=100)
+        for n, msg in enumerate(messages):
+            writer.write(msg, n, host_time=1_700_000_000 + n * 0.001)
+        writer.close()
+
+        records = list(iter_binary_trace(path))
+        assert len(records) == len(messages) == writer.frames_written
+        exported = list(iter_text_trace(export_text_trace(path)))
+        for rec, txt, msg in zip(records, exported, messages):
+            assert rec.can_id == txt.can_id == msg.ID
+            assert rec.msgtype == txt.msgtype == msg.MSGTYPE
+            assert rec.data == txt.data
+            assert abs(rec.timestamp - txt.timestamp) < 1e-5
+    logger.info(f"roundtrip OK ({len(messages)} frames)")
+
+
+def check_vendor_export(messages: List[TPCANMsgFD]):
+    """ctrace -> ASC / BLF via python-can, read back with can.LogReader (hardware timestamps kept)."""
+    if importlib.util.find_spec("can") is None:
+        logger.info("vendor export skipped: python-can not installed")
+        return
+    import can
+    from hardware.can.can_trace_formats import convert_binary_trace
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trace.ctrace")
+        writer = BinaryTraceWriter(path)
+        for n, msg in enumerate(messages):
+            writer.write(msg, 1_000_000 + n * 250)
+        writer.close()
+
+        for ext in ("asc", "blf"):
+            out = convert_binary_trace(path, os.path.join(tmp, f"trace.{ext}"))
+            read_back = list(can.LogReader(out))
+            assert len(read_back) == len(messages)
+            for rec, msg in zip(read_back, messages):
+                assert rec.arbitration_id == msg.ID
+                assert rec.is_fd
+            logger.info(f"{ext}: {len(read_back)} frames, {os.path.getsize(out)} bytes")
+
+
+def open_files(folder: str):
+    """Files under folder this process holds open (Linux /proc only; None elsewhere)."""
+    if not os.path.isdir("/proc/self/fd"):
+        return None
+    paths = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            paths.append(os.readlink(f"/proc/self/fd/{fd}"))
+        except OSError:
+            pass
+    return [path for path in paths if path.startswith(folder)]
+
+
+def check_index_query(frame_count: int = 200_000):
+    """TraceReader.frames(t0, t1, ids) must return exactly what a full scan + filter returns."""
+    from hardware.can.can_trace_index import TraceReader
+    from hardware.can.can_trace_rotation import TraceRotation
+
+    messages = make_messages(1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = BinaryTraceWriter(os.path.join(tmp, "trace.ctrace"), block_frames=1024,
+                                   rotation=TraceRotation(max_bytes=8 << 20))
+        for n in range(frame_count):
+            writer.write(messages[n % len(messages)], n, host_time=1_700_000_000 + n * 0.0005)
+        writer.close()
+        manifest = writer.rotation.manifest_path
+
+        t0, t1, ids = 1_700_000_000 + 60.0, 1_700_000_000 + 62.0, {0x111}
+        expected = [(rec.timestamp, rec.can_id, rec.data)
+                    for seg in writer.rotation.segments
+                    for rec in iter_binary_trace(os.path.join(tmp, seg["file"]))
+                    if t0 <= rec.timestamp <= t1 and rec.can_id in ids]
+
+        with TraceReader(manifest) as reader:
+            start = time.perf_counter()
+            got = [(rec.timestamp, rec.can_id, rec.data) for rec in reader.frames(t0, t1, ids)]
+            elapsed = time.perf_counter() - start
+
+        # Manifest replay reads through a TraceReader too; abandoning it early must close the segments
+        records = iter_trace_records(manifest)
+        next(records)
+        assert open_files(tmp) != []
+        records.close()
+        assert open_files(tmp) in ([], None)
+    assert got == expected and got
+    logger.info(f"index query: {len(got)} frames in {elapsed * 1e3:.1f} ms "
+                f"({frame_count} frames, {len(writer.rotation.segments)} segments)")
+
+
+def check_rotation_retention(blocks: int = 40, keep: int = 3):
+    """Retention never deletes a segment still queued for compression; no empty final segment."""
+    from hardware.can.can_trace_rotation import TraceRotation
+
+    messages = make_messages(256)
+    with tempfile.TemporaryDirectory() as tmp:
+        # max_bytes=1: every block closes its segment, so the last segment opened is left empty
+        writer = BinaryTraceWriter(os.path.join(tmp, "trace.ctrace"), block_frames=256, max_pending_blocks=blocks,
+                                   rotation=TraceRotation(max_bytes=1, compression="gzip", keep_segments=keep))
+        for n in range(blocks * 256):
+            writer.write(messages[n % 256], n, host_time=1_700_000_000 + n * 0.001)
+        writer.close()
+
+        with open(writer.rotation.manifest_path, encoding="utf-8") as f:
+            segments = json.load(f)["segments"]
+        listed = {os.path.basename(writer.rotation.manifest_path)}
+        listed.update(seg["file"] for seg in segments)
+        listed.update(seg["index_file"] for seg in segments)
+        assert len(segments) == keep and all(seg["frames"] == 256 and seg["file"].endswith(".gz") for seg in segments)
+        assert set(os.listdir(tmp)) == listed, sorted(set(os.listdir(tmp)) - listed)
+        assert writer.frames_written == blocks * 256
+    logger.info(f"rotation retention OK ({blocks} segments written, {keep} kept)")
+
+
+def check_idle_time_rotation(max_seconds: float = 0.2):
+    """max_seconds closes a segment even when no further block arrives (idle bus)."""
+    from hardware.can.can_trace_rotation import TraceRotation
+
+    messages = make_messages(10)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = BinaryTraceWriter(os.path.join(tmp, "trace.ctrace"), flush_interval=0.0,
+                                   rotation=TraceRotation(max_seconds=max_seconds, compression=None))
+        for n, msg in enumerate(messages):
+            writer.write(msg, n)
+        writer.flush_if_due()  # RX loop going idle hands over the partial block
+
+        deadline = time.monotonic() + 5 * max_seconds
+        while not writer.rotation.segments and time.monotonic() < deadline:
+            time.sleep(0.01)
+        segments = list(writer.rotation.segments)
+        assert len(segments) == 1 and segments[0]["frames"] == len(messages), segments
+
+        time.sleep(2 * max_seconds)  # the next segment stays empty: no rotation, no file churn
+        assert len(writer.rotation.segments) == 1
+        writer.close()
+        assert len(writer.rotation.segments) == 1  # empty final segment is dropped
+        assert len(list(iter_binary_trace(os.path.join(tmp, segments[0]["file"])))) == len(messages)
+    logger.info("idle time rotation OK")
+
+
+def run_trace_benchmark(frame_count: int = 100_000) -> Dict[str, float]:
+    """RX-thread cost per frame: text logger vs binary writer.write()."""
+    messages = make_messages(frame_count)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        can_logger = setup_can_logger(tmp)
+        can_logger.propagate = False  # time the trace file only, not the console
+        t0 = time.perf_counter()
+        for msg in messages:
+            log_can_message(msg, can_logger)
+        results["text_logger_us"] = (time.perf_counter() - t0) / frame_count * 1e6
+        for handler in can_logger.handlers:
+            handler.close()
+        can_logger.handlers.clear()
+
+        writer = BinaryTraceWriter(os.path.join(tmp, "bench.ctrace"))
+        t0 = time.perf_counter()
+        for msg in messages:
+            writer.write(msg, 0)
+        results["binary_writer_us"] = (time.perf_counter() - t0) / frame_count * 1e6
+        writer.close()
+
+    for label, us in results.items():
+        logger.info(f"{label:<17}: {us:6.2f} us/frame on the RX thread")
+    return results
+
+
+if __name__ == "__main__":
+    check_roundtrip(make_messages(1000))
+    check_vendor_export(make_messages(1000))
+    check_index_query()
+    check_rotation_retention()
+    check_idle_time_rotation()
+    run_trace_benchmark()
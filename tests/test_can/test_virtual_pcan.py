@@ -0,0 +1,145 @@
+# tests/test_can/test_virtual_pcan.py
+
+import time
+import queue
+import logging
+import threading
+
+from hardware.can.PCANBasic import TPCANMsgFD, PCAN_USBBUS1
+from hardware.can.pcan_constants import *
+from hardware.can.can_workers import rx_monitor, rx_monitor_ring, apply_acceptance_filter
+from hardware.can.can_frame_ring import CanFrameRing, CanRingReader
+from hardware.can.can_frame_bus import CanFrameBus
+from hardware.can.virtual_pcan import VirtualPCANBasic, make_msg
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHANNEL = PCAN_USBBUS1
+DECODE_CFG = "config/PN36666666_can_decode.yaml"
+WIPER_ID = 0x200
+
+
+def check_uds_and_echo():
+    """Echo of the request plus the scripted positive response to 10 03."""
+    pcan = VirtualPCANBasic()
+    pcan.InitializeFD(CHANNEL, bitrate_fd_500K_2Mb)
+    pcan.SetValue(CHANNEL, PCAN_ALLOW_ECHO_FRAMES, PCAN_PARAMETER_ON)
+
+    request = make_msg(0x14DA40F1, bytes([0x02, 0x10, 0x03, 0, 0, 0, 0, 0]))
+    assert pcan.WriteFD(CHANNEL, request) == PCAN_ERROR_OK
+    time.sleep(0.05)
+
+    frames = []
+    while True:
+        result, msg, ts = pcan.ReadFD(CHANNEL)
+        if result != PCAN_ERROR_OK:
+            break
+        frames.append(msg)
+    assert frames[0].ID == 0x14DA40F1 and frames[0].MSGTYPE & PCAN_MESSAGE_ECHO
+    assert frames[1].ID == 0x14DAF140 and bytes(frames[1].DATA[:3]) == bytes([0x06, 0x50, 0x03])
+    pcan.Uninitialize(CHANNEL)
+    logger.info("UDS / echo OK")
+
+
+def check_acceptance_filter():
+    """A run of IDs across 0x7FF/0x800 is registered as an 11-bit part and a 29-bit part."""
+    pcan = VirtualPCANBasic()
+    pcan.InitializeFD(CHANNEL, bitrate_fd_500K_2Mb)
+    wanted = {0x100, 0x7FE, 0x7FF, 0x800, 0x801, 0x14DAF140}
+    assert apply_acceptance_filter(pcan, CHANNEL, wanted, logger) == frozenset(wanted)
+    ranges = pcan._channels[int(CHANNEL.value)].filter_ranges
+    assert ranges == [(0x100, 0x100, False), (0x7FE, 0x7FF, False),
+                      (0x800, 0x801, True), (0x14DAF140, 0x14DAF140, True)], ranges
+    pcan.Uninitialize(CHANNEL)
+    logger.info("Acceptance filter OK")
+
+
+def check_queue_mode_bus():
+    """Queue-mode rx_monitor also feeds CanFrameBus subscribers (the signal monitor's wiper ID only)."""
+    from business.can_signal_monitor_worker import CanSignalMonitorWorker
+
+    pcan = VirtualPCANBasic()
+    pcan.InitializeFD(CHANNEL, bitrate_fd_500K_2Mb)
+    pcan.add_periodic(WIPER_ID, 0.002, lambda n: bytes([n % 4] + [0] * 7))
+    pcan.add_periodic(0x111, 0.001)
+
+    frame_bus = CanFrameBus(CanFrameRing(4096))
+    stop_event = threading.Event()
+    monitor = CanSignalMonitorWorker(frame_bus, DECODE_CFG, stop_event)
+    subscriber = monitor.frame_queue
+    assert subscriber.id_filter == frozenset({WIPER_ID}), subscriber.id_filter
+
+    frame_queue = queue.Queue()
+    t_rx = threading.Thread(target=rx_monitor, args=(pcan, CHANNEL, stop_event, logger, frame_queue),
+                            kwargs={"frame_bus": frame_bus}, daemon=True)
+    t_rx.start()
+    time.sleep(0.3)
+    stop_event.set()
+    t_rx.join()
+    pcan.Uninitialize(CHANNEL)
+
+    queued = []
+    while not frame_queue.empty():
+        frame = frame_queue.get_nowait()
+        queued.append((frame.msg.ID, frame.timestamp))
+    published = []
+    while True:
+        try:
+            frame = subscriber.get(timeout=0.01)
+        except queue.Empty:
+            break
+        published.append((frame.msg.ID, frame.timestamp))
+
+    assert published and published == [f for f in queued if f[0] == WIPER_ID], (len(published), len(queued))
+    assert len(queued) > len(published)
+    frame_bus.unsubscribe(CanSignalMonitorWorker.SUBSCRIBER_NAME)
+    assert not frame_bus.has_subscribers
+    logger.info(f"queue-mode bus OK ({len(published)} of {len(queued)} frames to the signal monitor)")
+
+
+def run_throughput(frames_per_second: int = 20_000, duration: float = 3.0, use_ring: bool = False,
+                   use_receive_event: bool = True):
+    """Random bus load through the RX thread into one consumer; reports delivered frames/sec."""
+    pcan = VirtualPCANBasic()
+    pcan.InitializeFD(CHANNEL, bitrate_fd_500K_2Mb)
+    pcan.add_random_load(frames_per_second)
+
+    stop_event = threading.Event()
+    trace_logger = logging.getLogger("virtual_trace")
+    trace_logger.disabled = True
+    if use_ring:
+        ring = CanFrameRing()
+        sink, consumer, target = ring, CanRingReader(ring), rx_monitor_ring
+    else:
+        sink = consumer = queue.Queue()
+        target = rx_monitor
+    t_rx = threading.Thread(target=target, args=(pcan, CHANNEL, stop_event, trace_logger, sink),
+                            kwargs={"use_receive_event": use_receive_event}, daemon=True)
+    t_rx.start()
+
+    received = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        try:
+            consumer.get(timeout=0.1)
+            received += 1
+        except queue.Empty:
+            pass
+    stop_event.set()
+    t_rx.join()
+    driver_stats = pcan.stats()
+    pcan.Uninitialize(CHANNEL)
+
+    label = f"{'ring' if use_ring else 'queue'}/{'event' if use_receive_event else 'poll'}"
+    logger.info(f"{label:<11}: {received / duration:>10,.0f} frames/sec consumed "
+                f"(offered {frames_per_second:,}/s, driver stats {driver_stats})")
+
+
+if __name__ == "__main__":
+    check_uds_and_echo()
+    check_acceptance_filter()
+    check_queue_mode_bus()
+    run_throughput(use_ring=False)
+    run_throughput(use_ring=True)